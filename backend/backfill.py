@@ -0,0 +1,243 @@
+# pylint: skip-file
+"""
+Incremental historical-data backfill. Plans requests for only the trading days
+missing from the bar store and sends them through IBKRClient under IBKR's
+historical-data pacing limits, retrying failures with exponential backoff.
+"""
+
+import os
+import random
+import threading
+import time
+from contextlib import nullcontext
+
+import numpy as np
+
+from .bar_store import is_complete
+
+# IBKR allows 60 historical requests per 10 minutes; a bucket of 5 refilled at
+# 0.09/s can never exceed 5 + 0.09 * 600 = 59 requests in any 10 minute window.
+# Six or more requests for one contract within 2 seconds are also a pacing
+# violation, so the burst stays at 5 (a backfill is one contract's chunks).
+PACING_RATE = 0.09
+PACING_BURST = 5
+# Longest span (trading days) requested at once per bar size
+MAX_REQUEST_DAYS = {
+    "1 min": 5,
+    "2 mins": 10,
+    "3 mins": 10,
+    "5 mins": 20,
+    "15 mins": 20,
+    "30 mins": 20,
+    "1 hour": 20,
+    "1 day": 250,
+}
+RETRY_ERRORS = (ConnectionError, TimeoutError, OSError, RuntimeError)
+# Seconds an incomplete (open session) partition is served before refetching
+OPEN_DAY_REFRESH = float(os.getenv("BACKFILL_OPEN_DAY_REFRESH", "60"))
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter. acquire blocks until a token is available.
+    Thread safe, so one bucket can pace sessions on several threads. clock
+    and sleep are injectable for tests.
+    """
+
+    def __init__(
+        self,
+        rate: float = PACING_RATE,
+        capacity: int = PACING_BURST,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        """Create a full bucket refilling at rate tokens per second up to capacity."""
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Take tokens, sleeping until they are available. Returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self.clock()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                delay = (tokens - self.tokens) / self.rate
+            self.sleep(delay)  # Outside the lock so other callers can refill
+            waited += delay
+
+
+def backoff_delay(
+    attempt: int, base: float = 2.0, cap: float = 60.0, rng=random.random
+):
+    """Exponential backoff with jitter for retry attempt (0-based): 50-100% of base * 2**attempt."""
+    return min(cap, base * 2**attempt) * (0.5 + rng() / 2)
+
+
+def missing_ranges(
+    store,
+    ticker: str,
+    bar_size: str,
+    start,
+    end,
+    max_days=None,
+    refresh: float = OPEN_DAY_REFRESH,
+    clock=time.time,
+):
+    """
+    Return (first_day, last_day) datetime64[D] pairs of consecutive business
+    days between start and end with no complete partition in store (see
+    bar_store.is_complete), each at most max_days trading days long (default
+    MAX_REQUEST_DAYS for bar_size, else 1). Days stored mid-session, such as
+    today's, are requested again once their partition is refresh seconds old.
+    """
+    max_days = max_days or MAX_REQUEST_DAYS.get(bar_size, 1)
+    days = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1)
+    days = days[np.is_busday(days)]
+    stored_days = store.days(ticker, bar_size)
+    now = clock()
+    stored = np.array(
+        [
+            day
+            for day, stat in zip(
+                stored_days, store.partition_stats(ticker, bar_size, stored_days)
+            )
+            if is_complete(day, stat) or now - stat.st_mtime < refresh
+        ],
+        dtype="datetime64[D]",
+    )
+    missing = np.flatnonzero(~np.isin(days, stored))
+    ranges = []
+    # Split wherever a stored day interrupts the run or the chunk is full
+    run_start = 0
+    for i in range(1, len(missing) + 1):
+        if (
+            i == len(missing)
+            or missing[i] != missing[i - 1] + 1
+            or i - run_start == max_days
+        ):
+            ranges.append((days[missing[run_start]], days[missing[i - 1]]))
+            run_start = i
+    return ranges
+
+
+class Backfiller:
+    """
+    Fill gaps in the bar store from IBKR. Every request waits on the shared
+    token bucket; errors are retried with backoff up to max_retries times.
+    client needs get_historical_data(ticker, duration, bar_size, end_date_time).
+    With a breaker (see breakers.CircuitBreaker) every request goes through it,
+    and its CircuitOpenError stops the run.
+    """
+
+    def __init__(
+        self,
+        client,
+        store,
+        bucket=None,
+        max_retries: int = 4,
+        sleep=time.sleep,
+        breaker=None,
+    ):
+        """Create a backfiller writing to store. bucket defaults to IBKR pacing limits."""
+        self.client = client
+        self.store = store
+        self.bucket = bucket or TokenBucket(sleep=sleep)
+        self.max_retries = max_retries
+        self.sleep = sleep
+        self.breaker = breaker
+
+    def plan(self, ticker: str, bar_size: str, start, end) -> list:
+        """Return the requests needed to fill ticker's missing days from start to end."""
+        requests = []
+        for first_day, last_day in missing_ranges(
+            self.store, ticker, bar_size, start, end
+        ):
+            sessions = int(np.busday_count(first_day, last_day + 1))
+            requests.append(
+                {
+                    "ticker": ticker,
+                    "bar_size": bar_size,
+                    "first_day": first_day,
+                    "last_day": last_day,
+                    "end_date_time": f"{str(last_day).replace('-', '')} 23:59:59",
+                    "duration": f"{sessions} D",
+                }
+            )
+        return requests
+
+    def run(self, requests) -> dict:
+        """Send planned requests and store their bars. Returns a summary dict."""
+        summary = {"requests": 0, "bars": 0, "empty": [], "failed": []}
+        for request in requests:
+            bars = self._fetch(request, summary)
+            if bars is None:
+                summary["failed"].append(request)
+            elif not bars:
+                summary["empty"].append(request)
+            else:
+                summary["bars"] += self._store(request, bars)
+        return summary
+
+    def backfill(self, ticker: str, bar_size: str, start, end) -> dict:
+        """Plan and run the requests filling ticker's gaps between start and end."""
+        return self.run(self.plan(ticker, bar_size, start, end))
+
+    def backfill_many(self, tickers, bar_size: str, start, end) -> dict:
+        """Backfill several tickers through the same pacing bucket. Returns summaries by ticker."""
+        return {
+            ticker: self.backfill(ticker, bar_size, start, end) for ticker in tickers
+        }
+
+    def _fetch(self, request: dict, summary: dict):
+        """Request one chunk, retrying errors. Returns bars, [] for no data or None on failure."""
+        guard = self.breaker.guard if self.breaker is not None else nullcontext
+        for attempt in range(self.max_retries + 1):
+            if self.breaker is not None:
+                self.breaker.check()  # Fail fast instead of waiting for a token
+            self.bucket.acquire()
+            summary["requests"] += 1
+            try:
+                with guard():
+                    bars = self.client.get_historical_data(
+                        request["ticker"],
+                        request["duration"],
+                        request["bar_size"],
+                        end_date_time=request["end_date_time"],
+                    )
+                if bars is not None:
+                    return list(bars)
+                print(f"No connection for {request['ticker']}, retrying...")
+            except RETRY_ERRORS as e:
+                print(f"Historical request for {request['ticker']} failed: {e}")
+            if attempt < self.max_retries:
+                self.sleep(backoff_delay(attempt))
+        return None
+
+    def _store(self, request: dict, bars) -> int:
+        """
+        Save bars unless the client already did, and mark business days inside
+        the answered span that returned no bars (holidays) as empty partitions so
+        they are not requested again.
+        """
+        ticker, bar_size = request["ticker"], request["bar_size"]
+        if getattr(self.client, "bar_store", None) is not self.store:
+            self.store.write(ticker, bar_size, bars)
+        days = np.arange(request["first_day"], request["last_day"] + 1)
+        stored = np.array(self.store.days(ticker, bar_size), dtype="datetime64[D]")
+        latest = stored.max() if len(stored) else None
+        for day in days[np.is_busday(days) & ~np.isin(days, stored)]:
+            if latest is not None and day < latest:
+                self.store.mark_empty(ticker, bar_size, day)
+        return len(bars)
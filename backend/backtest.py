@@ -4,14 +4,42 @@ Backtest module for grid trading bot. Contains BacktestEngine class and IBKR API
 
 # pylint: skip-file
 
+import itertools
+import math
 import random
 import threading
 import time
+import zlib
+from concurrent.futures import Future
+from contextlib import nullcontext
 
+import numpy as np
 from ibapi.client import EClient
 from ibapi.contract import Contract
 from ibapi.wrapper import EWrapper
 
+from . import metrics
+from .backfill import backoff_delay
+from .bar_store import default_store
+from .tick_buffer import TickRing, parse_tick_string
+
+SWEEP_DTYPE = np.dtype(
+    [
+        ("grid_up", np.float64),
+        ("grid_down", np.float64),
+        ("grid_increment", np.float64),
+        ("shares", np.float64),
+        ("total_trades", np.int64),
+        ("held_shares", np.float64),
+        ("pnl", np.float64),
+        ("total_return", np.float64),
+        ("max_drawdown", np.float64),
+    ]
+)
+SWEEP_RANK_FIELDS = {"total_return": "desc", "pnl": "desc", "max_drawdown": "asc"}
+# Non-fatal IBKR messages delivered through error() besides the 2100-2199 warnings
+IBKR_WARNING_CODES = {10167}  # Displaying delayed market data
+
 
 class BacktestEngine:
     """
@@ -32,6 +60,7 @@ class BacktestEngine:
             self.grid_increment = args[4]
             self.timeframe = args[5]
             self.interval = args[6]
+            self.max_trades = None
         elif len(args) == 1 and isinstance(args[0], dict):
             cfg = args[0]
             self.ticker = cfg["ticker"]
@@ -41,23 +70,31 @@ class BacktestEngine:
             self.grid_increment = cfg["grid_increment"]
             self.timeframe = cfg["timeframe"]
             self.interval = cfg["interval"]
+            self.max_trades = cfg.get("max_trades")
         else:
             raise TypeError(
                 "BacktestEngine requires either 7 positional args or a config dict"
             )
 
-    def run(self) -> dict:
+    def grid_levels(self, base_price: float) -> np.ndarray:
+        """
+        Return the ascending grid level prices around base_price.
+        grid_down and grid_up are the number of levels below and above the base.
+        Levels at or below zero are dropped.
+        """
+        steps = np.arange(-int(self.grid_down), int(self.grid_up) + 1)
+        levels = base_price + steps * float(self.grid_increment)
+        return levels[levels > 0]
+
+    def run(self, bars=None) -> dict:
         """
         Simulate grid trading using historical data.
+        bars may be a dict of OHLCV arrays, a NumPy structured array or a list of
+        bar dicts (see bars_to_arrays). The grid is centred on the first close.
         Returns a dictionary with trade and performance metrics.
         """
-        # Placeholder for actual historical data and simulation logic
-        trades = []
-        pnl = 0.0
-        wins = 0
-        losses = 0
-        total_trades = len(trades)
-        win_rate = wins / max(wins + losses, 1)
+        state = self._new_state()
+        trades = self._replay_chunk(state, bars) if bars is not None else []
         return {
             "ticker": self.ticker,
             "shares": self.shares,
@@ -67,16 +104,466 @@ class BacktestEngine:
             "timeframe": self.timeframe,
             "interval": self.interval,
             "trades": trades,
-            "performance": {
-                "total_trades": total_trades,
-                "pnl": round(pnl, 2),
-                "win_rate": round(win_rate, 2),
-                "wins": wins,
-                "losses": losses,
-            },
+            "performance": self._performance(state),
             "result": "success",
         }
 
+    def run_stream(self, chunks):
+        """
+        Simulate grid trading over an iterable of bar chunks (any format accepted
+        by run) without materializing the whole history. Grid levels, holdings
+        and totals carry across chunks, so the final snapshot matches run() over
+        the concatenated bars. Yields one snapshot per chunk with the trades filled
+        in that chunk and cumulative performance.
+        """
+        state = self._new_state()
+        for chunk in chunks:
+            trades = self._replay_chunk(state, chunk)
+            yield {
+                "ticker": self.ticker,
+                "bars_processed": state["bars_processed"],
+                "trades": trades,
+                "performance": self._performance(state),
+                "result": "success",
+            }
+
+    def _new_state(self) -> dict:
+        """Return empty replay state carried between bar chunks."""
+        return {
+            "levels": None,
+            "bucket": 0,
+            "held": None,
+            "last_close": None,
+            "bars_processed": 0,
+            "total_trades": 0,
+            "realized_pnl": 0.0,
+            "wins": 0,
+            "losses": 0,
+            "capital": 0.0,
+            "last_equity": None,
+            "peak_equity": None,
+            "max_drawdown": 0.0,
+            "moments": np.zeros(4),
+            "traded_notional": 0.0,
+        }
+
+    def _replay_chunk(self, state: dict, bars) -> list:
+        """Replay one chunk of bars on top of state. Returns the chunk's trades."""
+        columns = self.bars_to_arrays(bars)
+        closes = columns.get("close")
+        if closes is None or len(closes) == 0:
+            return []
+        if state["levels"] is None:
+            if self.grid_increment > 0:
+                state["levels"] = self.grid_levels(float(closes[0]))
+            else:
+                state["levels"] = np.zeros(0)
+            state["held"] = np.zeros(max(len(state["levels"]) - 1, 0), dtype=bool)
+            state["bucket"] = int(np.searchsorted(state["levels"], closes[0], "right"))
+            state["capital"] = float(state["levels"][:-1].sum() * self.shares)
+        levels = state["levels"]
+        state["bars_processed"] += len(closes)
+        state["last_close"] = float(closes[-1])
+        buckets = np.searchsorted(levels, closes, side="right")
+        previous = state["bucket"]
+        state["bucket"] = int(buckets[-1])
+        remaining = None
+        if self.max_trades is not None:
+            remaining = max(self.max_trades - state["total_trades"], 0)
+        held = state["held"].copy()
+        bar_idx, slot, is_buy = _grid_fills(np.concatenate(([previous], buckets)), held)
+        bar_idx -= 1
+        if remaining is not None and len(bar_idx) > remaining:
+            bar_idx, slot, is_buy = (
+                bar_idx[:remaining],
+                slot[:remaining],
+                is_buy[:remaining],
+            )
+            held = state["held"].copy()
+            last = len(slot) - 1 - np.unique(slot[::-1], return_index=True)[1]
+            held[slot[last]] = is_buy[last]
+        start_levels = levels[:-1][state["held"]]
+        state["held"] = held
+        prices = np.where(is_buy, levels[slot], levels[slot + 1])
+        round_trips = (levels[slot + 1] - levels[slot])[~is_buy] * self.shares
+        self._track_equity(
+            state,
+            closes,
+            _pnl_curve(closes, levels, bar_idx, slot, is_buy)
+            + len(start_levels) * closes
+            - start_levels.sum(),
+        )
+        state["wins"] += int(np.count_nonzero(round_trips > 0))
+        state["losses"] += int(np.count_nonzero(round_trips < 0))
+        state["realized_pnl"] += float(round_trips.sum())
+        state["traded_notional"] += float(prices.sum() * self.shares)
+        first_id = state["total_trades"] + 1
+        state["total_trades"] += len(bar_idx)
+        times = columns.get("time")
+        stamps = times[bar_idx].astype(str).tolist() if times is not None else None
+        return [
+            {
+                "id": first_id + i,
+                "ticker": self.ticker,
+                "shares": int(self.shares),
+                "price": round(price, 4),
+                "side": "buy" if buy else "sell",
+                "timestamp": stamps[i] if stamps is not None else None,
+            }
+            for i, (price, buy) in enumerate(zip(prices.tolist(), is_buy.tolist()))
+        ]
+
+    def _track_equity(self, state: dict, closes, unit_pnl):
+        """
+        Fold one chunk's equity curve into the running drawdown and return moments.
+        unit_pnl is the chunk's per-share pnl on top of the realized pnl so far.
+        """
+        equity = metrics.equity_curve(
+            state["realized_pnl"] + unit_pnl * self.shares, state["capital"]
+        )
+        previous = state["last_equity"]
+        series = equity if previous is None else np.concatenate(([previous], equity))
+        state["moments"] += metrics.return_moments(metrics.period_returns(series))
+        drawdown = float(metrics.max_drawdown(equity, peak=state["peak_equity"]))
+        state["max_drawdown"] = max(state["max_drawdown"], drawdown)
+        chunk_peak = float(equity.max())
+        state["peak_equity"] = max(state["peak_equity"] or chunk_peak, chunk_peak)
+        state["last_equity"] = float(equity[-1])
+
+    def _performance(self, state: dict) -> dict:
+        """Build the performance dict from replay state, marking holdings to market."""
+        realized_pnl = state["realized_pnl"]
+        held_shares = 0
+        unrealized = 0.0
+        if state["held"] is not None and state["held"].any():
+            held_levels = state["levels"][:-1][state["held"]]
+            held_shares = int(held_levels.size * self.shares)
+            unrealized = float((state["last_close"] - held_levels).sum() * self.shares)
+        wins, losses = state["wins"], state["losses"]
+        capital = state["capital"]
+        periods = metrics.periods_per_year(self.interval)
+        total_return = metrics.total_return(
+            [capital, capital + realized_pnl + unrealized]
+        )
+        return {
+            "total_trades": state["total_trades"],
+            "pnl": round(realized_pnl + unrealized, 2),
+            "realized_pnl": round(realized_pnl, 2),
+            "held_shares": held_shares,
+            "win_rate": round(wins / max(wins + losses, 1), 2),
+            "wins": wins,
+            "losses": losses,
+            "total_return": round(float(total_return), 4),
+            "max_drawdown": round(state["max_drawdown"], 4),
+            "sharpe_ratio": round(
+                float(metrics.sharpe_from_moments(state["moments"], periods)), 4
+            ),
+            "sortino_ratio": round(
+                float(metrics.sortino_from_moments(state["moments"], periods)), 4
+            ),
+            "turnover": round(
+                float(metrics.turnover(state["traded_notional"], capital)), 4
+            ),
+        }
+
+    def sweep(
+        self, bars, grid_up=None, grid_down=None, grid_increment=None, shares=None
+    ) -> np.ndarray:
+        """
+        Evaluate every combination of grid_up, grid_down, grid_increment and shares
+        over one price series. Each argument may be a scalar, a sequence or a
+        {"start", "stop", "step"} dict (stop inclusive); None uses the engine's value.
+        Slots are independent, so each increment is replayed once on the widest
+        grid and every up/down window is read off prefix sums over slot boundaries.
+        Returns a structured array with SWEEP_DTYPE fields, one row per config.
+        """
+        columns = self.bars_to_arrays(bars)
+        closes = columns["close"]
+        ups = sweep_values(self.grid_up if grid_up is None else grid_up)
+        downs = sweep_values(self.grid_down if grid_down is None else grid_down)
+        increments = sweep_values(
+            self.grid_increment if grid_increment is None else grid_increment
+        )
+        share_counts = sweep_values(self.shares if shares is None else shares)
+        if np.any(increments <= 0):
+            raise ValueError("grid_increment values must be positive")
+        table = np.zeros(
+            len(increments) * len(downs) * len(ups) * len(share_counts),
+            dtype=SWEEP_DTYPE,
+        )
+        grid = np.stack(
+            np.meshgrid(increments, downs, ups, share_counts, indexing="ij"), -1
+        ).reshape(-1, 4)
+        table["grid_increment"] = grid[:, 0]
+        table["grid_down"] = grid[:, 1]
+        table["grid_up"] = grid[:, 2]
+        table["shares"] = grid[:, 3]
+        per_increment = len(downs) * len(ups) * len(share_counts)
+        for i, increment in enumerate(increments):
+            stats = _window_stats(closes, float(increment), downs, ups)
+            rows = table[i * per_increment : (i + 1) * per_increment]
+            for field in ("total_trades", "max_drawdown", "total_return"):
+                rows[field] = np.repeat(stats[field].ravel(), len(share_counts))
+            unit_pnl = np.repeat(stats["pnl"].ravel(), len(share_counts))
+            unit_held = np.repeat(stats["held"].ravel(), len(share_counts))
+            rows["pnl"] = unit_pnl * rows["shares"]
+            rows["held_shares"] = unit_held * rows["shares"]
+        return table
+
+    @staticmethod
+    def rank_sweep(table: np.ndarray, by: str = "total_return", limit=None):
+        """
+        Sort a sweep table best first: descending total_return or pnl,
+        ascending max_drawdown. Optionally keep the top limit rows.
+        """
+        if by not in SWEEP_RANK_FIELDS:
+            raise ValueError(f"Cannot rank sweep by {by!r}")
+        order = np.argsort(table[by], kind="stable")
+        if SWEEP_RANK_FIELDS[by] == "desc":
+            order = order[::-1]
+        return table[order[:limit]]
+
+    def walk_forward(
+        self,
+        bars,
+        train_bars: int,
+        test_bars: int,
+        grid_up=None,
+        grid_down=None,
+        grid_increment=None,
+        shares=None,
+        rank_by: str = "total_return",
+    ) -> dict:
+        """
+        Walk-forward optimization over rolling windows of one price series.
+        Each in-sample window of train_bars picks the best config from the sweep
+        ranges (same specs as sweep) by total_return or pnl, which is then replayed
+        on the following test_bars; windows advance by test_bars and the
+        out-of-sample pnl is stitched into one equity curve.
+        Grids are centred on the nearest level of a lattice anchored at the first
+        close, so every window of an increment shares one set of level crossings.
+        Crossings are summarised once per block of gcd(train_bars, test_bars) bars
+        and each in-sample window is composed from its blocks, so overlapping
+        windows never re-simulate bars.
+        """
+        if rank_by not in ("total_return", "pnl"):
+            raise ValueError("walk_forward ranks by total_return or pnl")
+        if train_bars <= 0 or test_bars <= 0:
+            raise ValueError("train_bars and test_bars must be positive")
+        closes = self.bars_to_arrays(bars)["close"]
+        ups = sweep_values(self.grid_up if grid_up is None else grid_up)
+        downs = sweep_values(self.grid_down if grid_down is None else grid_down)
+        increments = sweep_values(
+            self.grid_increment if grid_increment is None else grid_increment
+        )
+        share_counts = sweep_values(self.shares if shares is None else shares)
+        if np.any(increments <= 0):
+            raise ValueError("grid_increment values must be positive")
+        block = math.gcd(train_bars, test_bars)
+        lattices = [
+            _lattice_blocks(closes, float(inc), int(downs.max()), int(ups.max()), block)
+            for inc in increments
+        ]
+        windows = []
+        equity = []
+        offset = 0.0
+        total_trades = 0
+        for start in range(0, len(closes) - train_bars - test_bars, test_bars):
+            split = start + train_bars
+            scores = []
+            for lattice in lattices:
+                stats = _lattice_window(
+                    lattice, closes, start, split, block, downs, ups
+                )
+                scores.append(stats)
+            unit = np.stack([stats[rank_by] for stats in scores])
+            score = unit[..., None] * (share_counts if rank_by == "pnl" else 1.0)
+            score = np.broadcast_to(score, unit.shape + share_counts.shape)
+            i, d, u, n = np.unravel_index(np.argmax(score), score.shape)
+            lattice = lattices[i]
+            best_shares = float(share_counts[n])
+            lo, hi = _lattice_slots(lattice, closes[split], downs[d], ups[u])
+            test = closes[split : split + test_bars + 1]
+            levels = lattice["levels"][lo : hi + 1]
+            buckets = np.searchsorted(levels, test, side="right")
+            fills = _grid_fills(buckets, np.zeros(max(hi - lo, 0), dtype=bool))
+            curve = _pnl_curve(test, levels, *fills) * best_shares
+            equity.append(offset + curve[1:])
+            offset += float(curve[-1])
+            total_trades += len(fills[0])
+            windows.append(
+                {
+                    "train_start": start,
+                    "train_end": split,
+                    "test_start": split,
+                    "test_end": split + test_bars,
+                    "grid_up": float(ups[u]),
+                    "grid_down": float(downs[d]),
+                    "grid_increment": float(increments[i]),
+                    "shares": best_shares,
+                    "in_sample_pnl": float(scores[i]["pnl"][d, u] * best_shares),
+                    "in_sample_return": float(scores[i]["total_return"][d, u]),
+                    "oos_pnl": float(curve[-1]),
+                    "oos_trades": len(fills[0]),
+                }
+            )
+        return {
+            "ticker": self.ticker,
+            "train_bars": train_bars,
+            "test_bars": test_bars,
+            "rank_by": rank_by,
+            "windows": windows,
+            "equity": np.concatenate(equity) if equity else np.zeros(0),
+            "performance": {"pnl": round(offset, 2), "total_trades": total_trades},
+            "result": "success",
+        }
+
+    def robustness(
+        self,
+        bars,
+        n_paths: int = 1000,
+        block_size: int = 30,
+        n_bars=None,
+        seed=None,
+        batch_size: int = 2_000_000,
+    ) -> dict:
+        """
+        Evaluate this grid config on n_paths block-bootstrap resamples of the
+        series (see bootstrap_paths). All paths are replayed together as one 2-D
+        computation, in batches of about batch_size bars to bound memory.
+        Returns P5/P50/P95 and mean of total_return, max_drawdown, sharpe_ratio
+        and pnl. Raises ValueError for fewer than two closes or no paths.
+        """
+        closes = self.bars_to_arrays(bars)["close"]
+        if len(closes) < 2:
+            raise ValueError("closes must contain at least two prices")
+        if n_paths < 1:
+            raise ValueError("n_paths must be at least 1")
+        rng = np.random.default_rng(seed)
+        n_bars = len(closes) - 1 if n_bars is None else n_bars
+        levels = self.grid_levels(float(closes[0]))
+        n_slots = max(len(levels) - 1, 0)
+        capital = float(levels[:n_slots].sum())
+        rows_per_batch = max(1, batch_size // (n_bars + 1))
+        periods = metrics.periods_per_year(self.interval)
+        outcomes = {
+            "total_return": [],
+            "max_drawdown": [],
+            "sharpe_ratio": [],
+            "pnl": [],
+        }
+        for first in range(0, n_paths, rows_per_batch):
+            count = min(rows_per_batch, n_paths - first)
+            paths = self.bootstrap_paths(closes, count, block_size, n_bars, rng)
+            buckets = np.searchsorted(levels, paths, side="right")
+            held = np.zeros((count, n_slots), dtype=bool)
+            fills = _grid_fills(buckets, held)
+            pnl = _pnl_curve(paths, levels, *fills)
+            equity = metrics.equity_curve(pnl, capital)
+            returns = metrics.period_returns(equity)
+            outcomes["total_return"].append(metrics.total_return(equity))
+            outcomes["max_drawdown"].append(metrics.max_drawdown(equity))
+            outcomes["sharpe_ratio"].append(metrics.sharpe_ratio(returns, periods))
+            outcomes["pnl"].append(pnl[:, -1] * self.shares)
+        summary = {}
+        for name, values in outcomes.items():
+            values = np.concatenate(values)
+            p5, p50, p95 = np.percentile(values, [5, 50, 95])
+            summary[name] = {
+                "p5": float(p5),
+                "p50": float(p50),
+                "p95": float(p95),
+                "mean": float(values.mean()),
+            }
+        return {
+            "ticker": self.ticker,
+            "n_paths": n_paths,
+            "block_size": block_size,
+            "n_bars": n_bars,
+            **summary,
+            "result": "success",
+        }
+
+    @staticmethod
+    def bootstrap_paths(closes, n_paths: int, block_size: int, n_bars: int, rng=None):
+        """
+        Resample closes into n_paths price paths of n_bars steps using a moving
+        block bootstrap of log returns: random blocks of block_size consecutive
+        returns are concatenated, preserving short-range autocorrelation and
+        volatility clustering. Every path starts at closes[0].
+        Returns an (n_paths, n_bars + 1) array. Raises ValueError for fewer
+        than two closes, which leave no returns to resample.
+        """
+        if len(closes) < 2:
+            raise ValueError("closes must contain at least two prices")
+        rng = np.random.default_rng(rng)
+        returns = np.diff(np.log(np.asarray(closes, dtype=np.float64)))
+        block_size = max(1, min(block_size, len(returns)))
+        n_blocks = -(-n_bars // block_size)
+        starts = rng.integers(0, len(returns) - block_size + 1, (n_paths, n_blocks))
+        index = (starts[:, :, None] + np.arange(block_size)).reshape(n_paths, -1)
+        steps = returns[index[:, :n_bars]]
+        log_paths = np.concatenate((np.zeros((n_paths, 1)), steps.cumsum(axis=1)), 1)
+        return float(closes[0]) * np.exp(log_paths)
+
+    @staticmethod
+    def bars_to_arrays(bars) -> dict:
+        """
+        Normalize bars into a dict of NumPy columns (time, open, high, low, close, volume).
+        Accepts a dict of array-likes, a NumPy structured array or a list of bar dicts
+        as produced by IBApp.historicalData ("date" is mapped to "time").
+        """
+        if isinstance(bars, np.ndarray) and bars.dtype.names:
+            source = {name: bars[name] for name in bars.dtype.names}
+        elif isinstance(bars, dict):
+            source = bars
+        else:
+            bars = list(bars)
+            keys = bars[0].keys() if bars else ()
+            source = {key: [bar[key] for bar in bars] for key in keys}
+        columns = {}
+        for key, values in source.items():
+            name = "time" if key == "date" else key
+            if name in ("open", "high", "low", "close"):
+                columns[name] = np.asarray(values, dtype=np.float64)
+            elif name == "volume":
+                columns[name] = np.asarray(values, dtype=np.int64)
+            elif name == "time":
+                columns[name] = np.asarray(values)
+        return columns
+
+    @staticmethod
+    def stored_bars(ticker: str, bar_size: str, duration: str, store=None) -> dict:
+        """
+        Load the latest duration of ticker's bar_size bars from the local bar store
+        (default_store() unless store is given) as NumPy columns. Falls back to
+        synthetic_bars when nothing is stored for the ticker.
+        """
+        records = (store or default_store()).read_last(ticker, bar_size, duration)
+        if len(records) == 0:
+            return BacktestEngine.synthetic_bars(ticker)
+        return BacktestEngine.bars_to_arrays(records)
+
+    @staticmethod
+    def synthetic_bars(ticker: str, base_price: float = 170.0, n_bars: int = 390):
+        """
+        Generate a reproducible one-session random walk of minute bars for ticker.
+        Used as the bar source until historical data is wired into the API.
+        """
+        rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+        closes = base_price * np.exp(np.cumsum(rng.normal(0.0, 0.0005, n_bars)))
+        opens = np.concatenate(([base_price], closes[:-1]))
+        wick = np.abs(rng.normal(0.0, 0.0003, (2, n_bars))) * closes
+        return {
+            "time": np.datetime64("2025-09-12T09:30:00")
+            + np.arange(n_bars).astype("timedelta64[m]"),
+            "open": opens,
+            "high": np.maximum(opens, closes) + wick[0],
+            "low": np.minimum(opens, closes) - wick[1],
+            "close": closes,
+            "volume": rng.integers(1000, 20000, n_bars),
+        }
+
     @staticmethod
     def _frange(start, stop, step):
         """Range generator for floats."""
@@ -88,6 +575,11 @@ class BacktestEngine:
     def request_historical_data_ibkr(cfg: dict):
         """Request historical data from IBKR API. Returns a list of bars.
         cfg should contain: app_instance, contract_instance, end_date_time, duration_str, bar_size_setting, what_to_show, use_rth, max_retries.
+        If cfg has a bar_store (see bar_store.BarStore), received bars are saved to it
+        under the contract symbol. If cfg has a pacer (see backfill.TokenBucket), each
+        attempt waits for a token; errors are retried with exponential backoff.
+        If cfg has a breaker (see breakers.CircuitBreaker), each attempt goes
+        through it and its CircuitOpenError is raised to the caller.
         """
         app_instance = cfg["app_instance"]
         contract_instance = cfg["contract_instance"]
@@ -97,95 +589,445 @@ class BacktestEngine:
         what_to_show = cfg.get("what_to_show", "TRADES")
         use_rth = cfg.get("use_rth", 1)
         max_retries = cfg.get("max_retries", 3)
-        req_id = 1
+        timeout = cfg.get("timeout", 10)
+        breaker = cfg.get("breaker")
+        guard = breaker.guard if breaker is not None else nullcontext
+        request = (
+            contract_instance,
+            end_date_time,
+            duration_str,
+            bar_size_setting,
+            what_to_show,
+            use_rth,
+        )
         for attempt in range(max_retries):
             try:
-                app_instance.historical_data = []
-                if hasattr(app_instance, "reset_historical_done"):
-                    app_instance.reset_historical_done()
-                else:
-                    app_instance.historical_done = False
-                app_instance.reqHistoricalData(
-                    req_id,
-                    contract_instance,
-                    end_date_time,
-                    duration_str,
-                    bar_size_setting,
-                    what_to_show,
-                    use_rth,
-                    1,
-                    False,
-                    [],
-                )
-                timeout = 10
-                start = time.time()
-                while (
-                    not getattr(app_instance, "historical_done", False)
-                    and time.time() - start < timeout
-                ):
-                    app_instance.run()
-                if app_instance.historical_data:
-                    result = app_instance.historical_data
-                    app_instance.historical_data = []
+                if breaker is not None:
+                    breaker.check()
+                if cfg.get("pacer") is not None:
+                    cfg["pacer"].acquire()
+                with guard():
+                    if hasattr(app_instance, "submit_historical"):
+                        req_id, future = app_instance.submit_historical(*request)
+                        try:
+                            result = future.result(timeout)
+                        except TimeoutError:
+                            app_instance.cancel_historical(req_id)
+                            result = []
+                    else:
+                        result = BacktestEngine._poll_historical(
+                            app_instance, request, timeout
+                        )
+                if result:
+                    if cfg.get("bar_store") is not None:
+                        cfg["bar_store"].write(
+                            contract_instance.symbol, bar_size_setting, result
+                        )
                     return result
                 print(
                     f"No historical data received, retrying ({attempt + 1}/{max_retries})..."
                 )
-            except (ValueError, RuntimeError) as e:
+            except (ValueError, RuntimeError, ConnectionError) as e:
                 print(f"Error requesting historical data (attempt {attempt + 1}): {e}")
-                time.sleep(2)
+                time.sleep(backoff_delay(attempt))
         print("Failed to retrieve historical data after retries.")
         return []
 
     @staticmethod
-    def request_realtime_data_ibkr(app_instance, contract_instance, max_retries=3):
-        """Request real-time market data from IBKR API. Returns a list of tick data."""
-        req_id = 2
+    def _poll_historical(app_instance, request, timeout):
+        """
+        Send a historical request on an app without per-request futures and run
+        its message loop until historicalDataEnd or timeout. Returns the bars.
+        """
+        app_instance.historical_data = []
+        if hasattr(app_instance, "reset_historical_done"):
+            app_instance.reset_historical_done()
+        else:
+            app_instance.historical_done = False
+        app_instance.reqHistoricalData(1, *request, 1, False, [])
+        start = time.time()
+        while (
+            not getattr(app_instance, "historical_done", False)
+            and time.time() - start < timeout
+        ):
+            app_instance.run()
+        result = app_instance.historical_data
+        app_instance.historical_data = []
+        return result
+
+    @staticmethod
+    def iter_historical_data_ibkr(cfg: dict, end_date_times):
+        """
+        Yield historical bars as NumPy columns one request window at a time.
+        Each entry of end_date_times (oldest first) is requested with the same cfg
+        as request_historical_data_ibkr. Feed into run_stream so only one window
+        is held in memory.
+        """
+        for end_date_time in end_date_times:
+            bars = BacktestEngine.request_historical_data_ibkr(
+                {**cfg, "end_date_time": end_date_time}
+            )
+            if bars:
+                yield BacktestEngine.bars_to_arrays(bars)
+
+    @staticmethod
+    def request_realtime_data_ibkr(
+        app_instance,
+        contract_instance,
+        max_retries=3,
+        n_ticks=5,
+        timeout=10,
+        breaker=None,
+    ):
+        """
+        Request real-time market data from IBKR API. Returns the first n_ticks
+        ticks, or whatever arrived within timeout seconds: a TICK_DTYPE array
+        (see tick_buffer) from IBApp, a list of tick dicts from other apps.
+        Each attempt goes through breaker (see breakers.CircuitBreaker) if given.
+        """
+        guard = breaker.guard if breaker is not None else nullcontext
         for attempt in range(max_retries):
             try:
-                app_instance.realtime_data = []
-                if hasattr(app_instance, "reset_realtime_done"):
-                    app_instance.reset_realtime_done()
-                else:
-                    app_instance.realtime_done = False
-                app_instance.reqMktData(req_id, contract_instance, "", False, False, [])
-                timeout = 10
-                start = time.time()
-                while (
-                    len(app_instance.realtime_data) < 5
-                    and time.time() - start < timeout
-                ):
-                    app_instance.run()
-                app_instance.cancelMktData(req_id)
-                if app_instance.realtime_data:
-                    result = app_instance.realtime_data
-                    app_instance.realtime_data = []
+                with guard():
+                    if hasattr(app_instance, "submit_market_data"):
+                        req_id, future = app_instance.submit_market_data(
+                            contract_instance, n_ticks
+                        )
+                        try:
+                            result = future.result(timeout)
+                        except TimeoutError:
+                            result = None
+                        ticks = app_instance.cancel_market_data(req_id)
+                        if result is None:
+                            result = ticks.window().copy()
+                    else:
+                        result = BacktestEngine._poll_realtime(
+                            app_instance, contract_instance, n_ticks, timeout
+                        )
+                if len(result):
                     return result
                 print(
                     f"No real-time data received, retrying ({attempt + 1}/{max_retries})..."
                 )
-            except (ValueError, RuntimeError) as e:
+            except (ValueError, RuntimeError, ConnectionError) as e:
                 print(f"Error requesting real-time data (attempt {attempt + 1}): {e}")
                 time.sleep(2)
         print("Failed to retrieve real-time data after retries.")
         return []
 
+    @staticmethod
+    def _poll_realtime(app_instance, contract_instance, n_ticks, timeout):
+        """
+        Subscribe on an app without per-request futures and run its message loop
+        until n_ticks ticks or timeout, then cancel. Returns the ticks.
+        """
+        req_id = 2
+        app_instance.realtime_data = []
+        if hasattr(app_instance, "reset_realtime_done"):
+            app_instance.reset_realtime_done()
+        else:
+            app_instance.realtime_done = False
+        app_instance.reqMktData(req_id, contract_instance, "", False, False, [])
+        start = time.time()
+        while (
+            len(app_instance.realtime_data) < n_ticks and time.time() - start < timeout
+        ):
+            app_instance.run()
+        app_instance.cancelMktData(req_id)
+        result = app_instance.realtime_data
+        app_instance.realtime_data = []
+        return result
+
+
+def _crossings(buckets: np.ndarray, n_slots: int):
+    """
+    Expand bucket changes (number of levels at or below each close, see
+    np.searchsorted) into unit level crossings. Slot j buys at level j and sells
+    at level j + 1, so a downward cross of level j is a buy for slot j and an
+    upward cross of level j + 1 is a sell for slot j. Crossings between bars
+    t - 1 and t are stamped with bar t. A 2-D array is treated as independent
+    paths, one per row, and bars are stamped with their flat index.
+    Returns time-ordered (bar index, slot, is_buy) arrays restricted to slots
+    0..n_slots - 1.
+    """
+    rows = buckets.reshape(-1, buckets.shape[-1])
+    moves = np.diff(rows, axis=1).ravel()
+    steps = np.abs(moves)
+    total = int(steps.sum())
+    if total == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0, dtype=bool)
+    flat = np.arange(rows.size).reshape(rows.shape)[:, 1:].ravel()
+    bars = np.repeat(flat, steps)
+    start = np.repeat(rows[:, :-1].ravel(), steps)
+    up = np.repeat(moves > 0, steps)
+    offset = np.arange(total) - np.repeat(np.cumsum(steps) - steps, steps)
+    level = np.where(up, start + offset, start - 1 - offset)
+    slot = np.where(up, level - 1, level)
+    valid = (slot >= 0) & (slot < n_slots)
+    return bars[valid], slot[valid], ~up[valid]
+
+
+def _grid_fills(buckets: np.ndarray, held: np.ndarray):
+    """
+    Find grid fills for a series of bucket indices. Repeated same-side crossings
+    of a slot are no-ops, so after grouping crossings by slot only side changes
+    are kept. held is the per-slot holding state before the first bar and is
+    updated in place. For a 2-D batch of paths held has one row per path.
+    Returns time-ordered (bar index, slot, is_buy) arrays.
+    """
+    n_slots = held.shape[-1]
+    bars, slot, is_buy = _crossings(buckets, n_slots)
+    key = slot + bars // buckets.shape[-1] * n_slots if buckets.ndim > 1 else slot
+    state = held.reshape(-1)
+    order = np.argsort(key, kind="stable")
+    grouped_key = key[order]
+    grouped_buy = is_buy[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = grouped_key[1:] != grouped_key[:-1]
+    previous = np.empty(len(order), dtype=bool)
+    previous[1:] = grouped_buy[:-1]
+    previous[first] = state[grouped_key[first]]
+    keep = np.sort(order[grouped_buy != previous])
+    last = np.ones(len(order), dtype=bool)
+    last[:-1] = first[1:]
+    state[grouped_key[last]] = grouped_buy[last]
+    return bars[keep], slot[keep], is_buy[keep]
+
+
+def sweep_values(spec) -> np.ndarray:
+    """Expand a sweep range spec (scalar, sequence or start/stop/step dict)."""
+    if isinstance(spec, dict):
+        step = spec.get("step", 1)
+        if step <= 0:
+            raise ValueError("Sweep range step must be positive")
+        count = int(np.floor((spec["stop"] - spec["start"]) / step + 1e-9)) + 1
+        return spec["start"] + np.arange(max(count, 0)) * step
+    return np.atleast_1d(np.asarray(spec, dtype=np.float64))
+
+
+def _window_stats(closes: np.ndarray, increment: float, downs, ups) -> dict:
+    """
+    Replay one increment on the widest grid and derive per-unit-share stats for
+    every (grid_down, grid_up) window. Returns (len(downs), len(ups)) arrays.
+    """
+    down_counts = downs.astype(np.int64)
+    up_counts = ups.astype(np.int64)
+    widest_down = int(down_counts.max())
+    levels = float(closes[0]) + np.arange(-widest_down, up_counts.max() + 1) * increment
+    dropped = int(np.count_nonzero(levels <= 0))
+    levels = levels[dropped:]
+    n_slots = max(len(levels) - 1, 0)
+    lo = np.clip(widest_down - down_counts - dropped, 0, n_slots)
+    hi = np.clip(widest_down + up_counts - dropped, 0, n_slots)
+    bounds = np.unique(np.concatenate((lo, hi)))
+    lo_col = np.searchsorted(bounds, lo)
+    hi_col = np.searchsorted(bounds, hi)
+    buckets = np.searchsorted(levels, closes, side="right")
+    bar_idx, slot, is_buy = _grid_fills(buckets, np.zeros(n_slots, dtype=bool))
+    # Between fills equity is a non-decreasing function of the close, so the
+    # drawdown path is exactly captured by each new in-segment high followed by
+    # the lowest close before the next high or fill.
+    fill_bar = np.zeros(len(closes), dtype=bool)
+    fill_bar[bar_idx] = True
+    fill_bar[0] = True
+    segment = np.cumsum(fill_bar)
+    span = float(closes.max() - closes.min()) + 1.0
+    seg_high = np.maximum.accumulate(closes + segment * span) - segment * span
+    new_run = fill_bar.copy()
+    new_run[1:] |= seg_high[1:] != seg_high[:-1]
+    starts = np.flatnonzero(new_run)
+    points = np.column_stack(
+        (seg_high[starts], np.minimum.reduceat(closes, starts))
+    ).ravel()
+    # Each fill counts towards every slot boundary above its slot, so a
+    # (run, boundary) cumulative sum gives per-boundary running totals.
+    first_bound = np.searchsorted(bounds, slot, side="right")
+    keep = first_bound < len(bounds)
+    cells = (np.searchsorted(starts, bar_idx) * len(bounds) + first_bound)[keep]
+    sign = np.where(is_buy, 1.0, -1.0)[keep]
+    n_cells = len(starts) * len(bounds)
+
+    def running_total(weights):
+        totals = np.bincount(cells, weights, minlength=n_cells)
+        totals = totals.reshape(len(starts), len(bounds)).cumsum(axis=1)
+        return np.repeat(totals.cumsum(axis=0), 2, axis=0)
+
+    held = running_total(sign)
+    trades = running_total(np.ones_like(sign))
+    realized = np.where(is_buy, 0.0, np.diff(levels)[slot])
+    pnl = held * points[:, None]
+    pnl += running_total(realized[keep])
+    pnl -= running_total(sign * levels[slot][keep])
+    level_sums = np.concatenate(([0.0], np.cumsum(levels[:n_slots])))
+    capital = level_sums[hi][None, :] - level_sums[lo][:, None]
+    peak = capital.copy()
+    max_drawdown = np.zeros(capital.shape)
+    rows_per_chunk = max(1, 2_000_000 // max(capital.size, 1))
+    for start in range(0, len(points), rows_per_chunk):
+        block = pnl[start : start + rows_per_chunk]
+        equity = metrics.equity_curve(
+            block[:, hi_col][:, None, :] - block[:, lo_col][:, :, None], capital
+        )
+        drawdown = metrics.max_drawdown(equity, axis=0, peak=peak)
+        max_drawdown = np.maximum(max_drawdown, drawdown)
+        peak = np.maximum(peak, equity.max(axis=0))
+    last = pnl[-1] + held[-1] * (float(closes[-1]) - points[-1])
+    window_pnl = last[hi_col][None, :] - last[lo_col][:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        total_return = np.where(capital > 0, window_pnl / capital, 0.0)
+    return {
+        "pnl": window_pnl,
+        "held": held[-1][hi_col][None, :] - held[-1][lo_col][:, None],
+        "total_trades": trades[-1][hi_col][None, :] - trades[-1][lo_col][:, None],
+        "total_return": total_return,
+        "max_drawdown": max_drawdown,
+    }
+
+
+def _pnl_curve(closes, levels, bar_idx, slot, is_buy) -> np.ndarray:
+    """
+    Per-bar pnl for one share per slot: realized plus holdings marked to close.
+    closes may be a 2-D batch of paths with bar_idx as flat indices.
+    """
+    closes = np.asarray(closes)
+    sign = np.where(is_buy, 1.0, -1.0)
+    realized = np.where(is_buy, 0.0, np.diff(levels)[slot])
+
+    def running(weights):
+        totals = np.bincount(bar_idx, weights, minlength=closes.size)
+        return totals.reshape(closes.shape).cumsum(axis=-1)
+
+    return running(realized) + running(sign) * closes - running(sign * levels[slot])
+
+
+def _lattice_blocks(closes, increment: float, widest_down: int, widest_up: int, block):
+    """
+    Build the level lattice for one increment over the whole series and summarise
+    its raw crossings per (block, slot): the number of same-side runs and the
+    side of the first and last crossing. Blocks own the crossings whose
+    transition starts in their block_size bars.
+    """
+    base = float(closes[0])
+    low = int(np.floor((closes.min() - base) / increment)) - widest_down
+    high = int(np.ceil((closes.max() - base) / increment)) + widest_up
+    levels = base + np.arange(low, high + 1) * increment
+    levels = levels[levels > 0]
+    n_slots = max(len(levels) - 1, 0)
+    bar_idx, slot, is_buy = _crossings(
+        np.searchsorted(levels, closes, side="right"), n_slots
+    )
+    key = ((bar_idx - 1) // block) * n_slots + slot
+    order = np.argsort(key, kind="stable")
+    key, is_buy = key[order], is_buy[order]
+    first = np.ones(len(key), dtype=bool)
+    first[1:] = key[1:] != key[:-1]
+    run_start = first.copy()
+    run_start[1:] |= is_buy[1:] != is_buy[:-1]
+    starts = np.flatnonzero(first)
+    last = np.append(starts[1:], len(key)) - 1
+    return {
+        "levels": levels,
+        "increment": increment,
+        "n_slots": n_slots,
+        "keys": key[starts],
+        "runs": np.add.reduceat(run_start, starts) if len(starts) else starts,
+        "first_buy": is_buy[starts],
+        "last_buy": is_buy[last],
+    }
+
+
+def _lattice_slots(lattice: dict, price: float, down, up):
+    """Return the slot range [lo, hi) of a grid centred on the level nearest price."""
+    levels = lattice["levels"]
+    centre = int(np.rint((price - levels[0]) / lattice["increment"]))
+    lo = np.clip(centre - np.asarray(down).astype(np.int64), 0, lattice["n_slots"])
+    hi = np.clip(centre + np.asarray(up).astype(np.int64), 0, lattice["n_slots"])
+    return lo, hi
+
+
+def _lattice_window(lattice: dict, closes, start: int, end: int, block, downs, ups):
+    """
+    Compose block summaries into per-slot fills for bars start..end starting flat,
+    then read every (grid_down, grid_up) window off slot prefix sums.
+    Returns (len(downs), len(ups)) arrays of per-share pnl and total_return.
+    """
+    n_slots = lattice["n_slots"]
+    levels = lattice["levels"]
+    first, stop = np.searchsorted(
+        lattice["keys"], [start // block * n_slots, end // block * n_slots]
+    )
+    slot = lattice["keys"][first:stop] % n_slots
+    order = np.argsort(slot, kind="stable")
+    slot = slot[order]
+    runs = lattice["runs"][first:stop][order]
+    first_buy = lattice["first_buy"][first:stop][order]
+    last_buy = lattice["last_buy"][first:stop][order]
+    # Consecutive blocks whose boundary crossings share a side merge one run
+    new_slot = np.ones(len(slot), dtype=bool)
+    new_slot[1:] = slot[1:] != slot[:-1]
+    merged = np.zeros(len(slot), dtype=bool)
+    merged[1:] = ~new_slot[1:] & (last_buy[:-1] == first_buy[1:])
+    total_runs = np.bincount(slot, runs - merged, minlength=n_slots)
+    opens_with_sell = np.zeros(n_slots, dtype=bool)
+    opens_with_sell[slot[new_slot]] = ~first_buy[new_slot]
+    last_in_slot = np.ones(len(slot), dtype=bool)
+    last_in_slot[:-1] = new_slot[1:]
+    held = np.zeros(n_slots, dtype=bool)
+    held[slot[last_in_slot]] = last_buy[last_in_slot]
+    # Starting flat a leading sell run is a no-op; fills then alternate buy/sell
+    sells = (total_runs - opens_with_sell) // 2
+    close = float(closes[end])
+    slot_levels = levels[:n_slots]
+    realized = sells * np.diff(levels)
+    marked = held * (close - slot_levels)
+    pnl_sums = np.concatenate(([0.0], np.cumsum(realized + marked)))
+    capital_sums = np.concatenate(([0.0], np.cumsum(slot_levels)))
+    lo, hi = _lattice_slots(lattice, closes[start], downs, ups)
+    pnl = pnl_sums[hi][None, :] - pnl_sums[lo][:, None]
+    capital = capital_sums[hi][None, :] - capital_sums[lo][:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        total_return = np.where(capital > 0, pnl / capital, 0.0)
+    return {"pnl": pnl, "total_return": total_return}
+
+
+class _Pending:
+    """Items collected for one IBApp request and the future they resolve."""
+
+    __slots__ = ("future", "items", "limit")
+
+    def __init__(self, limit=None):
+        self.future = Future()
+        self.items = []
+        self.limit = limit
+
 
 class IBApp(EClient, EWrapper):
     """
     IBKR API client and wrapper for historical and real-time data.
+    Requests sent with submit_historical/submit_market_data get their own
+    reqId and a future; a reader thread running the message loop routes each
+    callback to its request, so many requests can be in flight on one
+    connection. Ticks go to a fixed-size TickRing per subscription
+    (tick_buffers); other historical callbacks fill historical_data.
+    subscribe_market_data streams ticks to a listener until cancelled.
     """
 
     _active_connection = False
+    _last_port = None  # Port of the last successful connection, tried first
     _used_client_ids = set()
     _client_id_lock = threading.Lock()
 
     def __init__(self):
         super().__init__(self)
         self.historical_data = []
-        self.realtime_data = []
         self.historical_done = False
-        self.realtime_done = False
+        self.tick_buffers = {}  # reqId -> TickRing
+        self.tick_listeners = {}  # reqId -> listener(req_id, ring)
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._req_ids = itertools.count(1000)
+        self._reader = None
 
     def wait_for_disconnect(self, timeout: float = 2.0):
         """Wait for IBKR socket disconnect with timeout."""
@@ -193,38 +1035,203 @@ class IBApp(EClient, EWrapper):
         while self.isConnected() and time.time() - start < timeout:
             time.sleep(0.1)
 
+    def start_reader(self):
+        """Start the thread running the message loop, unless it is already running."""
+        if self._reader is None or not self._reader.is_alive():
+            self._reader = threading.Thread(
+                target=self.run, name="ibapp-reader", daemon=True
+            )
+            self._reader.start()
+
+    def _register(self, limit=None):
+        """Allocate a reqId with a pending future. Returns (req_id, pending)."""
+        pending = _Pending(limit)
+        with self._pending_lock:
+            req_id = next(self._req_ids)
+            self._pending[req_id] = pending
+        return req_id, pending
+
+    def _collect(self, req_id, item) -> bool:
+        """Add item to request req_id, resolving it at its limit. False if not pending."""
+        with self._pending_lock:
+            pending = self._pending.get(req_id)
+            if pending is None:
+                return False
+            pending.items.append(item)
+            if pending.limit is None or len(pending.items) < pending.limit:
+                return True
+            del self._pending[req_id]
+        pending.future.set_result(pending.items)
+        return True
+
+    def _finish(self, req_id, error=None) -> bool:
+        """Resolve request req_id with its items, or fail it with error. False if not pending."""
+        with self._pending_lock:
+            pending = self._pending.pop(req_id, None)
+        if pending is None:
+            return False
+        if error is None:
+            pending.future.set_result(pending.items)
+        else:
+            pending.future.set_exception(error)
+        return True
+
+    def submit_historical(
+        self,
+        contract,
+        end_date_time="",
+        duration_str="1 D",
+        bar_size_setting="1 min",
+        what_to_show="TRADES",
+        use_rth=1,
+    ):
+        """
+        Send a historical data request. Returns (req_id, future); the future
+        resolves to the list of bars on historicalDataEnd or fails on an error.
+        """
+        if self.isConnected():
+            self.start_reader()
+        req_id, pending = self._register()
+        try:
+            self.reqHistoricalData(
+                req_id,
+                contract,
+                end_date_time,
+                duration_str,
+                bar_size_setting,
+                what_to_show,
+                use_rth,
+                1,
+                False,
+                [],
+            )
+        except Exception:
+            self._finish(req_id)
+            raise
+        return req_id, pending.future
+
+    def cancel_historical(self, req_id):
+        """Cancel historical request req_id and drop its future."""
+        if self._finish(req_id):
+            self.cancelHistoricalData(req_id)
+
+    def submit_market_data(self, contract, n_ticks=5):
+        """
+        Subscribe to market data. Ticks stream into tick_buffer(req_id).
+        Returns (req_id, future); the future resolves to a copy of the first
+        n_ticks ticks. Stop the subscription with cancel_market_data.
+        """
+        if self.isConnected():
+            self.start_reader()
+        req_id, pending = self._register(limit=n_ticks)
+        self.tick_buffers[req_id] = TickRing()
+        try:
+            self.reqMktData(req_id, contract, "", False, False, [])
+        except Exception:
+            self._finish(req_id)
+            raise
+        return req_id, pending.future
+
+    def subscribe_market_data(self, contract, listener) -> int:
+        """
+        Subscribe to market data until cancel_market_data. Every tick is
+        appended to tick_buffer(req_id), then listener(req_id, ring) is called
+        on the reader thread. Returns req_id.
+        """
+        if self.isConnected():
+            self.start_reader()
+        with self._pending_lock:
+            req_id = next(self._req_ids)
+        self.tick_buffers[req_id] = TickRing()
+        self.tick_listeners[req_id] = listener
+        try:
+            self.reqMktData(req_id, contract, "", False, False, [])
+        except Exception:
+            self.tick_listeners.pop(req_id, None)
+            self.tick_buffers.pop(req_id, None)
+            raise
+        return req_id
+
+    def cancel_market_data(self, req_id):
+        """Cancel market data subscription req_id. Returns its TickRing (None if unknown)."""
+        self._finish(req_id)
+        self.tick_listeners.pop(req_id, None)
+        self.cancelMktData(req_id)
+        return self.tick_buffers.pop(req_id, None)
+
+    def tick_buffer(self, req_id):
+        """Return the TickRing of live subscription req_id, or None."""
+        return self.tick_buffers.get(req_id)
+
     def historicalData(self, reqId, bar):
         """Callback for historical data bar from IBKR API."""
-        self.historical_data.append(
-            {
-                "date": bar.date,
-                "open": bar.open,
-                "high": bar.high,
-                "low": bar.low,
-                "close": bar.close,
-                "volume": bar.volume,
-            }
-        )
+        row = {
+            "date": bar.date,
+            "open": bar.open,
+            "high": bar.high,
+            "low": bar.low,
+            "close": bar.close,
+            "volume": bar.volume,
+        }
+        if not self._collect(reqId, row):
+            self.historical_data.append(row)
 
     def historicalDataEnd(self, reqId, start, end):
         """Callback for end of historical data from IBKR API."""
-        self.historical_done = True
+        if not self._finish(reqId):
+            self.historical_done = True
+
+    def _tick(self, reqId, tick_type, price=math.nan, size=math.nan):
+        """
+        Append a tick to reqId's ring, notify its listener and resolve its
+        pending request once it has enough. Ticks for subscriptions that are
+        unknown or already cancelled (still in flight) are dropped.
+        """
+        ring = self.tick_buffers.get(reqId)
+        if ring is None:
+            return
+        ring.append(tick_type, price, size)
+        listener = self.tick_listeners.get(reqId)
+        if listener is not None:
+            listener(reqId, ring)
+        with self._pending_lock:
+            pending = self._pending.get(reqId)
+            if pending is None or pending.limit is None or ring.total < pending.limit:
+                return
+            del self._pending[reqId]
+        pending.future.set_result(ring.since(0, pending.limit).copy())
 
     def tickPrice(self, reqId, tickType, price, attrib):
         """Callback for tick price from IBKR API."""
-        self.realtime_data.append({"tickType": tickType, "price": price})
+        self._tick(reqId, tickType, price=price)
 
     def tickSize(self, reqId, tickType, size):
         """Callback for tick size from IBKR API."""
-        self.realtime_data.append({"tickType": tickType, "size": size})
+        self._tick(reqId, tickType, size=size)
 
     def tickString(self, reqId, tickType, value):
-        """Callback for tick string from IBKR API."""
-        self.realtime_data.append({"tickType": tickType, "value": value})
+        """Callback for tick string from IBKR API. Non-numeric values are dropped."""
+        parsed = parse_tick_string(tickType, value)
+        if parsed is not None:
+            self._tick(reqId, tickType, *parsed)
 
     def tickGeneric(self, reqId, tickType, value):
         """Callback for generic tick from IBKR API."""
-        self.realtime_data.append({"tickType": tickType, "value": value})
+        self._tick(reqId, tickType, price=value)
+
+    def error(self, reqId, errorCode, errorString, *args):
+        """Callback for IBKR errors. Fails the pending request reqId unless it is a warning."""
+        super().error(reqId, errorCode, errorString)
+        if 2100 <= errorCode < 2200 or errorCode in IBKR_WARNING_CODES:
+            return
+        self._finish(reqId, RuntimeError(f"IBKR error {errorCode}: {errorString}"))
+
+    def connectionClosed(self):
+        """Callback for a closed socket. Fails every pending request."""
+        with self._pending_lock:
+            req_ids = list(self._pending)
+        for req_id in req_ids:
+            self._finish(req_id, ConnectionError("IBKR connection closed"))
 
     @classmethod
     def get_next_client_id(cls):
@@ -260,6 +1267,9 @@ class IBApp(EClient, EWrapper):
             "tws": {"live": 7496, "paper": 7497},
         }
         ports_to_try = [port_map[mode][account_type], 4001, 4002, 7496, 7497]
+        if IBApp._last_port in ports_to_try:
+            ports_to_try.remove(IBApp._last_port)
+            ports_to_try.insert(0, IBApp._last_port)
         client_id_local = self.get_next_client_id()
         for port_local in ports_to_try:
             for attempt in range(max_retries):
@@ -271,6 +1281,8 @@ class IBApp(EClient, EWrapper):
                     self.connect("127.0.0.1", port_local, client_id_local)
                     if self.isConnected():
                         IBApp._active_connection = True
+                        IBApp._last_port = port_local
+                        self.start_reader()
                         print(f"Connected to IBKR on port {port_local}")
                         return port_local, client_id_local
                     print("Connection failed, retrying...")
@@ -0,0 +1,181 @@
+# pylint: skip-file
+"""
+Background backtest jobs. Submitted jobs run on a fixed pool of worker
+threads, off the event loop, and report progress as they replay bars in
+chunks. Finished jobs are kept for a retention period, up to a count limit,
+so clients can poll or stream their status and fetch the result.
+"""
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_WORKERS = int(os.getenv("BACKTEST_JOB_WORKERS", "2"))
+JOB_QUEUE_LIMIT = int(os.getenv("BACKTEST_JOB_QUEUE", "64"))
+JOB_RETENTION = float(os.getenv("BACKTEST_JOB_RETENTION", "3600"))
+JOB_RETAINED = int(os.getenv("BACKTEST_JOB_RETAINED", "256"))
+JOB_CHUNK_BARS = int(os.getenv("BACKTEST_JOB_CHUNK", "5000"))
+FINISHED = ("done", "failed")
+
+
+def iter_chunks(bars: dict, size: int = JOB_CHUNK_BARS):
+    """Yield consecutive slices of at most size bars from a dict of bar columns."""
+    total = len(bars["close"])
+    for start in range(0, total, size):
+        yield {name: values[start : start + size] for name, values in bars.items()}
+
+
+class BacktestJob:
+    """
+    State of one job. version increases on every change so status streams can
+    tell whether there is anything new to send.
+    """
+
+    __slots__ = (
+        "id",
+        "status",
+        "done",
+        "total",
+        "result",
+        "error",
+        "created",
+        "finished",
+        "version",
+    )
+
+    def __init__(self, job_id: str, created: float):
+        self.id = job_id
+        self.status = "queued"
+        self.done = 0
+        self.total = 0
+        self.result = None
+        self.error = None
+        self.created = created
+        self.finished = None
+        self.version = 0
+
+    @property
+    def progress(self) -> float:
+        """Fraction of the work completed, 1.0 once done."""
+        if self.status == "done":
+            return 1.0
+        return self.done / self.total if self.total else 0.0
+
+    def snapshot(self, with_result: bool = True) -> dict:
+        """Return the job state as a dict (without the result unless with_result)."""
+        state = {
+            "job_id": self.id,
+            "status": self.status,
+            "progress": round(self.progress, 4),
+            "bars_processed": self.done,
+            "total_bars": self.total,
+            "error": self.error,
+        }
+        if with_result:
+            state["result"] = self.result
+        return state
+
+
+class JobManager:
+    """
+    Runs job functions on a worker pool. A job function is called as
+    fn(*args, progress) where progress(done, total) records how far it got;
+    its return value becomes the job result and an exception fails the job.
+    """
+
+    def __init__(
+        self,
+        workers: int = JOB_WORKERS,
+        queue_limit: int = JOB_QUEUE_LIMIT,
+        retention: float = JOB_RETENTION,
+        retained: int = JOB_RETAINED,
+        clock=time.monotonic,
+    ):
+        """
+        Create a manager whose worker threads start with the first job. At most
+        retained finished jobs are kept, the oldest forgotten first.
+        """
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.retention = retention
+        self.retained = retained
+        self.clock = clock
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def submit(self, fn, *args) -> BacktestJob:
+        """
+        Queue fn(*args, progress) and return its job. Raises OverflowError when
+        queue_limit jobs are already waiting or running.
+        """
+        with self._lock:
+            self._prune()
+            active = sum(job.status not in FINISHED for job in self.jobs.values())
+            if active >= self.queue_limit:
+                raise OverflowError(f"{active} backtest jobs already pending")
+            job = BacktestJob(uuid.uuid4().hex, self.clock())
+            self.jobs[job.id] = job
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    self.workers, thread_name_prefix="backtest-job"
+                )
+            self._executor.submit(self._run, job, fn, args)
+        return job
+
+    def get(self, job_id: str):
+        """Return the job with job_id, or None if unknown or expired."""
+        return self.jobs.get(job_id)
+
+    def _run(self, job: BacktestJob, fn, args):
+        def progress(done: int, total: int):
+            job.done, job.total = done, total
+            job.version += 1
+
+        job.status = "running"
+        job.version += 1
+        try:
+            job.result = fn(*args, progress)
+            job.status = "done"
+        except Exception as e:
+            print(f"Backtest job {job.id} failed: {e}")
+            job.error = str(e)
+            job.status = "failed"
+        job.finished = self.clock()
+        job.version += 1
+
+    def _prune(self):
+        """
+        Forget jobs finished more than retention seconds ago, then the oldest
+        finished ones beyond retained. Needs _lock.
+        """
+        cutoff = self.clock() - self.retention
+        finished = sorted(
+            (job for job in self.jobs.values() if job.finished is not None),
+            key=lambda job: job.finished,
+        )
+        for i, job in enumerate(finished):
+            if job.finished < cutoff or i < len(finished) - self.retained:
+                del self.jobs[job.id]
+
+    def stats(self) -> dict:
+        """Return job counts by status."""
+        counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        for job in list(self.jobs.values()):
+            counts[job.status] += 1
+        return counts
+
+    def close(self):
+        """Cancel queued jobs and wait for running ones to finish."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        for job in list(self.jobs.values()):
+            if job.status == "queued":
+                job.error = "Cancelled at shutdown"
+                job.status = "failed"
+                job.finished = self.clock()
+                job.version += 1
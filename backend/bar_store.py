@@ -0,0 +1,323 @@
+# pylint: skip-file
+"""
+Local on-disk bar store. Bars are kept as NumPy structured arrays, one .npy file
+per ticker, bar size and trading day, and read back memory-mapped so a date
+range only touches the partitions it covers. A day is complete once its
+partition was last written on a later date in MARKET_TZ (after the session);
+today's session and days saved mid-session are not.
+"""
+
+import os
+import re
+import tempfile
+from datetime import datetime
+from operator import attrgetter, itemgetter
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+BAR_DTYPE = np.dtype(
+    [
+        ("time", "datetime64[s]"),
+        ("open", np.float64),
+        ("high", np.float64),
+        ("low", np.float64),
+        ("close", np.float64),
+        ("volume", np.int64),
+    ]
+)
+_DURATION_UNITS = {
+    "S": 1,
+    "D": 86400,
+    "W": 7 * 86400,
+    "M": 30 * 86400,
+    "Y": 365 * 86400,
+}
+# Positions of the digits in an IBKR "YYYYMMDD  HH:MM:SS" timestamp
+_IBKR_DIGITS = [0, 1, 2, 3, 4, 5, 6, 7, 10, 11, 13, 14, 16, 17]
+# Stored bar times are exchange local; sessions close by this clock
+MARKET_TZ = ZoneInfo(os.getenv("MARKET_TZ", "America/New_York"))
+_default_store = None
+
+
+def to_records(bars) -> np.ndarray:
+    """
+    Convert bars to a BAR_DTYPE array sorted by time. Accepts a structured
+    array, a dict of columns, or a list of bar dicts or objects with date/time,
+    open, high, low, close and volume (IBApp dicts, ib_insync BarData).
+    """
+    if isinstance(bars, np.ndarray) and bars.dtype.names:
+        columns = {name: bars[name] for name in bars.dtype.names}
+    elif isinstance(bars, dict):
+        columns = bars
+    else:
+        columns = bar_columns(bars)
+    times = columns["time"] if "time" in columns else columns.get("date", [])
+    records = np.zeros(len(times), dtype=BAR_DTYPE)
+    if len(records) == 0:
+        return records
+    records["time"] = parse_times(times)
+    for name in BAR_DTYPE.names[1:]:
+        records[name] = columns[name]
+    return records[np.argsort(records["time"], kind="stable")]
+
+
+def bar_columns(bars) -> dict:
+    """
+    Pull a list of bar dicts or objects apart into one typed array per field,
+    without building an intermediate dict per bar. Times are left unparsed.
+    """
+    bars = bars if isinstance(bars, (list, tuple)) else list(bars)
+    if not bars:
+        return {}
+    first = bars[0]
+    if isinstance(first, dict):
+        getter, fields = itemgetter, first.keys()
+    else:
+        getter, fields = attrgetter, dir(first)
+    time_field = "time" if "time" in fields else "date"
+    columns = {"time": list(map(getter(time_field), bars))}
+    for name in BAR_DTYPE.names[1:]:
+        columns[name] = np.fromiter(
+            map(getter(name), bars), dtype=BAR_DTYPE[name], count=len(bars)
+        )
+    return columns
+
+
+def parse_times(values) -> np.ndarray:
+    """
+    Parse bar timestamps to datetime64[s]: datetime64 arrays, datetime/date
+    objects, ISO strings and IBKR "YYYYMMDD[  HH:MM:SS[ TZ]]" strings. Time zone
+    suffixes are dropped, so times stay in exchange local time.
+    """
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype("datetime64[s]")
+    if len(values) == 0:
+        return values.astype("datetime64[s]")
+    if values.dtype.kind == "U":
+        parsed = _parse_ibkr_times(values)
+        if parsed is not None:
+            return parsed
+    elif values.dtype == object and isinstance(values[0], datetime):
+        if all(value.tzinfo is None for value in values.tolist()):
+            return values.astype("datetime64[s]")
+    parsed = []
+    for value in values.tolist():
+        if isinstance(value, datetime):
+            value = value.replace(tzinfo=None)
+        elif not isinstance(value, str):
+            value = str(value)  # datetime.date
+        if isinstance(value, str):
+            match = re.match(r"(\d{4})(\d{2})(\d{2})(?:\s+(\d{2}:\d{2}:\d{2}))?", value)
+            if match:
+                year, month, day, clock = match.groups()
+                value = f"{year}-{month}-{day}T{clock or '00:00:00'}"
+            else:
+                value = value.strip().replace(" ", "T")
+                value = re.sub(r"(T[\d:.]+)(?:Z|[+-]\d{2}:?\d{2})$", r"\1", value)
+        parsed.append(np.datetime64(value, "s"))
+    return np.array(parsed, dtype="datetime64[s]")
+
+
+def _parse_ibkr_times(text: np.ndarray):
+    """
+    Vectorized parse of IBKR "YYYYMMDD" or "YYYYMMDD  HH:MM:SS[ TZ]" strings
+    laid out at fixed positions, reading the digits straight from the string
+    buffer. Returns None if any value has another layout.
+    """
+    width = text.dtype.itemsize // 4
+    intraday = width >= 18
+    if width != 8 and not intraday:
+        return None
+    codes = text.view(np.uint32).reshape(len(text), width).astype(np.int64)
+    digits = codes[:, _IBKR_DIGITS if intraday else _IBKR_DIGITS[:8]] - ord("0")
+    if digits.min() < 0 or digits.max() > 9:
+        return None
+    if intraday and not (
+        np.all(codes[:, 8:10] == ord(" ")) and np.all(codes[:, [12, 15]] == ord(":"))
+    ):
+        return None
+    fields = [
+        digits[:, i:j] @ 10 ** np.arange(j - i - 1, -1, -1)
+        for i, j in ((0, 4), (4, 6), (6, 8), (8, 10), (10, 12), (12, 14))
+        if j <= digits.shape[1]
+    ]
+    months = ((fields[0] - 1970) * 12 + fields[1] - 1).astype("datetime64[M]")
+    times = (months.astype("datetime64[D]") + (fields[2] - 1)).astype("datetime64[s]")
+    if intraday:
+        times += (fields[3] * 3600 + fields[4] * 60 + fields[5]).astype(
+            "timedelta64[s]"
+        )
+    return times
+
+
+def parse_duration(duration: str) -> np.timedelta64:
+    """Convert an IBKR duration string ("30 S", "1 D", "2 W", "1 M", "1 Y") to seconds."""
+    match = re.fullmatch(r"\s*(\d+)\s*([SDWMY])\s*", duration.upper())
+    if not match:
+        raise ValueError(f"Invalid duration {duration!r}")
+    return np.timedelta64(int(match.group(1)) * _DURATION_UNITS[match.group(2)], "s")
+
+
+def market_today() -> np.datetime64:
+    """Return the current trading date in MARKET_TZ."""
+    return np.datetime64(datetime.now(MARKET_TZ).date(), "D")
+
+
+def market_date(timestamp: float) -> np.datetime64:
+    """Return the MARKET_TZ date of a POSIX timestamp (e.g. a file mtime)."""
+    return np.datetime64(datetime.fromtimestamp(timestamp, MARKET_TZ).date(), "D")
+
+
+def is_complete(day, stat) -> bool:
+    """True if the partition of day, with os.stat result stat, was written after day."""
+    return market_date(stat.st_mtime) > day
+
+
+def _bound(value, end: bool):
+    """Parse a range bound; a bare end date covers that whole day."""
+    if value is None:
+        return None
+    bound = np.datetime64(value)
+    if end and bound.dtype == np.dtype("datetime64[D]"):
+        return (bound + 1).astype("datetime64[s]") - np.timedelta64(1, "s")
+    return bound.astype("datetime64[s]")
+
+
+class BarStore:
+    """
+    Bars partitioned as root/<TICKER>/<bar size>/<YYYY-MM-DD>.npy.
+    Writes merge into existing day partitions (new bars win on equal times) and
+    are atomic; reads prune partitions by file name before opening any file.
+    """
+
+    def __init__(self, root: str):
+        """Create a store rooted at root. Directories are created on first write."""
+        self.root = root
+
+    def _dir(self, ticker: str, bar_size: str) -> str:
+        slug = re.sub(r"\s+", "", bar_size.lower())
+        return os.path.join(self.root, ticker.upper(), slug)
+
+    def days(self, ticker: str, bar_size: str) -> list:
+        """Return the stored trading days for ticker and bar_size, oldest first."""
+        try:
+            names = os.listdir(self._dir(ticker, bar_size))
+        except FileNotFoundError:
+            return []
+        return sorted(
+            np.datetime64(name[:-4]) for name in names if name.endswith(".npy")
+        )
+
+    def complete_days(self, ticker: str, bar_size: str) -> list:
+        """Return the stored days whose partition was written after that day, oldest first."""
+        days = self.days(ticker, bar_size)
+        stats = self.partition_stats(ticker, bar_size, days)
+        return [day for day, stat in zip(days, stats) if is_complete(day, stat)]
+
+    def partition_stats(self, ticker: str, bar_size: str, days) -> list:
+        """Return the os.stat results of the partitions of stored days."""
+        directory = self._dir(ticker, bar_size)
+        return [os.stat(os.path.join(directory, f"{day}.npy")) for day in days]
+
+    def days_between(self, ticker: str, bar_size: str, start=None, end=None) -> list:
+        """Return the stored trading days overlapping start..end (bounds as in read)."""
+        start, end = _bound(start, False), _bound(end, True)
+        days = self.days(ticker, bar_size)
+        if start is not None:
+            days = [day for day in days if day >= start.astype("datetime64[D]")]
+        if end is not None:
+            days = [day for day in days if day <= end.astype("datetime64[D]")]
+        return days
+
+    def write(self, ticker: str, bar_size: str, bars) -> int:
+        """Store bars (any format accepted by to_records). Returns the number written."""
+        records = to_records(bars)
+        if len(records) == 0:
+            return 0
+        directory = self._dir(ticker, bar_size)
+        os.makedirs(directory, exist_ok=True)
+        days = records["time"].astype("datetime64[D]")
+        bounds = np.flatnonzero(np.diff(days.astype(np.int64))) + 1
+        for part in np.split(records, bounds):
+            path = os.path.join(
+                directory, f"{part['time'][0].astype('datetime64[D]')}.npy"
+            )
+            if os.path.exists(path):
+                merged = np.concatenate((part, np.load(path)))
+                _, first = np.unique(merged["time"], return_index=True)
+                part = merged[first]
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, part)
+            os.replace(tmp, path)
+        return len(records)
+
+    def mark_empty(self, ticker: str, bar_size: str, day):
+        """Record day as having no bars (e.g. a holiday) with an empty partition."""
+        directory = self._dir(ticker, bar_size)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{np.datetime64(day, 'D')}.npy")
+        if not os.path.exists(path):
+            np.save(path, np.zeros(0, dtype=BAR_DTYPE))
+
+    def read(self, ticker: str, bar_size: str, start=None, end=None) -> np.ndarray:
+        """
+        Return stored bars with start <= time <= end as a BAR_DTYPE array.
+        start and end are dates or datetimes (strings or datetime64); a bare end
+        date includes that whole day. Only overlapping day partitions are opened.
+        A range within one day is returned as a read-only memory-mapped view, so
+        processes reading the same day share its pages instead of copying them.
+        """
+        start, end = _bound(start, False), _bound(end, True)
+        directory = self._dir(ticker, bar_size)
+        parts = []
+        for day in self.days_between(ticker, bar_size, start, end):
+            part = np.load(os.path.join(directory, f"{day}.npy"), mmap_mode="r")
+            lo = 0 if start is None else np.searchsorted(part["time"], start)
+            hi = (
+                len(part)
+                if end is None
+                else np.searchsorted(part["time"], end, "right")
+            )
+            parts.append(part[lo:hi])
+        if not parts:
+            return np.zeros(0, dtype=BAR_DTYPE)
+        if len(parts) == 1:
+            return parts[0]  # Read-only memory map shared through the page cache
+        return np.concatenate(parts)
+
+    def read_last(self, ticker: str, bar_size: str, duration: str) -> np.ndarray:
+        """
+        Return the stored bars covering duration back from the latest stored bar.
+        As in IBKR requests, "N D" means the last N trading days that have bars.
+        """
+        window = self.last_window(ticker, bar_size, duration)
+        if window is None:
+            return np.zeros(0, dtype=BAR_DTYPE)
+        return self.read(ticker, bar_size, *window)
+
+    def last_window(self, ticker: str, bar_size: str, duration: str):
+        """Return the (start, end) datetime64[s] range read by read_last, or None if empty."""
+        days = self.days(ticker, bar_size)
+        if not days:
+            return None
+        span = parse_duration(duration)
+        if duration.strip().upper().endswith("D"):
+            sessions = max(int(span // np.timedelta64(86400, "s")), 1)
+            start = days[-min(sessions, len(days))]
+            return _bound(start, False), _bound(days[-1], True)
+        last = self.read(ticker, bar_size, days[-1], days[-1])
+        end = last["time"][-1]
+        return end - span + 1, end
+
+
+def default_store() -> BarStore:
+    """Return the process-wide store rooted at BAR_STORE_DIR (default data/bars)."""
+    global _default_store
+    if _default_store is None:
+        _default_store = BarStore(
+            os.getenv("BAR_STORE_DIR", os.path.join("data", "bars"))
+        )
+    return _default_store
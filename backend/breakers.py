@@ -0,0 +1,197 @@
+# pylint: skip-file
+"""
+Circuit breakers for upstream dependencies (IBKR historical data, IBKR market
+data, the bar store). Each dependency has its own breaker, so one failing or
+slow upstream fails fast without affecting requests that don't use it.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+from .backfill import RETRY_ERRORS
+
+CB_FAILURE_THRESHOLD = int(os.getenv("CB_FAILURE_THRESHOLD", "5"))
+CB_RESET_TIMEOUT = float(os.getenv("CB_RESET_TIMEOUT", "60"))
+# p95 latency (seconds) that opens a breaker, and calls in flight beyond which
+# new calls are shed, per dependency
+BREAKER_SETTINGS = {
+    "ibkr_historical": {"latency_threshold": 8.0, "max_in_flight": 8},
+    "ibkr_market_data": {"latency_threshold": 5.0, "max_in_flight": 32},
+    "bar_store": {"latency_threshold": 2.0, "max_in_flight": 64},
+}
+_breakers = {}
+_registry_lock = threading.Lock()
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose breaker is open or saturated."""
+
+    def __init__(self, name: str, reason: str, retry_after: float):
+        super().__init__(f"{name} unavailable ({reason}), retry in {retry_after:.0f}s")
+        self.name = name
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Closed: calls pass, and failure_threshold consecutive failures or a p95
+    latency above latency_threshold (over the last window calls) open it.
+    Open: calls raise CircuitOpenError until reset_timeout has passed.
+    Half-open: one probe call is let through; success closes the breaker,
+    failure or a slow probe reopens it.
+    Independently of state, calls beyond max_in_flight are shed.
+    Only failure_types exceptions count as failures.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = CB_FAILURE_THRESHOLD,
+        reset_timeout: float = CB_RESET_TIMEOUT,
+        latency_threshold: float = None,
+        max_in_flight: int = None,
+        window: int = 100,
+        min_samples: int = 20,
+        failure_types=RETRY_ERRORS,
+        clock=time.monotonic,
+    ):
+        """Create a closed breaker; None disables the latency or in-flight limit."""
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.latency_threshold = latency_threshold
+        self.max_in_flight = max_in_flight
+        self.min_samples = min_samples
+        self.failure_types = failure_types
+        self.clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.in_flight = 0
+        self.rejected = 0
+        self.shed = 0
+        self._latencies = deque(maxlen=window)
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def check(self):
+        """Raise CircuitOpenError if a call would be rejected now, without starting one."""
+        with self._lock:
+            self._admit(probe=False)
+
+    @contextmanager
+    def guard(self):
+        """
+        Run the block as one call to the dependency. Raises CircuitOpenError
+        without running it when the breaker is open or saturated.
+        """
+        with self._lock:
+            probe = self._admit(probe=True)
+            self.in_flight += 1
+        started = self.clock()
+        try:
+            yield
+        except self.failure_types:
+            self._record(probe, False, self.clock() - started)
+            raise
+        except BaseException:
+            self._record(probe, True, None)
+            raise
+        self._record(probe, True, self.clock() - started)
+
+    def _admit(self, probe: bool) -> bool:
+        """Return whether the call is the half-open probe, or raise. Needs _lock."""
+        if self.state == "open":
+            wait = self.opened_at + self.reset_timeout - self.clock()
+            if wait > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, "open", wait)
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._probing:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, "probing", 1.0)
+            self._probing = probe
+            return probe
+        if self.max_in_flight is not None and self.in_flight >= self.max_in_flight:
+            self.shed += 1
+            raise CircuitOpenError(self.name, "overloaded", 1.0)
+        return False
+
+    def _record(self, probe: bool, ok: bool, elapsed):
+        with self._lock:
+            self.in_flight -= 1
+            slow = (
+                elapsed is not None
+                and self.latency_threshold is not None
+                and elapsed > self.latency_threshold
+            )
+            if probe:
+                self._probing = False
+                if ok and not slow:
+                    self.state = "closed"
+                    self.failures = 0
+                    self._latencies.clear()
+                else:
+                    self._open()
+                return
+            if elapsed is not None:
+                self._latencies.append(elapsed)
+            if not ok:
+                self.failures += 1
+                if self.failures >= self.failure_threshold:
+                    self._open()
+                return
+            self.failures = 0
+            if self.state == "closed" and self._too_slow():
+                self._open()
+
+    def _too_slow(self) -> bool:
+        return (
+            self.latency_threshold is not None
+            and len(self._latencies) >= self.min_samples
+            and self.p95() > self.latency_threshold
+        )
+
+    def _open(self):
+        self.state = "open"
+        self.opened_at = self.clock()
+
+    def p95(self) -> float:
+        """95th percentile latency of recent calls in seconds (0.0 before any call)."""
+        if not self._latencies:
+            return 0.0
+        return float(np.percentile(np.fromiter(self._latencies, float), 95))
+
+    def stats(self) -> dict:
+        """Return state, counters and p95 latency."""
+        with self._lock:
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "in_flight": self.in_flight,
+                "rejected": self.rejected,
+                "shed": self.shed,
+                "p95": round(self.p95(), 4),
+            }
+
+
+def breaker(name: str) -> CircuitBreaker:
+    """Return the process-wide breaker for dependency name, creating it on first use."""
+    with _registry_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, **BREAKER_SETTINGS.get(name, {}))
+        return _breakers[name]
+
+
+def breaker_stats() -> dict:
+    """Return stats of every breaker created so far, by name."""
+    with _registry_lock:
+        breakers = dict(_breakers)
+    return {name: cb.stats() for name, cb in breakers.items()}
@@ -3,15 +3,80 @@
 Grid trading bot logic for U.S. stocks under $1
 """
 
-from decimal import ROUND_DOWN, Decimal
+import heapq
+import math
+from array import array
+
+import numpy as np
+
+BUY = 1
+SELL = 2
+SIDE_CODES = {"buy": BUY, "sell": SELL}
+SIDE_NAMES = {code: side for side, code in SIDE_CODES.items()}
+
+
+class PositionBook:
+    """
+    Fixed-size position book keyed by integer grid level index.
+    Sides and share counts live in preallocated arrays, so occupancy checks and
+    updates are O(1) and allocate nothing.
+    """
+
+    __slots__ = ("sides", "shares")
+
+    def __init__(self, num_levels: int):
+        """Allocate an empty book for num_levels grid levels."""
+        self.sides = array("b", bytes(num_levels))
+        self.shares = array("q", bytes(8 * num_levels))
+
+    def __len__(self) -> int:
+        return len(self.sides)
+
+    def is_occupied(self, level: int) -> bool:
+        """Return True if a position is recorded at level."""
+        return self.sides[level] != 0
+
+    def set(self, level: int, side_code: int, shares: int):
+        """Record a position of shares at level."""
+        self.sides[level] = side_code
+        self.shares[level] = shares
+
+    def clear(self, level: int):
+        """Remove the position at level."""
+        self.sides[level] = 0
+        self.shares[level] = 0
+
+    def grow(self, before: int, after: int):
+        """Add empty levels below and above, in place. Existing levels shift up by before."""
+        self.sides[0:0] = array("b", bytes(before))
+        self.shares[0:0] = array("q", bytes(8 * before))
+        self.sides.extend(bytes(after))
+        self.shares.extend(array("q", bytes(8 * after)))
+
+    def occupied(self):
+        """Yield (level, side_code, shares) for every occupied level."""
+        for level, side_code in enumerate(self.sides):
+            if side_code:
+                yield level, side_code, self.shares[level]
+
+
+def _config_price(grid_config: dict, name: str, alias: str) -> float:
+    """Return grid_config[name], or grid_config[alias] if only the alias is given."""
+    return grid_config[name] if name in grid_config else grid_config[alias]
 
 
 class GridBot:
     """
     Implements dynamic grid trading logic for U.S. stocks under $1.
+    Grid levels start out from grid_down to grid_up in steps of grid_increment
+    and grow when an order lands outside them; positions are tracked per level
+    index in a PositionBook. Orders rest in per-side heaps of level indices
+    until a bar's range reaches them.
     """
 
-    positions: dict
+    book: PositionBook
+    buy_orders: list
+    sell_orders: list
     trades: list
 
     def __init__(
@@ -21,53 +86,205 @@ class GridBot:
         Initialize the grid trading bot with ticker, shares, grid config dict,
         and decimal precision.
         grid_config should contain keys: grid_up, grid_down, grid_increment.
+        grid_up and grid_down are the prices of the initial grid (unlike
+        BacktestEngine's level counts) and may be given as upper_price and
+        lower_price instead.
         """
         self.ticker = ticker
         self.shares = shares
         self.decimal_places = decimal_places
-        self.grid_up = self.round_to(grid_config["grid_up"])
-        self.grid_down = self.round_to(grid_config["grid_down"])
+        self.scale = 10**decimal_places
+        self.grid_up = self.round_to(
+            _config_price(grid_config, "grid_up", "upper_price")
+        )
+        self.grid_down = self.round_to(
+            _config_price(grid_config, "grid_down", "lower_price")
+        )
         self.grid_increment = self.round_to(grid_config["grid_increment"])
-        self.positions = {}
+        self.lower_ticks = self.to_ticks(self.grid_down)
+        self.step_ticks = self.to_ticks(self.grid_increment)
+        if self.step_ticks <= 0:
+            raise ValueError("grid_increment must be at least one price tick")
+        if self.grid_up < self.grid_down:
+            raise ValueError("grid_up must not be below grid_down")
+        num_levels = (self.to_ticks(self.grid_up) - self.lower_ticks) // self.step_ticks
+        self.level_prices = [
+            (self.lower_ticks + level * self.step_ticks) / self.scale
+            for level in range(num_levels + 1)
+        ]
+        self.book = PositionBook(len(self.level_prices))
+        self.resting = array("b", bytes(len(self.level_prices)))
+        self.buy_orders = []  # max-heap of resting buy levels (negated)
+        self.sell_orders = []  # min-heap of resting sell levels
         self.trades = []
 
+    def to_ticks(self, value: float) -> int:
+        """Convert a price to whole ticks at decimal_places, rounding down."""
+        return int(value * self.scale + 1e-9) if value >= 0 else -self.to_ticks(-value)
+
     def round_to(self, value: float) -> float:
-        """Round a value to the specified number of decimal places."""
-        format_str = "0." + "0" * self.decimal_places
-        return float(Decimal(value).quantize(Decimal(format_str), rounding=ROUND_DOWN))
+        """Round a value down to the specified number of decimal places."""
+        return self.to_ticks(value) / self.scale
+
+    def level_index(self, price: float):
+        """Return the grid level index at or below price, or None if off the grid."""
+        offset = self.to_ticks(price) - self.lower_ticks
+        if offset < 0:
+            return None
+        level = offset // self.step_ticks
+        return level if level < len(self.level_prices) else None
 
     def place_order(self, price: float, side: str):
         """
-        Execute a limit buy or sell order at the given price and side.
-        Avoids duplicate grid positions and enforces max shares per grid.
-        Places the opposite order automatically.
-        """
-        grid_price = self.round_to(price)
-        # Check if grid is occupied and max shares not exceeded
-        if grid_price in self.positions:
-            # If already at max shares, do not place order
-            existing = self.positions.get(grid_price)
-            if isinstance(existing, dict):
-                total_shares = existing.get("shares", 0)
-            else:
-                total_shares = self.shares  # fallback for legacy
-            if total_shares >= self.shares:
-                return None  # Max shares reached at this grid
-        # Record position with shares
-        self.positions[grid_price] = {"side": side, "shares": int(self.shares)}
-        trade_obj = {
+        Rest a limit buy or sell order at the grid level at or below price,
+        growing the grid if price is outside it. Rejects duplicates of a
+        resting order and orders that would stack a second position on an
+        occupied level. Fills happen in on_bar/process_bars.
+        """
+        level = self._level(self.to_ticks(price))
+        if not self._rest(level, SIDE_CODES[side]):
+            return None
+        return {
             "ticker": self.ticker,
             "shares": int(self.shares),
-            "price": grid_price,
+            "price": self.level_prices[level],
             "side": side,
         }
-        self.trades.append(trade_obj)
-        # Place opposite order automatically
-        if side == "buy":
-            self.place_order(grid_price + self.grid_increment, "sell")
-        elif side == "sell":
-            self.place_order(grid_price - self.grid_increment, "buy")
-        return trade_obj
+
+    def _level(self, ticks: int) -> int:
+        """
+        Return the index of the level at or below ticks, adding levels first
+        if it is off the grid. Arrays and heaps are updated in place.
+        """
+        level = (ticks - self.lower_ticks) // self.step_ticks
+        if level < 0:
+            shift = -level
+            self.lower_ticks -= shift * self.step_ticks
+            self.level_prices[0:0] = [
+                (self.lower_ticks + i * self.step_ticks) / self.scale
+                for i in range(shift)
+            ]
+            self.book.grow(shift, 0)
+            self.resting[0:0] = array("b", bytes(shift))
+            # A uniform shift keeps both heaps ordered
+            self.buy_orders[:] = [order - shift for order in self.buy_orders]
+            self.sell_orders[:] = [order + shift for order in self.sell_orders]
+            return 0
+        extra = level - len(self.level_prices) + 1
+        if extra > 0:
+            top = len(self.level_prices)
+            self.level_prices.extend(
+                (self.lower_ticks + (top + i) * self.step_ticks) / self.scale
+                for i in range(extra)
+            )
+            self.book.grow(0, extra)
+            self.resting.extend(bytes(extra))
+        return level
+
+    def _rest(self, level: int, side_code: int) -> bool:
+        """Queue a resting order at level. Returns False if it was rejected."""
+        if self.resting[level] or self.book.sides[level] == side_code:
+            return False
+        self.resting[level] = side_code
+        if side_code == BUY:
+            heapq.heappush(self.buy_orders, -level)
+        else:
+            heapq.heappush(self.sell_orders, level)
+        return True
+
+    def on_bar(self, high: float, low: float, bar=None) -> list:
+        """
+        Match resting orders against one bar's high and low.
+        Buys at or above low and sells at or below high fill at their limit price.
+        Opposite orders are queued and can fill from the next bar on.
+        Returns the trades filled in this bar.
+        """
+        low_ticks = math.ceil(low * self.scale - 1e-9)
+        high_ticks = self.to_ticks(high)
+        min_buy = -((self.lower_ticks - low_ticks) // self.step_ticks)
+        max_sell = (high_ticks - self.lower_ticks) // self.step_ticks
+        first = len(self.trades)
+        self._match(min_buy, max_sell, bar)
+        return self.trades[first:]
+
+    def process_bars(self, highs, lows) -> list:
+        """
+        Match resting orders against arrays of bar highs and lows in order.
+        Level thresholds are computed for all bars at once; the per-bar loop only
+        compares integers against the heap tops. Returns the trades filled.
+        """
+        highs = np.asarray(highs, dtype=np.float64)
+        lows = np.asarray(lows, dtype=np.float64)
+        high_ticks = np.floor(highs * self.scale + 1e-9).astype(np.int64)
+        low_ticks = np.ceil(lows * self.scale - 1e-9).astype(np.int64)
+        lower_ticks = self.lower_ticks
+        min_buys = (-((lower_ticks - low_ticks) // self.step_ticks)).tolist()
+        max_sells = ((high_ticks - lower_ticks) // self.step_ticks).tolist()
+        first = len(self.trades)
+        buy_orders, sell_orders = self.buy_orders, self.sell_orders
+        for bar in range(len(min_buys)):
+            if self.lower_ticks != lower_ticks:  # Grid grew downwards: re-index
+                shift = (lower_ticks - self.lower_ticks) // self.step_ticks
+                lower_ticks = self.lower_ticks
+                min_buys = [level + shift for level in min_buys]
+                max_sells = [level + shift for level in max_sells]
+            min_buy, max_sell = min_buys[bar], max_sells[bar]
+            if (buy_orders and -buy_orders[0] >= min_buy) or (
+                sell_orders and sell_orders[0] <= max_sell
+            ):
+                self._match(min_buy, max_sell, bar)
+        return self.trades[first:]
+
+    def _match(self, min_buy: int, max_sell: int, bar):
+        """Fill every resting buy at level >= min_buy and sell at level <= max_sell."""
+        book, resting = self.book, self.resting
+        queued = []
+        while self.buy_orders and -self.buy_orders[0] >= min_buy:
+            level = -heapq.heappop(self.buy_orders)
+            resting[level] = 0
+            # A buy one level below a short lot closes it; otherwise it opens a long
+            if level + 1 < len(book) and book.sides[level + 1] == SELL:
+                book.clear(level + 1)
+            else:
+                book.set(level, BUY, int(self.shares))
+            queued.append((level + 1, SELL))
+            self._record(level, "buy", bar)
+        while self.sell_orders and self.sell_orders[0] <= max_sell:
+            level = heapq.heappop(self.sell_orders)
+            resting[level] = 0
+            # A sell one level above a long lot closes it; otherwise it opens a short
+            if level > 0 and book.sides[level - 1] == BUY:
+                book.clear(level - 1)
+            else:
+                book.set(level, SELL, int(self.shares))
+            queued.append((level - 1, BUY))
+            self._record(level, "sell", bar)
+        # As prices, since resting one may add levels below and shift indices
+        base, step = self.lower_ticks, self.step_ticks
+        for level, side_code in queued:
+            self._rest(self._level(base + level * step), side_code)
+
+    def _record(self, level: int, side: str, bar):
+        """Append a filled trade."""
+        self.trades.append(
+            {
+                "ticker": self.ticker,
+                "shares": int(self.shares),
+                "price": self.level_prices[level],
+                "side": side,
+                "bar": bar,
+            }
+        )
+
+    def get_open_orders(self):
+        """
+        Return resting orders as (price, side) pairs, lowest price first.
+        """
+        return [
+            (self.level_prices[level], SIDE_NAMES[code])
+            for level, code in enumerate(self.resting)
+            if code
+        ]
 
     def get_trades(self):
         """
@@ -77,6 +294,9 @@ class GridBot:
 
     def get_positions(self):
         """
-        Return the current grid positions.
+        Return the current grid positions keyed by level price.
         """
-        return self.positions
+        return {
+            self.level_prices[level]: {"side": SIDE_NAMES[code], "shares": shares}
+            for level, code, shares in self.book.occupied()
+        }
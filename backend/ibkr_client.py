@@ -9,23 +9,36 @@ from ib_insync import IB, ScannerSubscription, Stock
 class IBKRClient:
     """Client for Interactive Brokers API using ib_insync."""
 
-    def __init__(self):
-        """Initialize IBKRClient and set up connection state."""
+    def __init__(self, bar_store=None):
+        """
+        Initialize IBKRClient and set up connection state.
+        If bar_store is given, fetched historical bars are saved to it.
+        """
         self.ib = IB()
         self.connected = False
+        self.bar_store = bar_store
 
-    def get_us_stock_tickers(self, scan_code="TOP_PERC_GAIN", limit=50):
-        """Fetch a list of US stock tickers using IBKR's market scanner."""
+    def get_us_stock_tickers(
+        self, scan_code="TOP_PERC_GAIN", limit=50, above_price=None, below_price=None
+    ):
+        """
+        Fetch a list of US stock tickers using IBKR's market scanner, optionally
+        limited to prices above above_price and/or below below_price.
+        """
         if not self.connected:
             self.connect()
         subscription = ScannerSubscription(
-            limit,  # numberOfRows
-            scan_code,  # scanCode
-            "STK",  # instrument
-            "STK.US.MAJOR",  # locationCode
+            numberOfRows=limit,
+            instrument="STK",
+            locationCode="STK.US.MAJOR",
+            scanCode=scan_code,
         )
+        if above_price is not None:
+            subscription.abovePrice = above_price
+        if below_price is not None:
+            subscription.belowPrice = below_price
         scan_results = self.ib.reqScannerData(subscription)
-        tickers = [row.contract.symbol for row in scan_results]
+        tickers = [row.contractDetails.contract.symbol for row in scan_results]
         return tickers
 
     def connect(self, host="127.0.0.1", port=4002, client_id=1):
@@ -56,10 +69,14 @@ class IBKRClient:
         """Return True if currently connected to IBKR, False otherwise."""
         return self.connected
 
-    def get_historical_data(self, ticker, duration, bar_size):
+    def is_alive(self):
+        """Return True if connected and the socket to IBKR is still up."""
+        return self.connected and self.ib.isConnected()
+
+    def get_historical_data(self, ticker, duration, bar_size, end_date_time=""):
         """
         Retrieve historical market data for the given ticker using the specified
-        duration and bar size.
+        duration and bar size, ending at end_date_time ("" for now).
         """
         if not self.connected:
             print("Not connected to IBKR. " "Call connect() first.")
@@ -67,13 +84,15 @@ class IBKRClient:
         stock = Stock(ticker, "SMART", "USD")
         bars = self.ib.reqHistoricalData(
             stock,
-            endDateTime="",
+            endDateTime=end_date_time,
             durationStr=duration,
             barSizeSetting=bar_size,
             whatToShow="TRADES",
             useRTH=True,
             formatDate=1,
         )
+        if bars and self.bar_store is not None:
+            self.bar_store.write(ticker, bar_size, bars)
         return bars
 
     def disconnect(self):
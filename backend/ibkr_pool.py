@@ -0,0 +1,265 @@
+# pylint: skip-file
+"""
+Pool of long-lived IBKR sessions. Each session is an IBKRClient connected once
+with its own client ID from IBApp's allocator. Requests check out the least
+recently used healthy session, so concurrent requests spread across
+connections, and a background thread reconnects sessions that dropped.
+ib_insync runs the event loop of the calling thread and its connection is
+bound to that loop, so each session's client lives on its own thread (see
+LoopBoundClient) and may be used from any thread.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from .backfill import RETRY_ERRORS, TokenBucket, backoff_delay
+from .backtest import IBApp
+from .ibkr_client import IBKRClient
+
+IBKR_HOST = os.getenv("IBKR_HOST", "127.0.0.1")
+IBKR_PORT = int(os.getenv("IBKR_PORT", "4002"))
+IBKR_POOL_SIZE = int(os.getenv("IBKR_POOL_SIZE", "4"))
+_default_pool = None
+
+
+class LoopBoundClient:
+    """
+    Proxy running every method call of a client on one dedicated thread that
+    owns an asyncio event loop. The client itself is built on that thread.
+    Plain attributes are read and set on the client directly.
+    """
+
+    def __init__(self, factory, name: str = "ibkr-session"):
+        """Start the thread and build the client with factory() on it."""
+        self._executor = ThreadPoolExecutor(
+            1, thread_name_prefix=name, initializer=self._init_loop
+        )
+        self._client = self._call(factory)
+
+    @staticmethod
+    def _init_loop():
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    def _call(self, fn, *args, **kwargs):
+        return self._executor.submit(fn, *args, **kwargs).result()
+
+    def __getattr__(self, name):
+        value = getattr(self._client, name)
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            return self._call(value, *args, **kwargs)
+
+        return call
+
+    def __setattr__(self, name, value):
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._client, name, value)
+
+    def close(self):
+        """Stop the thread and close its event loop."""
+        self._call(lambda: asyncio.get_event_loop().close())
+        self._executor.shutdown()
+
+
+class _Session:
+    """One pooled connection: its client, client ID and state (idle, busy or down)."""
+
+    __slots__ = ("client", "client_id", "state", "failures", "retry_at")
+
+    def __init__(self, client, client_id: int):
+        self.client = client
+        self.client_id = client_id
+        self.state = "down"
+        self.failures = 0
+        self.retry_at = 0.0
+
+
+class IBKRSessionPool:
+    """
+    Fixed set of IBKR sessions shared by all requests. session() lends a
+    connected client to one caller at a time; sessions found dead on return or
+    by the periodic health check are reconnected with exponential backoff.
+    All sessions share one historical-data pacing bucket.
+    """
+
+    def __init__(
+        self,
+        size: int = IBKR_POOL_SIZE,
+        host: str = IBKR_HOST,
+        port: int = IBKR_PORT,
+        client_factory=IBKRClient,
+        health_interval: float = 30.0,
+        bucket=None,
+        clock=time.monotonic,
+    ):
+        """Create an unstarted pool of size sessions built by client_factory()."""
+        self.size = size
+        self.host = host
+        self.port = port
+        self.client_factory = client_factory
+        self.health_interval = health_interval
+        self.bucket = bucket or TokenBucket()
+        self.clock = clock
+        self.sessions = []
+        self._idle = deque()
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = None
+
+    def start(self):
+        """Allocate client IDs, connect every session and start the health checker."""
+        while len(self.sessions) < self.size:
+            client_id = IBApp.get_next_client_id()
+            client = LoopBoundClient(
+                self.client_factory, name=f"ibkr-session-{client_id}"
+            )
+            self.sessions.append(_Session(client, client_id))
+        self.check_health()
+        if self._thread is None and self.health_interval:
+            self._thread = threading.Thread(
+                target=self._run, name="ibkr-pool-health", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    @contextmanager
+    def session(self, timeout: float = 30.0):
+        """
+        Check out a connected client for one request. Raises TimeoutError if no
+        session frees up within timeout. A connection error inside the block
+        marks the session down for reconnection.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._idle or self._closed, timeout):
+                raise TimeoutError("No IBKR session available")
+            if self._closed:
+                raise RuntimeError("IBKR session pool is closed")
+            session = self._idle.popleft()
+            session.state = "busy"
+        healthy = True
+        try:
+            yield session.client
+        except RETRY_ERRORS:
+            healthy = False
+            raise
+        finally:
+            self._release(session, healthy and session.client.is_alive())
+
+    def _release(self, session: _Session, healthy: bool):
+        with self._cond:
+            if healthy and not self._closed:
+                session.state = "idle"
+                self._idle.append(session)
+                self._cond.notify()
+                return
+            session.state = "down"
+        self._wake.set()
+
+    def check_health(self) -> int:
+        """
+        Mark idle sessions whose socket dropped as down and reconnect down
+        sessions whose backoff has elapsed. Returns the number of idle sessions.
+        """
+        with self._cond:
+            for session in list(self._idle):
+                if not session.client.is_alive():
+                    self._idle.remove(session)
+                    session.state = "down"
+            now = self.clock()
+            due = [
+                session
+                for session in self.sessions
+                if session.state == "down" and session.retry_at <= now
+            ]
+            for session in due:
+                session.state = "connecting"
+        for session in due:
+            alive = self._reconnect(session)
+            with self._cond:
+                if alive and not self._closed:
+                    session.state = "idle"
+                    self._idle.append(session)
+                    self._cond.notify()
+                else:
+                    session.state = "down"
+        with self._cond:
+            return len(self._idle)
+
+    def _reconnect(self, session: _Session) -> bool:
+        """(Re)connect one session under its own client ID. Returns True if it is up."""
+        try:
+            if session.client.is_connected():
+                session.client.disconnect()
+            session.client.connect(self.host, self.port, client_id=session.client_id)
+        except RETRY_ERRORS as e:
+            print(f"IBKR session {session.client_id} failed to connect: {e}")
+        if session.client.is_alive():
+            session.failures = 0
+            return True
+        session.retry_at = self.clock() + backoff_delay(session.failures)
+        session.failures += 1
+        return False
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.health_interval)
+            self._wake.clear()
+            if not self._closed:
+                self.check_health()
+
+    def stats(self) -> dict:
+        """Return session counts by state."""
+        with self._cond:
+            counts = {"size": len(self.sessions), "idle": 0, "busy": 0, "down": 0}
+            for session in self.sessions:
+                state = "down" if session.state == "connecting" else session.state
+                counts[state] += 1
+            return counts
+
+    def close(self):
+        """Stop the health checker, disconnect every session and release the client IDs."""
+        with self._cond:
+            self._closed = True
+            self._idle.clear()
+            self._cond.notify_all()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for session in self.sessions:
+            if session.client.is_connected():
+                session.client.disconnect()
+            session.client.close()
+            IBApp.release_client_id(session.client_id)
+        self.sessions.clear()
+
+
+def default_pool():
+    """Return the pool started with the app, or None outside the app lifespan."""
+    return _default_pool
+
+
+def start_default_pool(size: int = IBKR_POOL_SIZE):
+    """Start the process-wide pool (no-op when size is 0). Returns it."""
+    global _default_pool
+    if _default_pool is None and size > 0:
+        _default_pool = IBKRSessionPool(size).start()
+    return _default_pool
+
+
+def close_default_pool():
+    """Close the process-wide pool, if one was started."""
+    global _default_pool
+    if _default_pool is not None:
+        _default_pool.close()
+        _default_pool = None
@@ -0,0 +1,496 @@
+# pylint: skip-file
+"""
+Local stand-in for TWS/IB Gateway. Speaks enough of the IBKR socket protocol
+(handshake, startApi, historical data, market data, scanner and the requests
+ib_insync sends while connecting) for IBKRClient, IBApp and
+check_ibkr_connection.py to connect, and replays stored or synthetic bars and
+ticks with configurable latency, pacing violations and disconnects.
+
+    python -m backend.ibkr_simulator --port 4002 --latency 0.2 --pacing 60/600
+    python -m backend.ibkr_simulator --bench --latency 0.2
+"""
+
+import asyncio
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .bar_store import BAR_DTYPE, BarStore, parse_duration
+
+# Both ibapi (v100..157) and ib_insync (v157..176) accept this server version
+SERVER_VERSION = 157
+ACCOUNT = "DU0000000"
+SESSION_START = 9 * 3600 + 30 * 60
+SESSION_SECONDS = 390 * 60
+_BAR_SIZE_UNITS = {"sec": 1, "min": 60, "hour": 3600, "day": 86400}
+_PACING_MESSAGE = (
+    "Historical Market Data Service error message:"
+    "Historical data request pacing violation"
+)
+_SCAN_SYMBOLS = ("AAPL", "MSFT", "NVDA", "TSLA", "AMD", "SNDL", "NAKD", "ZOM")
+
+
+def bar_seconds(bar_size: str) -> int:
+    """Return the length in seconds of an IBKR bar size ("1 min", "5 mins", "1 day")."""
+    count, unit = bar_size.split()
+    return int(count) * _BAR_SIZE_UNITS[unit.rstrip("s")]
+
+
+def synthetic_session(symbol: str, bar_size: str, day) -> np.ndarray:
+    """
+    Reproducible random-walk bars for one regular trading session of symbol,
+    as a BAR_DTYPE array. The same symbol, bar size and day always give the
+    same bars, whatever window they are requested in.
+    """
+    seconds = bar_seconds(bar_size)
+    day = np.datetime64(day, "D")
+    rng = np.random.default_rng(zlib.crc32(f"{symbol}|{bar_size}|{day}".encode()))
+    base = 0.5 + zlib.crc32(symbol.encode()) % 300
+    n = max(SESSION_SECONDS // seconds, 1)
+    closes = base * np.exp(np.cumsum(rng.normal(0.0, 0.0005 * seconds**0.5, n)))
+    opens = np.concatenate(([base], closes[:-1]))
+    wick = np.abs(rng.normal(0.0, 0.0003, (2, n))) * closes
+    bars = np.zeros(n, dtype=BAR_DTYPE)
+    start = day.astype("datetime64[s]")
+    if seconds < 86400:
+        start += np.timedelta64(SESSION_START, "s")
+    bars["time"] = start + np.arange(n) * np.timedelta64(seconds, "s")
+    bars["open"] = opens
+    bars["high"] = np.maximum(opens, closes) + wick[0]
+    bars["low"] = np.minimum(opens, closes) - wick[1]
+    bars["close"] = closes
+    bars["volume"] = rng.integers(100, 20000, n)
+    return bars
+
+
+def _encode_bars(bars: np.ndarray, daily: bool) -> bytes:
+    """Encode bars as historicalData fields: date, OHLC, volume, WAP, bar count."""
+    stamps = np.datetime_as_string(bars["time"], unit="s").tolist()
+    fields = []
+    for stamp, o, h, lo, c, v in zip(
+        stamps,
+        bars["open"].tolist(),
+        bars["high"].tolist(),
+        bars["low"].tolist(),
+        bars["close"].tolist(),
+        bars["volume"].tolist(),
+    ):
+        date = stamp[:4] + stamp[5:7] + stamp[8:10]
+        if not daily:
+            date += "  " + stamp[11:]
+        fields.append(
+            f"{date}\0{o:.4f}\0{h:.4f}\0{lo:.4f}\0{c:.4f}\0{v}\0{(h + lo + c) / 3:.4f}\0{max(v // 100, 1)}\0"
+        )
+    return "".join(fields).encode()
+
+
+class _Connection:
+    """State of one client socket."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.client_id = None
+        self.historical_requests = 0
+        self.tasks = {}  # reqId -> streaming or delayed reply task
+
+    def send(self, *fields):
+        payload = "".join(f"{field}\0" for field in fields).encode()
+        self.writer.write(struct.pack(">I", len(payload)) + payload)
+
+    def send_raw(self, head: tuple, body: bytes):
+        payload = "".join(f"{field}\0" for field in head).encode() + body
+        self.writer.write(struct.pack(">I", len(payload)) + payload)
+
+
+class GatewaySimulator:
+    """
+    Threaded asyncio TCP server imitating IB Gateway on host:port (port 0
+    picks a free one). Historical requests are answered from store (a
+    BarStore) where it has the day, else from synthetic_session.
+
+    latency: seconds before each historical reply
+    tick_interval: seconds between ticks on each market data subscription
+    pacing: (max_requests, window_seconds); historical requests beyond it get
+        error 162 like IBKR's pacing violations
+    disconnect_after: drop a connection when it sends this many historical
+        requests (the last one is never answered)
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        store=None,
+        latency: float = 0.0,
+        tick_interval: float = 0.05,
+        pacing=None,
+        disconnect_after=None,
+        server_version: int = SERVER_VERSION,
+    ):
+        """Create a stopped simulator. Call start() to listen."""
+        self.host = host
+        self.port = port
+        self.store = store
+        self.latency = latency
+        self.tick_interval = tick_interval
+        self.pacing = pacing
+        self.disconnect_after = disconnect_after
+        self.server_version = server_version
+        self.stats = {
+            "connections": 0,
+            "historical_requests": 0,
+            "bars": 0,
+            "ticks": 0,
+            "pacing_errors": 0,
+            "disconnects": 0,
+        }
+        self._connections = set()
+        self._client_ids = set()
+        self._requests = deque()
+        self._encoded = {}  # (symbol, bar size, day) -> (n bars, encoded fields)
+        self._loop = None
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        """Start listening in a background thread. Returns self once the port is bound."""
+        self._loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        self._thread = threading.Thread(
+            target=self._serve, args=(ready,), name="ibkr-simulator", daemon=True
+        )
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def _serve(self, ready):
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle, self.host, self.port)
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        ready.set()
+        self._loop.run_forever()
+        self._loop.close()
+
+    def stop(self):
+        """Close every connection and the listening socket."""
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop = None
+
+    async def _shutdown(self):
+        self._server.close()
+        for conn in list(self._connections):
+            self._drop(conn)
+        await self._server.wait_closed()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def history(self, symbol: str, bar_size: str, duration: str, end_date_time=""):
+        """
+        Return [(n_bars, encoded_fields)] per session covered by an IBKR
+        duration ending at end_date_time ("" for today), oldest first.
+        """
+        end = np.datetime64(
+            (
+                f"{end_date_time[:4]}-{end_date_time[4:6]}-{end_date_time[6:8]}"
+                if end_date_time.strip()
+                else "today"
+            ),
+            "D",
+        )
+        span = parse_duration(duration)
+        sessions = max(int(np.ceil(span / np.timedelta64(86400, "s"))), 1)
+        if not duration.strip().upper().endswith(("D", "S")):
+            sessions = max(sessions * 5 // 7, 1)  # Calendar span to trading days
+        last = np.busday_offset(end, 0, roll="backward")
+        days = np.busday_offset(last, np.arange(1 - sessions, 1), roll="backward")
+        return [self._session(symbol.upper(), bar_size, day) for day in days]
+
+    def _session(self, symbol: str, bar_size: str, day):
+        key = (symbol, bar_size, day)
+        if key not in self._encoded:
+            bars = None
+            if self.store is not None:
+                bars = self.store.read(symbol, bar_size, day, day)
+            if bars is None or len(bars) == 0:
+                bars = synthetic_session(symbol, bar_size, day)
+            daily = bar_seconds(bar_size) >= 86400
+            self._encoded[key] = (len(bars), _encode_bars(bars, daily))
+        return self._encoded[key]
+
+    async def _handle(self, reader, writer):
+        conn = _Connection(writer)
+        self._connections.add(conn)
+        self.stats["connections"] += 1
+        try:
+            if await reader.readexactly(4) != b"API\0":
+                return
+            size = struct.unpack(">I", await reader.readexactly(4))[0]
+            versions = (await reader.readexactly(size)).decode()  # "v100..157 opts"
+            low, high = versions[1:].split(" ")[0].split("..")
+            if int(high) < self.server_version or int(low) > self.server_version:
+                return
+            conn.send(self.server_version, time.strftime("%Y%m%d %H:%M:%S EST"))
+            while True:
+                self._dispatch(conn, await self._read(reader))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._drop(conn)
+
+    async def _read(self, reader) -> list:
+        size = struct.unpack(">I", await reader.readexactly(4))[0]
+        return (await reader.readexactly(size)).decode().split("\0")[:-1]
+
+    def _drop(self, conn: _Connection):
+        if conn not in self._connections:
+            return
+        self._connections.discard(conn)
+        self._client_ids.discard(conn.client_id)
+        for task in conn.tasks.values():
+            task.cancel()
+        conn.writer.close()
+
+    def _dispatch(self, conn: _Connection, fields: list):
+        msg_id = int(fields[0])
+        if msg_id == 71:  # startApi
+            client_id = int(fields[2])
+            if client_id in self._client_ids:
+                conn.send(
+                    4,
+                    2,
+                    -1,
+                    326,
+                    "Unable to connect as the client id is already in use. "
+                    "Retry with a unique client id.",
+                )
+                self._drop(conn)
+                return
+            conn.client_id = client_id
+            self._client_ids.add(client_id)
+            conn.send(15, 1, ACCOUNT)
+            conn.send(9, 1, 1)
+        elif msg_id == 20:  # reqHistoricalData
+            req_id = int(fields[1])
+            conn.tasks[req_id] = self._loop.create_task(
+                self._historical(conn, req_id, fields)
+            )
+        elif msg_id in (25, 2):  # cancelHistoricalData, cancelMktData
+            task = conn.tasks.pop(int(fields[2]), None)
+            if task is not None:
+                task.cancel()
+        elif msg_id == 1:  # reqMktData
+            req_id = int(fields[2])
+            conn.tasks[req_id] = self._loop.create_task(
+                self._ticks(conn, req_id, fields[4])
+            )
+        elif msg_id == 22:  # reqScannerSubscription
+            self._scan(conn, int(fields[1]), int(fields[2]))
+        elif msg_id == 61:  # reqPositions
+            conn.send(62, 1)
+        elif msg_id == 5:  # reqOpenOrders
+            conn.send(53, 1)
+        elif msg_id == 99:  # reqCompletedOrders
+            conn.send(102)
+        elif msg_id == 6 and fields[2] == "1":  # reqAccountUpdates
+            conn.send(54, 1, ACCOUNT)
+        elif msg_id == 76:  # reqAccountUpdatesMulti
+            conn.send(74, 1, fields[2])
+        elif msg_id == 7:  # reqExecutions
+            conn.send(55, 1, fields[2])
+        elif msg_id == 49:  # reqCurrentTime
+            conn.send(49, 1, int(time.time()))
+
+    def _paced(self) -> bool:
+        """Record a historical request; False if it breaks the pacing limit."""
+        if not self.pacing:
+            return True
+        limit, window = self.pacing
+        now = time.monotonic()
+        while self._requests and now - self._requests[0] >= window:
+            self._requests.popleft()
+        if len(self._requests) >= limit:
+            return False
+        self._requests.append(now)
+        return True
+
+    async def _historical(self, conn: _Connection, req_id: int, fields: list):
+        symbol, end_date_time, bar_size, duration = (
+            fields[3],
+            fields[15],
+            fields[16],
+            fields[17],
+        )
+        self.stats["historical_requests"] += 1
+        conn.historical_requests += 1
+        try:
+            if (
+                self.disconnect_after
+                and conn.historical_requests >= self.disconnect_after
+            ):
+                self.stats["disconnects"] += 1
+                self._drop(conn)
+                return
+            if not self._paced():
+                self.stats["pacing_errors"] += 1
+                conn.send(4, 2, req_id, 162, _PACING_MESSAGE)
+                return
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            try:
+                sessions = self.history(symbol, bar_size, duration, end_date_time)
+            except (KeyError, ValueError) as e:
+                conn.send(4, 2, req_id, 321, f"Error validating request:{e}")
+                return
+            n_bars = sum(n for n, _ in sessions)
+            self.stats["bars"] += n_bars
+            conn.send_raw(
+                (17, req_id, "", "", n_bars), b"".join(body for _, body in sessions)
+            )
+        finally:
+            conn.tasks.pop(req_id, None)
+
+    async def _ticks(self, conn: _Connection, req_id: int, symbol: str):
+        """Stream last-trade ticks, replaying stored closes when there are any."""
+        prices = None
+        if self.store is not None:
+            days = self.store.days(symbol, "1 min")
+            if days:
+                prices = self.store.read(symbol, "1 min", days[-1], days[-1])["close"]
+        if prices is None or len(prices) == 0:
+            prices = synthetic_session(symbol, "1 min", "today")["close"]
+        rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+        i = 0
+        volume = 0
+        while True:
+            size = int(rng.integers(1, 50)) * 100
+            volume += size
+            conn.send(1, 6, req_id, 4, f"{prices[i % len(prices)]:.4f}", size, 0)
+            conn.send(2, 6, req_id, 8, volume)
+            self.stats["ticks"] += 1
+            i += 1
+            await asyncio.sleep(self.tick_interval)
+
+    def _scan(self, conn: _Connection, req_id: int, rows: int):
+        fields = [20, 3, req_id, 0]
+        symbols = _SCAN_SYMBOLS[: rows if rows > 0 else None]
+        for rank, symbol in enumerate(symbols):
+            fields += [rank, 1000 + rank, symbol, "STK", "", 0.0, "", "SMART"]
+            fields += ["USD", symbol, "NMS", symbol, "", "", "", ""]
+        fields[3] = len(symbols)
+        conn.send(*fields)
+
+
+def benchmark(
+    port: int,
+    concurrency=(1, 2, 4, 8),
+    requests: int = 16,
+    symbol: str = "AAPL",
+    duration: str = "1 D",
+    bar_size: str = "1 min",
+    store_dir=None,
+) -> list:
+    """
+    Fetch requests historical windows per concurrency level through IBApp on
+    one connection, optionally writing them to a BarStore at store_dir, and
+    return bars per second for each level.
+    """
+    from ibapi.contract import Contract
+
+    from .backtest import BacktestEngine, IBApp
+
+    app = IBApp()
+    app.connect("127.0.0.1", port, IBApp.get_next_client_id())
+    app.start_reader()
+    contract = Contract()
+    contract.symbol = symbol
+    contract.secType = "STK"
+    contract.exchange = "SMART"
+    contract.currency = "USD"
+    store = BarStore(store_dir) if store_dir else None
+    end = np.datetime64("today", "D")
+    results = []
+    try:
+        for level in concurrency:
+
+            def fetch(i):
+                day = np.busday_offset(end, -i, roll="backward")
+                cfg = {
+                    "app_instance": app,
+                    "contract_instance": contract,
+                    "end_date_time": f"{str(day).replace('-', '')} 23:59:59",
+                    "duration_str": duration,
+                    "bar_size_setting": bar_size,
+                    "max_retries": 1,
+                    "bar_store": store,
+                }
+                return len(BacktestEngine.request_historical_data_ibkr(cfg))
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=level) as executor:
+                bars = sum(executor.map(fetch, range(requests)))
+            seconds = time.perf_counter() - started
+            results.append(
+                {
+                    "concurrency": level,
+                    "requests": requests,
+                    "bars": bars,
+                    "seconds": round(seconds, 3),
+                    "bars_per_second": round(bars / seconds),
+                }
+            )
+    finally:
+        app.disconnect()
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4002)
+    parser.add_argument("--store", help="BarStore root to replay recorded bars")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--tick-interval", type=float, default=0.05)
+    parser.add_argument("--pacing", help="max_requests/window_seconds, e.g. 60/600")
+    parser.add_argument("--disconnect-after", type=int)
+    parser.add_argument("--bench", action="store_true")
+    parser.add_argument("--requests", type=int, default=16)
+    args = parser.parse_args()
+    simulator = GatewaySimulator(
+        args.host,
+        0 if args.bench else args.port,
+        store=BarStore(args.store) if args.store else None,
+        latency=args.latency,
+        tick_interval=args.tick_interval,
+        pacing=tuple(map(float, args.pacing.split("/"))) if args.pacing else None,
+        disconnect_after=args.disconnect_after,
+    ).start()
+    print(f"IBKR gateway simulator listening on {args.host}:{simulator.port}")
+    try:
+        if args.bench:
+            for row in benchmark(simulator.port, requests=args.requests):
+                print(row)
+        else:
+            threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(simulator.stats)
+        simulator.stop()
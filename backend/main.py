@@ -113,56 +113,48 @@ async def api_endpoint(
     return {"result": "success", "params": [param1, param2, param3, param4, param5]}
 
 
+import asyncio
 import json
 import logging
 import os
 import random
 import time
-from functools import wraps
+from contextlib import asynccontextmanager
 from typing import Optional
 
-from fastapi import FastAPI, HTTPException, Query, Request
+import numpy as np
+from fastapi import (
+    FastAPI,
+    HTTPException,
+    Query,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+)
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from prometheus_fastapi_instrumentator import Instrumentator
 from pydantic import BaseModel
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 
-"""
-Simple circuit breaker decorator for FastAPI endpoints.
-Usage: Add @circuit_breaker to any endpoint to protect against repeated failures.
-"""
-CB_FAILURE_THRESHOLD = 5
-CB_RESET_TIMEOUT = 60  # seconds
-circuit_breaker_state = {"failures": 0, "last_failure": 0, "open": False}
-
-
-def circuit_breaker(func):
-    @wraps(func)
-    async def wrapper(*args, **kwargs):
-        now = time.time()
-        if circuit_breaker_state["open"]:
-            if now - circuit_breaker_state["last_failure"] > CB_RESET_TIMEOUT:
-                circuit_breaker_state["failures"] = 0
-                circuit_breaker_state["open"] = False
-            else:
-                raise HTTPException(
-                    status_code=503, detail="Circuit breaker open. Try again later."
-                )
-        try:
-            result = await func(*args, **kwargs)
-            circuit_breaker_state["failures"] = 0
-            return result
-        except Exception as e:
-            circuit_breaker_state["failures"] += 1
-            circuit_breaker_state["last_failure"] = now
-            if circuit_breaker_state["failures"] >= CB_FAILURE_THRESHOLD:
-                circuit_breaker_state["open"] = True
-                logger.error(f"Circuit breaker tripped for {func.__name__}")
-            raise
-
-    return wrapper
-
+from . import wire
+from .backfill import RETRY_ERRORS
+from .backtest import SWEEP_DTYPE, SWEEP_RANK_FIELDS, BacktestEngine, sweep_values
+from .backtest_jobs import FINISHED, JobManager, iter_chunks
+from .bar_store import default_store, parse_duration
+from .breakers import CircuitOpenError, breaker, breaker_stats
+from .ibkr_pool import close_default_pool, default_pool, start_default_pool
+from .minute_chart import backfill_chart, chart_bars
+from .realtime_feed import RealtimeFeed
+from .response_cache import ResponseCache, partitions_fingerprint, settled
+from .result_cache import ResultCache, bar_fingerprint, params_key
+from .universe import (
+    DEFAULT_TICKERS,
+    close_default_universe,
+    default_universe,
+    start_default_universe,
+)
 
 """Main FastAPI backend for grid trading and backtest API."""
 
@@ -178,18 +170,31 @@ class ChartBar(BaseModel):
     volume: int
 
 
+class ChartColumns(BaseModel):
+    """Chart bars as parallel arrays, one entry per bar."""
+
+    time: list[str]
+    open: list[float]
+    high: list[float]
+    low: list[float]
+    close: list[float]
+    volume: list[int]
+
+
 class ChartResponse(BaseModel):
-    """Response model for chart endpoint."""
+    """Response model for chart endpoint. columnar requests fill columns instead of chart."""
 
     result: str
-    chart: list[ChartBar]
+    chart: list[ChartBar] = []
+    columns: Optional[ChartColumns] = None
 
 
 class HistoricalResponse(BaseModel):
-    """Response model for historical data endpoint."""
+    """Response model for historical data endpoint. columnar requests fill columns instead of bars."""
 
     result: str
-    bars: list[ChartBar]
+    bars: list[ChartBar] = []
+    columns: Optional[ChartColumns] = None
 
 
 class TickerListResponse(BaseModel):
@@ -232,6 +237,7 @@ class GridParams(BaseModel):
     timeframe: str
     interval: str
     max_trades: Optional[int] = 1000
+    columnar: bool = False
 
 
 class Trade(BaseModel):
@@ -251,7 +257,9 @@ class Performance(BaseModel):
     total_return: float
     max_drawdown: float
     sharpe_ratio: Optional[float] = None
+    sortino_ratio: Optional[float] = None
     win_rate: Optional[float] = None
+    turnover: Optional[float] = None
 
 
 class BacktestSummary(BaseModel):
@@ -262,16 +270,72 @@ class BacktestSummary(BaseModel):
     num_trades: int
 
 
+class TradeColumns(BaseModel):
+    """Trades as parallel arrays, one entry per trade."""
+
+    id: list[int]
+    ticker: list[str]
+    shares: list[int]
+    price: list[float]
+    side: list[str]
+    timestamp: list[Optional[str]]
+
+
 class BacktestResponse(BaseModel):
-    """Response model for backtest endpoints."""
+    """Response model for backtest endpoints. columnar requests fill trade_columns instead of trades."""
 
     result: str
-    trades: list[Trade]
+    trades: list[Trade] = []
+    trade_columns: Optional[TradeColumns] = None
     performance: dict
     heldShares: int
     summary: Optional[BacktestSummary] = None
 
 
+class SweepRange(BaseModel):
+    """Inclusive start/stop/step range for one swept grid parameter."""
+
+    start: float
+    stop: float
+    step: float = 1.0
+
+
+class SweepParams(BaseModel):
+    """Parameters for grid parameter sweep over one price series."""
+
+    ticker: str
+    timeframe: str
+    interval: str
+    grid_up: SweepRange
+    grid_down: SweepRange
+    grid_increment: SweepRange
+    shares: SweepRange
+    closes: Optional[list[float]] = None
+    sort_by: str = "total_return"
+    limit: Optional[int] = 100
+
+
+class SweepResponse(BaseModel):
+    """Response model for sweep endpoint: ranked rows of the sweep table."""
+
+    result: str
+    num_configs: int
+    columns: list[str]
+    rows: list[list[float]]
+
+
+class JobStatus(BaseModel):
+    """Status of a background backtest job; result is set once it is done."""
+
+    job_id: str
+    status: str
+    progress: float
+    bars_processed: int
+    total_bars: int
+    error: Optional[str] = None
+    result: Optional[BacktestResponse] = None
+
+
 class JsonFormatter(logging.Formatter):
     """Format logs as JSON for structured logging."""
 
@@ -310,12 +374,6 @@ from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 
 
-class Performance(BaseModel):
-    """Performance metrics for backtest results."""
-
-    # Removed password field; only metrics should be here
-
-
 class LoginResponse(BaseModel):
     """Response model for login endpoint."""
 
@@ -331,9 +389,27 @@ class ChartParams(BaseModel):
     duration: str
     bar_size: str
     frequency: str
+    columnar: bool = False
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Open the pooled IBKR sessions and start the ticker universe refresh at
+    startup; stop them, the backtest job workers and the realtime feed on
+    shutdown.
+    """
+    if not TEST_MODE:
+        await asyncio.get_running_loop().run_in_executor(None, start_default_pool)
+        start_default_universe()
+    yield
+    realtime_feed.close()
+    job_manager.close()
+    close_default_universe()
+    close_default_pool()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 # Add mock endpoint for lint compliance test
@@ -365,12 +441,50 @@ app.add_middleware(
 Instrumentator().instrument(app).expose(app)
 
 
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    """Fail fast with 503 and Retry-After while a dependency's breaker rejects calls."""
+    logger.warning("Rejected %s: %s", request.url.path, exc)
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))},
+    )
+
+
+# Serialized /backtest and /backtest/detailed responses keyed by params + bar data
+result_cache = ResultCache(
+    max_bytes=int(os.getenv("BACKTEST_CACHE_MB", "64")) * 1024 * 1024,
+    disk_dir=os.getenv("BACKTEST_CACHE_DIR") or None,
+    disk_max_bytes=int(os.getenv("BACKTEST_CACHE_DISK_MB", "256")) * 1024 * 1024,
+)
+# Serialized /api/historical and /minute_chart bodies; closed sessions never expire
+response_cache = ResponseCache()
+# Worker pool for /backtest/jobs, keeping long backtests off the event loop
+job_manager = JobManager()
+JOB_EVENT_INTERVAL = 0.25  # seconds between job status checks in /events
+JOB_KEEPALIVE = 15.0  # seconds between SSE keepalive comments
+# One upstream market-data subscription per symbol, shared by /ws/realtime clients
+realtime_feed = RealtimeFeed()
+
+
 # Health endpoint for monitoring
 @app.get("/health", response_model=dict)
 async def health() -> dict:
     """Health endpoint for monitoring."""
     logger.info("Health endpoint requested.")
-    return {"status": "healthy"}
+    status = {"status": "healthy"}
+    pool = default_pool()
+    if pool is not None:
+        status["ibkr_sessions"] = pool.stats()
+    universe = default_universe()
+    if universe is not None:
+        status["ticker_universe"] = universe.stats()
+    status["backtest_jobs"] = job_manager.stats()
+    status["breakers"] = breaker_stats()
+    status["realtime_feed"] = realtime_feed.stats()
+    status["response_cache"] = response_cache.stats()
+    return status
 
 
 @app.get("/", response_model=dict)
@@ -384,14 +498,20 @@ async def root() -> dict:
 
 
 @app.get("/api/historical", response_model=HistoricalResponse)
-@circuit_breaker
 async def get_historical(
+    request: Request,
     symbol: str = Query(..., description="Stock symbol"),
     start: str = "2025-09-01",
     end: str = "2025-09-13",
-    max_bars: int = 1000,
+    max_bars: int = Query(1000, ge=1, description="Most recent bars to return"),
+    bar_size: str = "1 min",
+    columnar: bool = False,
 ) -> HistoricalResponse:
-    """Return mock historical chart data for ticker. Protected by circuit breaker."""
+    """
+    Return stored historical chart data for ticker. Reads go through the
+    bar_store breaker. columnar=true returns parallel arrays (see wire).
+    Bodies are served from response_cache with an ETag.
+    """
     start_time = time.time()
     logger.info(
         "Historical data requested for symbol=%s, start=%s, end=%s, max_bars=%d",
@@ -403,35 +523,97 @@ async def get_historical(
     if not symbol:
         logger.warning("Missing required symbol param")
         raise HTTPException(status_code=422, detail="Missing required symbol param")
-    bars = [
-        ChartBar(
-            time="2025-09-12T09:30:00",
-            open=170.0,
-            high=171.0,
-            low=169.5,
-            close=170.5,
-            volume=10000,
-        ),
-        ChartBar(
-            time="2025-09-12T09:31:00",
-            open=170.5,
-            high=171.2,
-            low=170.0,
-            close=171.0,
-            volume=12000,
-        ),
-    ]
-    logger.info("Returning %d bars for symbol=%s", len(bars), symbol)
+    store = default_store()
+    try:
+        with breaker("bar_store").guard():
+            days = store.days_between(symbol, bar_size, start, end)
+            stats = store.partition_stats(symbol, bar_size, days)
+            key = params_key(
+                "/api/historical",
+                {
+                    "ticker": symbol,
+                    "start": start,
+                    "end": end,
+                    "max_bars": max_bars,
+                    "bar_size": bar_size,
+                    "columnar": columnar,
+                    "store": store.root,
+                },
+                partitions_fingerprint(days, stats),
+            )
+            entry = response_cache.get(key)
+            if entry is None:
+                records = store.read(symbol, bar_size, start, end)
+    except ValueError as e:
+        logger.warning("Invalid historical range: %s", e)
+        raise HTTPException(status_code=422, detail=str(e))
+    if entry is not None:
+        logger.info("Response cache hit for symbol=%s", symbol)
+    else:
+        if len(records):
+            records = records[-max_bars:]
+        else:
+            logger.info("No stored bars for symbol=%s, returning sample bars", symbol)
+            records = SAMPLE_BARS
+        if columnar:
+            body = wire.dumps(
+                {"result": "success", "bars": [], "columns": wire.bar_columns(records)}
+            )
+        else:
+            response = HistoricalResponse(result="success", bars=_chart_bars(records))
+            body = response.model_dump_json().encode()
+        entry = response_cache.put(
+            key, body, immutable=settled(days, stats, start, end)
+        )
+        logger.info("Returning %d bars for symbol=%s", len(records["time"]), symbol)
     logger.info(
         "/api/historical response time: %.3fs",
         time.time() - start_time,
     )
-    return HistoricalResponse(result="success", bars=bars)
+    return entry.respond(request)
+
+
+# Served when nothing is stored for the requested ticker
+SAMPLE_BARS = {
+    "time": np.array(
+        ["2025-09-12T09:30:00", "2025-09-12T09:31:00"], dtype="datetime64[s]"
+    ),
+    "open": np.array([170.0, 170.5]),
+    "high": np.array([171.0, 171.2]),
+    "low": np.array([169.5, 170.0]),
+    "close": np.array([170.5, 171.0]),
+    "volume": np.array([10000, 12000]),
+}
+
+
+def _chart_columns(records) -> dict:
+    """Convert BAR_DTYPE fields (array or dict of columns) to JSON-ready lists."""
+    return {
+        "time": records["time"].astype("datetime64[s]").astype(str).tolist(),
+        "open": records["open"].tolist(),
+        "high": records["high"].tolist(),
+        "low": records["low"].tolist(),
+        "close": records["close"].tolist(),
+        "volume": records["volume"].tolist(),
+    }
+
+
+def _chart_bars(records) -> list:
+    """Build ChartBar models from BAR_DTYPE fields (array or dict of columns)."""
+    columns = _chart_columns(records)
+    return [
+        ChartBar(time=t, open=o, high=h, low=lo, close=c, volume=v)
+        for t, o, h, lo, c, v in zip(*columns.values())
+    ]
 
 
 @app.post("/minute_chart", response_model=ChartResponse)
-async def minute_chart(params: ChartParams) -> ChartResponse:
-    """Return mock minute chart data for ticker."""
+async def minute_chart(params: ChartParams, request: Request) -> ChartResponse:
+    """
+    Return minute chart data for ticker from the local bar store, served from
+    response_cache with an ETag. When the IBKR pool is running, trading days of
+    the window missing from the store are backfilled first.
+    """
     start_time = time.time()
     logger.info(
         "Minute chart requested for ticker=%s, duration=%s, bar_size=%s, frequency=%s",
@@ -440,34 +622,111 @@ async def minute_chart(params: ChartParams) -> ChartResponse:
         params.bar_size,
         params.frequency,
     )
-    chart = [
-        ChartBar(
-            time="2025-09-12T09:30:00",
-            open=170.0,
-            high=171.0,
-            low=169.5,
-            close=170.5,
-            volume=10000,
-        ),
-        ChartBar(
-            time="2025-09-12T09:31:00",
-            open=170.5,
-            high=171.2,
-            low=170.0,
-            close=171.0,
-            volume=12000,
-        ),
-    ]
-    logger.info("Returning %d chart bars for ticker=%s", len(chart), params.ticker)
+    store = default_store()
+    pool = default_pool()
+    try:
+        if pool is not None:
+            # Fill missing days before the cache key is built from the partitions
+            await asyncio.get_running_loop().run_in_executor(
+                None,
+                backfill_chart,
+                params.ticker,
+                params.duration,
+                params.bar_size,
+                store,
+                pool,
+            )
+        with breaker("bar_store").guard():
+            # The window is set by the stored days; only its own days shape the body
+            window = store.last_window(params.ticker, params.bar_size, params.duration)
+            days = (
+                []
+                if window is None
+                else store.days_between(params.ticker, params.bar_size, *window)
+            )
+            stats = store.partition_stats(params.ticker, params.bar_size, days)
+            key = params_key(
+                "/minute_chart",
+                {**params.model_dump(), "store": store.root},
+                partitions_fingerprint(days, stats),
+            )
+            entry = response_cache.get(key)
+            if entry is None:
+                columns = chart_bars(
+                    params.ticker,
+                    params.duration,
+                    params.bar_size,
+                    params.frequency,
+                    store=store,
+                )
+    except ValueError as e:
+        logger.warning("Invalid minute chart params: %s", e)
+        raise HTTPException(status_code=422, detail=str(e))
+    if entry is not None:
+        logger.info("Response cache hit for ticker=%s", params.ticker)
+    else:
+        if not len(columns["time"]):
+            logger.info(
+                "No stored bars for ticker=%s, returning sample bars", params.ticker
+            )
+            columns = SAMPLE_BARS
+        if params.columnar:
+            body = wire.dumps(
+                {"result": "success", "chart": [], "columns": wire.bar_columns(columns)}
+            )
+        else:
+            response = ChartResponse(result="success", chart=_chart_bars(columns))
+            body = response.model_dump_json().encode()
+        # A window relative to the latest stored bar can always move on
+        entry = response_cache.put(key, body, immutable=False)
+        logger.info(
+            "Returning %d chart bars for ticker=%s",
+            len(columns["time"]),
+            params.ticker,
+        )
     logger.info(
         "/minute_chart response time: %.3fs",
         time.time() - start_time,
     )
-    return ChartResponse(result="success", chart=chart)
+    return entry.respond(request)
+
+
+def _stored_bars(params) -> dict:
+    """
+    Load the bars for params' ticker, interval and timeframe through the
+    bar_store breaker. An unsupported timeframe is a 422.
+    """
+    try:
+        parse_duration(params.timeframe)
+    except ValueError as e:
+        logger.warning("Invalid timeframe: %s", e)
+        raise HTTPException(status_code=422, detail=str(e))
+    with breaker("bar_store").guard():
+        return BacktestEngine.stored_bars(
+            params.ticker, params.interval, params.timeframe
+        )
+
+
+def _cached_backtest(cached: bytes, params: GridParams, request: Request) -> Response:
+    """Send a cached backtest body, compressed when it is columnar."""
+    if params.columnar:
+        return wire.encoded_response(cached, request)
+    return Response(content=cached, media_type="application/json")
+
+
+def _columnar_backtest(
+    payload: dict, trades: list, cache_key: str, request: Request
+) -> Response:
+    """Cache and send a backtest result with trade_columns in place of Trade rows."""
+    body = wire.dumps(
+        {**payload, "trades": [], "trade_columns": wire.trade_columns(trades)}
+    )
+    result_cache.put(cache_key, body)
+    return wire.encoded_response(body, request)
 
 
 @app.post("/backtest", response_model=BacktestResponse)
-async def run_backtest(params: GridParams) -> BacktestResponse:
+async def run_backtest(params: GridParams, request: Request) -> BacktestResponse:
     """Run grid trading backtest and return results."""
     start_time = time.time()
     logger.info(
@@ -483,115 +742,297 @@ async def run_backtest(params: GridParams) -> BacktestResponse:
         params.max_trades,
     )
 
-    # Implement actual grid trading logic
-    base_price = 170.0  # Starting price for simulation
-    trades = []
-    trade_id = 1
-    held_shares = 0
-    total_invested = 0.0
-    total_profit = 0.0
-
-    # Generate price movements for simulation
-    # Create price points based on grid parameters
-    grid_levels = []
-
-    # Create buy levels (below base price)
-    for i in range(1, int(params.grid_down) + 1):
-        buy_price = base_price - (i * params.grid_increment)
-        if buy_price > 0:
-            grid_levels.append({"price": buy_price, "action": "buy", "level": i})
-
-    # Create sell levels (above base price)
-    for i in range(1, int(params.grid_up) + 1):
-        sell_price = base_price + (i * params.grid_increment)
-        grid_levels.append({"price": sell_price, "action": "sell", "level": i})
-
-    # Sort grid levels by price
-    grid_levels.sort(key=lambda x: x["price"])
-
-    # Simulate price movements hitting grid levels
-    max_trades_per_direction = min(params.max_trades // 2, len(grid_levels) // 2)
-
-    # First execute some buy orders (price goes down)
-    buy_levels = [level for level in grid_levels if level["action"] == "buy"][
-        :max_trades_per_direction
-    ]
-    for level in buy_levels[:3]:  # Execute first 3 buy levels
-        if held_shares + params.shares <= params.max_trades:
-            trades.append(
-                Trade(
-                    id=trade_id,
-                    ticker=params.ticker,
-                    shares=params.shares,
-                    price=round(level["price"], 2),
-                    side="buy",
-                )
-            )
-            held_shares += params.shares
-            total_invested += level["price"] * params.shares
-            trade_id += 1
-
-    # Then execute some sell orders (price goes up)
-    sell_levels = [level for level in grid_levels if level["action"] == "sell"][
-        :max_trades_per_direction
-    ]
-    for level in sell_levels[: min(len(buy_levels), 2)]:  # Sell some of what we bought
-        if held_shares >= params.shares:
-            trades.append(
-                Trade(
-                    id=trade_id,
-                    ticker=params.ticker,
-                    shares=params.shares,
-                    price=round(level["price"], 2),
-                    side="sell",
-                )
-            )
-            held_shares -= params.shares
-            total_profit += level["price"] * params.shares
-            trade_id += 1
-
-    # Calculate performance metrics
-    net_profit = total_profit - total_invested
-    total_return = (net_profit / total_invested) if total_invested > 0 else 0.0
-    max_drawdown = (
-        abs(min(0, net_profit / total_invested)) if total_invested > 0 else 0.0
-    )
+    engine = BacktestEngine(params.model_dump())
+    bars = _stored_bars(params)
+    cache_key = params_key("/backtest", params.model_dump(), bar_fingerprint(bars))
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        logger.info("Cache hit for ticker=%s", params.ticker)
+        logger.info("/backtest response time: %.3fs", time.time() - start_time)
+        return _cached_backtest(cached, params, request)
+    # The engine is synchronous NumPy work: keep it off the event loop
+    result = await asyncio.get_running_loop().run_in_executor(None, engine.run, bars)
+    trades = result["trades"]
+    held_shares = result["performance"]["held_shares"]
 
     if TEST_MODE:
         # Simplified for test mode
-        trades = (
-            trades[:1]
-            if trades
-            else [
-                Trade(
-                    id=1,
-                    ticker=params.ticker,
-                    shares=params.shares,
-                    price=170.0,
-                    side="buy",
-                )
-            ]
-        )
+        trades = trades[:1] or [
+            {
+                "id": 1,
+                "ticker": params.ticker,
+                "shares": params.shares,
+                "price": 170.0,
+                "side": "buy",
+            }
+        ]
         performance = Performance(total_return=0.01, max_drawdown=0.01)
         performance = performance.model_dump()
         held_shares = params.shares
     else:
-        performance = Performance(total_return=total_return, max_drawdown=max_drawdown)
-        performance = performance.model_dump()
+        performance = _engine_performance(result).model_dump()
 
     logger.info("Returning %d trades for ticker=%s", len(trades), params.ticker)
+    if params.columnar:
+        payload = {
+            "result": "success",
+            "performance": performance,
+            "heldShares": held_shares,
+        }
+        logger.info("/backtest response time: %.3fs", time.time() - start_time)
+        return _columnar_backtest(payload, trades, cache_key, request)
+    response = BacktestResponse(
+        result="success",
+        trades=[Trade(**trade) for trade in trades],
+        performance=performance,
+        heldShares=held_shares,
+    )
+    result_cache.put(cache_key, response.model_dump_json().encode())
     logger.info(
         "/backtest response time: %.3fs",
         time.time() - start_time,
     )
-    return BacktestResponse(
-        result="success", trades=trades, performance=performance, heldShares=held_shares
+    return response
+
+
+def _engine_performance(result: dict) -> Performance:
+    """Map BacktestEngine performance onto the API Performance model."""
+    return Performance(
+        **{
+            name: result["performance"][name]
+            for name in Performance.model_fields
+            if name in result["performance"]
+        }
+    )
+
+
+# A sweep evaluates every config over every bar: cap both the configs and the
+# config-bars product (about 10 s of engine time)
+MAX_SWEEP_CONFIGS = int(os.getenv("MAX_SWEEP_CONFIGS", "20000"))
+MAX_SWEEP_WORK = int(os.getenv("MAX_SWEEP_WORK", "2000000000"))
+
+
+@app.post("/backtest/sweep", response_model=SweepResponse)
+async def run_backtest_sweep(params: SweepParams) -> SweepResponse:
+    """Evaluate every grid config in the given ranges and return them ranked."""
+    start_time = time.time()
+    logger.info(
+        "Sweep requested for ticker=%s, sort_by=%s, limit=%s",
+        params.ticker,
+        params.sort_by,
+        params.limit,
+    )
+    if params.sort_by not in SWEEP_RANK_FIELDS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"sort_by must be one of {sorted(SWEEP_RANK_FIELDS)}",
+        )
+    ranges = {
+        name: getattr(params, name).model_dump()
+        for name in ("grid_up", "grid_down", "grid_increment", "shares")
+    }
+    try:
+        # Loading bars and the sweep itself are synchronous: run them off the loop
+        table = await asyncio.get_running_loop().run_in_executor(
+            None, _sweep_table, params, ranges
+        )
+    except ValueError as e:
+        logger.warning("Invalid sweep request: %s", e)
+        raise HTTPException(status_code=422, detail=str(e))
+    ranked = BacktestEngine.rank_sweep(table, params.sort_by, params.limit)
+    columns = list(SWEEP_DTYPE.names)
+    rows = np.column_stack([ranked[name] for name in columns]).tolist()
+    logger.info("Returning %d of %d sweep rows", len(rows), len(table))
+    logger.info(
+        "/backtest/sweep response time: %.3fs",
+        time.time() - start_time,
+    )
+    return SweepResponse(
+        result="success", num_configs=len(table), columns=columns, rows=rows
     )
 
 
-@app.get("/api/realtime", response_model=RealtimeResponse)
+def _sweep_table(params: SweepParams, ranges: dict):
+    """
+    Load the bars for a sweep and evaluate every config in ranges. Raises
+    ValueError for an empty or oversized sweep.
+    """
+    num_configs = 1
+    for spec in ranges.values():
+        num_configs *= len(sweep_values(spec))
+    if num_configs == 0 or num_configs > MAX_SWEEP_CONFIGS:
+        raise ValueError(f"Sweep must cover between 1 and {MAX_SWEEP_CONFIGS} configs")
+    if params.closes is not None:
+        if len(params.closes) < 2:
+            raise ValueError("closes must contain at least two prices")
+        bars = {"close": params.closes}
+    else:
+        bars = _stored_bars(params)
+    if num_configs * len(bars["close"]) > MAX_SWEEP_WORK:
+        raise ValueError(
+            f"Sweep of {num_configs} configs over {len(bars['close'])} bars is too "
+            f"large; keep configs x bars under {MAX_SWEEP_WORK}"
+        )
+    engine = BacktestEngine(
+        params.ticker,
+        ranges["shares"]["start"],
+        ranges["grid_up"]["start"],
+        ranges["grid_down"]["start"],
+        ranges["grid_increment"]["start"],
+        params.timeframe,
+        params.interval,
+    )
+    return engine.sweep(bars, **ranges)
+
+
+def _backtest_job(params: GridParams, progress) -> dict:
+    """
+    Body of a /backtest/jobs job, run on a worker thread: replay the bars in
+    chunks with run_stream, reporting bars processed after each chunk.
+    """
+    bars = _stored_bars(params)
+    total = len(bars["close"])
+    cache_key = params_key("/backtest/jobs", params.model_dump(), bar_fingerprint(bars))
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        progress(total, total)
+        return json.loads(cached)
+    engine = BacktestEngine(params.model_dump())
+    trades = []
+    performance = engine.run()["performance"]
+    for snapshot in engine.run_stream(iter_chunks(bars)):
+        trades.extend(snapshot["trades"])
+        performance = snapshot["performance"]
+        progress(snapshot["bars_processed"], total)
+    if params.columnar:
+        result = {
+            "result": "success",
+            "trades": [],
+            "trade_columns": wire.trade_columns(trades),
+            "performance": _engine_performance(
+                {"performance": performance}
+            ).model_dump(),
+            "heldShares": performance["held_shares"],
+        }
+        result_cache.put(cache_key, wire.dumps(result))
+        return result
+    response = BacktestResponse(
+        result="success",
+        trades=[Trade(**trade) for trade in trades],
+        performance=_engine_performance({"performance": performance}).model_dump(),
+        heldShares=performance["held_shares"],
+    )
+    result_cache.put(cache_key, response.model_dump_json().encode())
+    return response.model_dump()
+
+
+def _find_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+
+@app.post("/backtest/jobs", response_model=JobStatus, status_code=202)
+async def submit_backtest_job(params: GridParams) -> JobStatus:
+    """Queue a backtest on the worker pool and return its job id immediately."""
+    try:
+        parse_duration(params.timeframe)
+    except ValueError as e:
+        logger.warning("Invalid timeframe: %s", e)
+        raise HTTPException(status_code=422, detail=str(e))
+    try:
+        job = job_manager.submit(_backtest_job, params)
+    except OverflowError as e:
+        logger.warning("Backtest job rejected: %s", e)
+        raise HTTPException(status_code=503, detail=str(e))
+    logger.info("Backtest job %s queued for ticker=%s", job.id, params.ticker)
+    return JobStatus(**job.snapshot())
+
+
+@app.get("/backtest/jobs/{job_id}", response_model=JobStatus)
+async def get_backtest_job(job_id: str) -> JobStatus:
+    """Return a backtest job's status, progress and (once done) result."""
+    return JobStatus(**_find_job(job_id).snapshot())
+
+
+@app.get("/backtest/jobs/{job_id}/events")
+async def backtest_job_events(job_id: str, request: Request) -> StreamingResponse:
+    """
+    Stream a job's progress as server-sent events: "progress" events while it
+    runs, then one "done" or "failed" event. Fetch the result with GET
+    /backtest/jobs/{job_id}.
+    """
+    job = _find_job(job_id)
+
+    async def events():
+        version = None
+        idle = 0.0
+        while True:
+            if job.version != version:
+                version = job.version
+                state = job.snapshot(with_result=False)
+                finished = state["status"] in FINISHED
+                event = state["status"] if finished else "progress"
+                yield f"event: {event}\ndata: {json.dumps(state)}\n\n"
+                if finished:
+                    return
+                idle = 0.0
+            elif idle >= JOB_KEEPALIVE:
+                yield ": keepalive\n\n"
+                idle = 0.0
+            if await request.is_disconnected():
+                return
+            await asyncio.sleep(JOB_EVENT_INTERVAL)
+            idle += JOB_EVENT_INTERVAL
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"}
+    )
+
+
+@app.websocket("/ws/realtime")
+async def realtime_ws(websocket: WebSocket, symbol: str = "AAPL"):
+    """
+    Stream symbol's ticks. Every message is a columnar batch of the ticks since
+    the previous one (see realtime_feed.encode_ticks); conflated counts ticks a
+    slow client skipped. Closes with 1011 if market data is unavailable.
+    """
+    await websocket.accept()
+    symbol = symbol.strip().upper()
+    feed = realtime_feed
+    try:
+        feed_client = await feed.subscribe(symbol)
+    except (CircuitOpenError, *RETRY_ERRORS) as e:
+        logger.warning("Realtime feed for %s unavailable: %s", symbol, e)
+        await websocket.close(code=1011, reason=str(e)[:120])
+        return
+    logger.info("Realtime client connected for symbol=%s", symbol)
+    sender = asyncio.create_task(_send_ticks(websocket, feed_client))
+    try:
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    finally:
+        sender.cancel()
+        await feed.unsubscribe(feed_client)
+        logger.info(
+            "Realtime client for symbol=%s left, %d ticks conflated",
+            symbol,
+            feed_client.conflated,
+        )
+
+
+async def _send_ticks(websocket: WebSocket, feed_client):
+    try:
+        while True:
+            await websocket.send_text(await feed_client.next_message())
+    except (RuntimeError, WebSocketDisconnect):  # Socket closed while sending
+        pass
+
+
+@app.get("/api/realtime", response_model=RealtimeResponse, deprecated=True)
 async def get_realtime(symbol: str = "AAPL", max_ticks: int = 10) -> RealtimeResponse:
-    """Return mock real-time tick data for frontend visualization."""
+    """Return mock real-time tick data. Deprecated: stream ticks from /ws/realtime."""
     logger.info(
         "Realtime data requested for symbol=%s, max_ticks=%d", symbol, max_ticks
     )
@@ -625,57 +1066,74 @@ async def run_backtest_detailed(
 ) -> BacktestResponse:
     """Run detailed grid trading backtest and return results."""
     start_time = time.time()
-    logger.info(
-        "/backtest/detailed response time: %.3fs",
-        time.time() - start_time,
-    )
-    trades = [
-        Trade(
-            id=1,
-            ticker=params.ticker,
-            shares=params.shares,
-            price=170.0,
-            side="buy",
-            timestamp="2025-09-12T09:30:00",
-        ),
-        Trade(
-            id=2,
-            ticker=params.ticker,
-            shares=params.shares,
-            price=171.0,
-            side="sell",
-            timestamp="2025-09-12T09:31:00",
-        ),
-    ]
-    performance = Performance(
-        total_return=0.05, max_drawdown=0.02, sharpe_ratio=1.2, win_rate=0.5
+    engine = BacktestEngine(params.model_dump())
+    bars = _stored_bars(params)
+    cache_key = params_key(
+        "/backtest/detailed", params.model_dump(), bar_fingerprint(bars)
     )
-    performance = performance.model_dump()
-    held_shares = params.shares
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        logger.info("Cache hit for ticker=%s", params.ticker)
+        logger.info("/backtest/detailed response time: %.3fs", time.time() - start_time)
+        return _cached_backtest(cached, params, request)
+    result = await asyncio.get_running_loop().run_in_executor(None, engine.run, bars)
+    trades = result["trades"]
+    performance = _engine_performance(result).model_dump()
+    held_shares = result["performance"]["held_shares"]
+    # Starting balance is the cash needed to fill every buy level of the grid
+    start_balance = float(engine.grid_levels(float(bars["close"][0]))[:-1].sum())
+    start_balance *= params.shares
     summary = BacktestSummary(
-        start_balance=10000, end_balance=10500, num_trades=len(trades)
+        start_balance=round(start_balance, 2),
+        end_balance=round(start_balance + result["performance"]["pnl"], 2),
+        num_trades=len(trades),
     )
     logger.info(
         "Returning %d trades and summary for ticker=%s", len(trades), params.ticker
     )
-    logger.info(
-        "/backtest/detailed response time: %.3fs",
-        time.time() - start_time,
-    )
-    return BacktestResponse(
+    if params.columnar:
+        payload = {
+            "result": "success",
+            "performance": performance,
+            "heldShares": held_shares,
+            "summary": summary.model_dump(),
+        }
+        logger.info("/backtest/detailed response time: %.3fs", time.time() - start_time)
+        return _columnar_backtest(payload, trades, cache_key, request)
+    response = BacktestResponse(
         result="success",
-        trades=trades,
+        trades=[Trade(**trade) for trade in trades],
         performance=performance,
         heldShares=held_shares,
         summary=summary,
     )
+    result_cache.put(cache_key, response.model_dump_json().encode())
+    logger.info(
+        "/backtest/detailed response time: %.3fs",
+        time.time() - start_time,
+    )
+    return response
 
 
 @app.get("/us_stock_tickers", response_model=TickerListResponse)
-async def get_us_stock_tickers() -> TickerListResponse:
-    """Return mock list of US stock tickers for dropdowns."""
+async def get_us_stock_tickers(
+    scan: Optional[str] = Query(
+        None, description="One configured scan, e.g. TOP_PERC_GAIN<1"
+    )
+) -> TickerListResponse:
+    """
+    Return US stock tickers for dropdowns from the in-memory universe (all
+    configured scans merged unless scan is given). Never waits on a scanner.
+    """
     logger.info("US stock tickers requested.")
-    tickers = ["AAPL", "MSFT", "GOOG", "AMZN", "TSLA", "NVDA", "META"]
+    universe = default_universe()
+    if universe is None:
+        tickers = list(DEFAULT_TICKERS)
+    else:
+        try:
+            tickers = universe.tickers(scan)
+        except KeyError:
+            raise HTTPException(status_code=422, detail=f"Unknown scan: {scan}")
     logger.info("Returning %d tickers.", len(tickers))
     return TickerListResponse(result="success", tickers=tickers)
 
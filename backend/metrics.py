@@ -0,0 +1,153 @@
+# pylint: skip-file
+"""
+Vectorized performance metrics shared by every backtest path.
+All functions take NumPy arrays and reduce along axis (the time or trade axis),
+so one call scores a single run or a whole batch of runs stacked on the other
+axes. Trade arrays for batches may be NaN-padded.
+"""
+
+import re
+
+import numpy as np
+
+TRADING_DAYS = 252
+SESSION_MINUTES = 390
+_INTERVAL_UNITS = {
+    "s": 1 / 60,
+    "sec": 1 / 60,
+    "secs": 1 / 60,
+    "min": 1,
+    "mins": 1,
+    "m": 1,
+    "h": 60,
+    "hour": 60,
+    "hours": 60,
+    "d": SESSION_MINUTES,
+    "day": SESSION_MINUTES,
+    "days": SESSION_MINUTES,
+    "w": 5 * SESSION_MINUTES,
+    "week": 5 * SESSION_MINUTES,
+}
+
+
+def periods_per_year(interval: str) -> float:
+    """
+    Number of bars per trading year for an IBKR-style bar interval such as
+    "1 min", "5 mins", "1 hour", "1d" or "1min". Unknown intervals count as daily.
+    """
+    match = re.fullmatch(r"\s*(\d*)\s*([a-zA-Z]+)\s*", str(interval))
+    unit = _INTERVAL_UNITS.get(match.group(2).lower()) if match else None
+    if unit is None:
+        return float(TRADING_DAYS)
+    minutes = int(match.group(1) or 1) * unit
+    return TRADING_DAYS * SESSION_MINUTES / minutes
+
+
+def equity_curve(pnl, capital) -> np.ndarray:
+    """Equity from cumulative pnl on top of starting capital (broadcast)."""
+    return np.asarray(capital, dtype=np.float64) + np.asarray(pnl, dtype=np.float64)
+
+
+def total_return(equity, axis: int = -1) -> np.ndarray:
+    """Final over initial equity minus one; zero where the initial equity is not positive."""
+    equity = np.asarray(equity, dtype=np.float64)
+    first = np.take(equity, 0, axis=axis)
+    last = np.take(equity, -1, axis=axis)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(first > 0, last / first - 1.0, 0.0)
+
+
+def period_returns(equity, axis: int = -1) -> np.ndarray:
+    """Simple bar-to-bar returns; zero where the previous equity is not positive."""
+    equity = np.asarray(equity, dtype=np.float64)
+    head = [slice(None)] * equity.ndim
+    head[axis] = slice(None, -1)
+    previous = equity[tuple(head)]
+    change = np.diff(equity, axis=axis)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(previous > 0, change / previous, 0.0)
+
+
+def drawdowns(equity, axis: int = -1, peak=None) -> np.ndarray:
+    """
+    Fractional drawdown from the running peak at every bar. peak optionally
+    carries the running peak from earlier bars (e.g. a previous chunk).
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    running = np.maximum.accumulate(equity, axis=axis)
+    if peak is not None:
+        running = np.maximum(running, np.expand_dims(peak, axis))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(running > 0, (running - equity) / running, 0.0)
+
+
+def max_drawdown(equity, axis: int = -1, peak=None) -> np.ndarray:
+    """Largest fractional drawdown along axis (see drawdowns)."""
+    equity = np.asarray(equity)
+    if equity.shape[axis] == 0:
+        return np.zeros(np.delete(equity.shape, axis % equity.ndim))
+    return drawdowns(equity, axis, peak).max(axis=axis)
+
+
+def return_moments(returns, axis: int = -1) -> np.ndarray:
+    """
+    Additive return statistics stacked on a new leading axis: count, sum, sum of
+    squares and sum of squared negative returns. Moments of consecutive chunks
+    can be added, which lets streaming runs report Sharpe and Sortino.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    downside = np.minimum(returns, 0.0)
+    return np.stack(
+        [
+            np.sum(~np.isnan(returns), axis=axis).astype(np.float64),
+            np.nansum(returns, axis=axis),
+            np.nansum(returns * returns, axis=axis),
+            np.nansum(downside * downside, axis=axis),
+        ]
+    )
+
+
+def sharpe_from_moments(moments, periods: float = TRADING_DAYS) -> np.ndarray:
+    """Annualized Sharpe ratio (zero risk-free rate) from return_moments."""
+    count, total, squares = moments[0], moments[1], moments[2]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = total / count
+        std = np.sqrt(np.maximum(squares / count - mean * mean, 0.0))
+        ratio = np.where(std > 0, mean / std * np.sqrt(periods), 0.0)
+    return np.where(count > 1, ratio, 0.0)
+
+
+def sortino_from_moments(moments, periods: float = TRADING_DAYS) -> np.ndarray:
+    """Annualized Sortino ratio (zero target) from return_moments."""
+    count, total, downside = moments[0], moments[1], moments[3]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = total / count
+        deviation = np.sqrt(downside / count)
+        ratio = np.where(deviation > 0, mean / deviation * np.sqrt(periods), 0.0)
+    return np.where(count > 1, ratio, 0.0)
+
+
+def sharpe_ratio(returns, periods: float = TRADING_DAYS, axis: int = -1):
+    """Annualized Sharpe ratio of per-bar returns along axis."""
+    return sharpe_from_moments(return_moments(returns, axis), periods)
+
+
+def sortino_ratio(returns, periods: float = TRADING_DAYS, axis: int = -1):
+    """Annualized Sortino ratio of per-bar returns along axis."""
+    return sortino_from_moments(return_moments(returns, axis), periods)
+
+
+def win_rate(trade_pnl, axis: int = -1) -> np.ndarray:
+    """Share of winning round trips among winners and losers; NaN padding ignored."""
+    trade_pnl = np.asarray(trade_pnl, dtype=np.float64)
+    wins = np.sum(trade_pnl > 0, axis=axis)
+    losses = np.sum(trade_pnl < 0, axis=axis)
+    return wins / np.maximum(wins + losses, 1)
+
+
+def turnover(traded_notional, capital, axis: int = -1) -> np.ndarray:
+    """Total traded notional over capital; zero where capital is not positive."""
+    traded = np.nansum(np.asarray(traded_notional, dtype=np.float64), axis=axis)
+    capital = np.asarray(capital, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(capital > 0, traded / capital, 0.0)
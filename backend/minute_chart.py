@@ -3,38 +3,132 @@
 Utility for processing historical minute chart data and resampling to selectable frequencies.
 """
 
+import numpy as np
 import pandas as pd
 
+from .backfill import Backfiller
+from .bar_store import BAR_DTYPE, default_store, market_today, parse_duration
+from .breakers import CircuitOpenError, breaker
 from .ibkr_client import IBKRClient
+from .ibkr_pool import default_pool
+from .rollups import RollupCache, frequency_seconds
 
+_rollup_caches = {}
 
-def get_minute_chart(ticker, duration="1 D", bar_size="1 min", frequency="1min"):
+
+def get_minute_chart(
+    ticker, duration="1 D", bar_size="1 min", frequency="1min", store=None
+):
     """
     Fetch historical minute chart data for a ticker and resample to the selected frequency.
-    Returns OHLCV data as a list of dicts with timestamp index.
-    """
-    client = IBKRClient()
-    client.connect()
-    bars = client.get_historical_data(ticker, duration, bar_size)
-    client.disconnect()
-    # Convert to DataFrame
-    df = pd.DataFrame([b.__dict__ for b in bars])
-    # Drop unused columns if present
-    allowed_cols = ["date", "open", "high", "low", "close", "volume"]
-    unused_cols = [col for col in df.columns if col not in allowed_cols]
-    if unused_cols:
-        df.drop(columns=unused_cols, inplace=True)
-    # Set efficient dtypes
-    df["open"] = df["open"].astype("float32")
-    df["high"] = df["high"].astype("float32")
-    df["low"] = df["low"].astype("float32")
-    df["close"] = df["close"].astype("float32")
-    df["volume"] = df["volume"].astype("int32")
-    df["date"] = pd.to_datetime(df["date"])
-    df.set_index("date", inplace=True)
-    # Resample to desired frequency
+    Bars are read from the local bar store; only trading days missing from it
+    are requested from IBKR (see backfill.Backfiller) and saved to the store,
+    through a pooled session when the app's IBKR pool is running. While the
+    ibkr_historical breaker is open the backfill is skipped.
+    Returns OHLCV columns (see chart_bars).
+    """
+    store = store or default_store()
+    pool = default_pool()
+    if pool is not None:
+        backfill_chart(ticker, duration, bar_size, store, pool)
+        return chart_bars(ticker, duration, bar_size, frequency, store)
+    end = market_today()
+    start = chart_start(end, duration)
+    backfiller = Backfiller(
+        IBKRClient(bar_store=store), store, breaker=breaker("ibkr_historical")
+    )
+    requests = backfiller.plan(ticker, bar_size, start, end)
+    if requests:
+        backfiller.client.connect()
+        if backfiller.client.is_connected():
+            try:
+                backfiller.run(requests)
+            except CircuitOpenError as e:
+                print(f"Skipping backfill for {ticker}: {e}")
+            finally:
+                backfiller.client.disconnect()
+    return chart_bars(ticker, duration, bar_size, frequency, store)
+
+
+def backfill_chart(ticker, duration="1 D", bar_size="1 min", store=None, pool=None):
+    """
+    Request the trading days of the chart window missing from store through a
+    session of pool (default_pool()) and save them. Skipped while the
+    ibkr_historical breaker is open or no session frees up in time.
+    """
+    store = store or default_store()
+    pool = pool or default_pool()
+    end = market_today()
+    backfiller = Backfiller(
+        None, store, pool.bucket, breaker=breaker("ibkr_historical")
+    )
+    requests = backfiller.plan(ticker, bar_size, chart_start(end, duration), end)
+    if requests:
+        try:
+            with pool.session() as client:
+                backfiller.client = client
+                backfiller.run(requests)
+        except (TimeoutError, CircuitOpenError) as e:
+            print(f"Skipping backfill for {ticker}: {e}")
+
+
+def rollup_cache(store=None) -> RollupCache:
+    """Return the shared RollupCache for store (default_store() if None)."""
+    store = store or default_store()
+    if store.root not in _rollup_caches:
+        _rollup_caches[store.root] = RollupCache(store)
+    return _rollup_caches[store.root]
+
+
+def chart_bars(ticker, duration="1 D", bar_size="1 min", frequency="1min", store=None):
+    """
+    Return stored bars for the last duration at frequency as a dict of parallel
+    time/open/high/low/close/volume NumPy columns. Supported frequencies (see
+    rollups.ROLLUP_FREQUENCIES) are sliced from incrementally maintained
+    rollups starting at the bucket that contains the window start; others, and
+    windows older than the rollups hold, are resampled from the stored bars.
+    """
+    store = store or default_store()
+    window = store.last_window(ticker, bar_size, duration)
+    if window is None:
+        return bar_columns(np.zeros(0, dtype=BAR_DTYPE))
+    cache = rollup_cache(store)
+    if cache.supports(frequency):
+        bars = cache.slice(ticker, bar_size, frequency, *window)
+        if bars is not None:
+            return bar_columns(bars)
+    return resample_bars(store.read(ticker, bar_size, *window), frequency)
+
+
+def bar_columns(records) -> dict:
+    """Return the fields of a BAR_DTYPE array as a dict of column views."""
+    return {name: records[name] for name in records.dtype.names}
+
+
+def chart_start(end, duration: str):
+    """Return the first day covered by an IBKR duration ending on day end."""
+    span = parse_duration(duration)
+    if duration.strip().upper().endswith("D"):
+        sessions = max(int(span // np.timedelta64(86400, "s")), 1)
+        last = np.busday_offset(end, 0, roll="backward")
+        return np.busday_offset(last, 1 - sessions, roll="backward")
+    return (end - span).astype("datetime64[D]")
+
+
+def resample_bars(records, frequency="1min"):
+    """
+    Resample a BAR_DTYPE array (see bar_store) to the selected frequency.
+    Returns OHLCV columns keyed like BAR_DTYPE.
+    """
+    df = pd.DataFrame(
+        {name: records[name] for name in BAR_DTYPE.names[1:]},
+        index=pd.DatetimeIndex(records["time"], name="time"),
+        copy=False,
+    )
+    # Resample to desired frequency, as seconds so no deprecated alias reaches pandas
+    seconds = frequency_seconds(frequency)
     ohlc = (
-        df.resample(frequency)
+        df.resample(frequency if seconds is None else f"{seconds}s")
         .agg(
             {
                 "open": "first",
@@ -46,4 +140,7 @@ def get_minute_chart(ticker, duration="1 D", bar_size="1 min", frequency="1min")
         )
         .dropna()
     )
-    return ohlc.reset_index().to_dict(orient="records")
+    columns = {"time": ohlc.index.to_numpy().astype("datetime64[s]")}
+    for name in BAR_DTYPE.names[1:]:
+        columns[name] = ohlc[name].to_numpy(dtype=BAR_DTYPE[name])
+    return columns
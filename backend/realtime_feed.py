@@ -0,0 +1,247 @@
+# pylint: skip-file
+"""
+Realtime tick fan-out for WebSocket clients. Each symbol has one upstream
+market-data subscription, however many clients watch it. Its ticks land in
+the subscription's TickRing; every client reads the ring through its own
+cursor, so nothing is buffered per client. A client that falls more than
+max_batch ticks behind gets the backlog conflated to the latest tick of each
+tick type.
+"""
+
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+from ibapi.contract import Contract
+
+from .backtest import IBApp
+from .breakers import breaker
+from .ibkr_pool import IBKR_HOST, IBKR_PORT
+
+FEED_MAX_BATCH = int(os.getenv("FEED_MAX_BATCH", "256"))
+
+
+def stock_contract(symbol: str) -> Contract:
+    """Return a SMART-routed USD stock contract for symbol."""
+    contract = Contract()
+    contract.symbol = symbol
+    contract.secType = "STK"
+    contract.exchange = "SMART"
+    contract.currency = "USD"
+    return contract
+
+
+class IBKRUpstream:
+    """
+    Market data from one IBApp connection shared by every symbol, opened on
+    the first subscription and reopened if it dropped.
+    """
+
+    def __init__(self, host: str = IBKR_HOST, port: int = IBKR_PORT):
+        """Create an unconnected upstream for the gateway at host:port."""
+        self.host = host
+        self.port = port
+        self.app = None
+        self.client_id = None
+        self._lock = threading.Lock()
+
+    def subscribe(self, symbol: str, listener):
+        """Subscribe symbol, calling listener(key, ring) per tick. Returns (key, ring)."""
+        with self._lock:
+            if self.app is None or not self.app.isConnected():
+                self._connect()
+            req_id = self.app.subscribe_market_data(stock_contract(symbol), listener)
+            return req_id, self.app.tick_buffer(req_id)
+
+    def _connect(self):
+        if self.app is not None:
+            self.close()
+        app = IBApp()
+        client_id = IBApp.get_next_client_id()
+        app.connect(self.host, self.port, client_id)
+        if not app.isConnected():
+            IBApp.release_client_id(client_id)
+            raise ConnectionError(f"No IBKR gateway at {self.host}:{self.port}")
+        app.start_reader()
+        self.app, self.client_id = app, client_id
+
+    def unsubscribe(self, key):
+        """Cancel the subscription key."""
+        with self._lock:
+            if self.app is not None:
+                self.app.cancel_market_data(key)
+
+    def close(self):
+        """Disconnect and release the client ID."""
+        if self.app is not None:
+            self.app.disconnect()
+            IBApp.release_client_id(self.client_id)
+            self.app = self.client_id = None
+
+
+def conflate(ticks: np.ndarray) -> np.ndarray:
+    """Keep only the latest tick of each tick type, in arrival order."""
+    types = ticks["tick_type"][::-1]
+    _, last = np.unique(types, return_index=True)
+    return ticks[np.sort(len(ticks) - 1 - last)]
+
+
+def encode_ticks(symbol: str, ticks: np.ndarray, conflated: int) -> str:
+    """Serialize ticks as a columnar JSON message; missing prices/sizes are null."""
+    message = {
+        "symbol": symbol,
+        "time": np.datetime_as_string(ticks["time"], unit="ms").tolist(),
+        "tick_type": ticks["tick_type"].tolist(),
+        "conflated": conflated,
+    }
+    for name in ("price", "size"):
+        values = ticks[name]
+        message[name] = np.where(np.isnan(values), None, values).tolist()
+    return json.dumps(message)
+
+
+class _Channel:
+    """One upstream subscription and the clients reading it."""
+
+    __slots__ = ("symbol", "key", "ring", "clients", "ready")
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.key = None
+        self.ring = None
+        self.clients = set()
+        self.ready = Future()  # Resolves once the upstream subscription is open
+
+    def notify(self, key=None, ring=None):
+        """Wake every client on its own event loop. Called on the IBKR reader thread."""
+        for client in list(self.clients):
+            if not client.wake.is_set():
+                client.loop.call_soon_threadsafe(client.wake.set)
+
+
+class FeedClient:
+    """One client's cursor into a channel's ring."""
+
+    def __init__(self, channel: _Channel, max_batch: int, loop):
+        self.channel = channel
+        self.max_batch = max_batch
+        self.loop = loop
+        self.seq = 0
+        self.wake = asyncio.Event()
+        self.conflated = 0
+
+    async def next_message(self) -> str:
+        """
+        Wait for ticks after the cursor and return them as one message. Ticks
+        overwritten in the ring (before or while they are copied off it) or
+        beyond max_batch are conflated.
+        """
+        ring = self.channel.ring
+        dropped = 0
+        while True:
+            while ring.total <= self.seq:
+                self.wake.clear()
+                if ring.total > self.seq:
+                    break
+                await self.wake.wait()
+            total, ticks = ring.copy_since(self.seq)
+            dropped += (total - self.seq) - len(ticks)
+            self.seq = total
+            if len(ticks):
+                break
+        if len(ticks) > self.max_batch:
+            kept = conflate(ticks)
+            dropped += len(ticks) - len(kept)
+            ticks = kept
+        self.conflated += dropped
+        return encode_ticks(self.channel.symbol, ticks, dropped)
+
+
+class RealtimeFeed:
+    """
+    Symbol channels shared by all WebSocket clients. The first client of a
+    symbol opens its upstream subscription (through the ibkr_market_data
+    breaker); the last one to leave cancels it.
+    """
+
+    def __init__(self, upstream=None, max_batch: int = FEED_MAX_BATCH):
+        """Create a feed; upstream defaults to an IBKRUpstream on IBKR_HOST:IBKR_PORT."""
+        self.upstream = upstream or IBKRUpstream()
+        self.max_batch = max_batch
+        self.channels = {}
+        self._lock = threading.Lock()  # Never held across an await
+
+    async def subscribe(self, symbol: str) -> FeedClient:
+        """
+        Attach a client to symbol's channel, subscribing upstream if it is the
+        first. Raises the upstream's error if the subscription fails.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            channel = self.channels.get(symbol)
+            opener = channel is None
+            if opener:
+                channel = self.channels[symbol] = _Channel(symbol)
+            client = FeedClient(channel, self.max_batch, loop)
+            channel.clients.add(client)
+        if opener:
+            try:
+                channel.key, channel.ring = await loop.run_in_executor(
+                    None, self._subscribe_upstream, symbol, channel.notify
+                )
+            except Exception as e:
+                with self._lock:
+                    del self.channels[symbol]
+                channel.ready.set_exception(e)
+                raise
+            channel.ready.set_result(None)
+        else:
+            try:
+                await asyncio.wrap_future(channel.ready)
+            except Exception:
+                with self._lock:
+                    channel.clients.discard(client)
+                raise
+        client.seq = channel.ring.total  # Only ticks from now on
+        return client
+
+    def _subscribe_upstream(self, symbol: str, listener):
+        with breaker("ibkr_market_data").guard():
+            return self.upstream.subscribe(symbol, listener)
+
+    async def unsubscribe(self, client: FeedClient):
+        """Detach client; cancel the upstream subscription when its channel empties."""
+        channel = client.channel
+        with self._lock:
+            channel.clients.discard(client)
+            if channel.clients or self.channels.get(channel.symbol) is not channel:
+                return
+            del self.channels[channel.symbol]
+        # Shielded: a cancelled handler must still release the upstream line
+        await asyncio.shield(
+            asyncio.get_running_loop().run_in_executor(
+                None, self.upstream.unsubscribe, channel.key
+            )
+        )
+
+    def stats(self) -> dict:
+        """Return the number of upstream subscriptions and connected clients."""
+        with self._lock:
+            return {
+                "symbols": len(self.channels),
+                "clients": sum(len(c.clients) for c in self.channels.values()),
+            }
+
+    def close(self):
+        """Cancel every upstream subscription and close the upstream."""
+        with self._lock:
+            channels = list(self.channels.values())
+            self.channels.clear()
+        for channel in channels:
+            if channel.key is not None:
+                self.upstream.unsubscribe(channel.key)
+        if hasattr(self.upstream, "close"):
+            self.upstream.close()
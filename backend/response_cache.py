@@ -0,0 +1,178 @@
+# pylint: skip-file
+"""
+HTTP response cache for the market-data endpoints. Serialized bodies are kept
+in a size-bounded LRU under keys that include the stored partitions they were
+built from (day, size and mtime), so a backfill or rewrite changes the key
+instead of serving stale bars. Responses for a range that ended before today
+and whose business days are all stored complete (see bar_store.is_complete)
+never change and are cached without expiry; all others, including relative
+windows such as /minute_chart's, expire after a TTL.
+Every response carries a strong ETag and If-None-Match is answered with 304.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from fastapi.responses import Response
+
+from . import wire
+from .bar_store import is_complete, market_today
+
+RESPONSE_CACHE_BYTES = int(os.getenv("RESPONSE_CACHE_MB", "32")) * 1024 * 1024
+RESPONSE_TTL = float(os.getenv("RESPONSE_TTL", "30"))
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def settled(days, stats, start, end) -> bool:
+    """
+    True if the requested start..end range ended before today and every
+    business day in it is among days with a complete partition (stats from
+    BarStore.partition_stats). Open-ended ranges are never settled.
+    """
+    if start is None or end is None:
+        return False
+    first, last = (
+        np.datetime64(bound).astype("datetime64[D]") for bound in (start, end)
+    )
+    if last >= market_today():
+        return False
+    complete = {day for day, stat in zip(days, stats) if is_complete(day, stat)}
+    expected = np.arange(first, last + 1)
+    return all(day in complete for day in expected[np.is_busday(expected)])
+
+
+def partitions_fingerprint(days, stats) -> str:
+    """Identify the contents of stored partitions by day, size and mtime for a cache key."""
+    return ",".join(
+        f"{day}:{stat.st_size}:{stat.st_mtime_ns}" for day, stat in zip(days, stats)
+    )
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Evaluate an If-None-Match header against etag (weak comparison, RFC 9110)."""
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class CachedResponse:
+    """
+    One cached JSON body and its ETag. expires is a clock time, or None for an
+    immutable entry. Compressed variants are built on first use and kept.
+    """
+
+    __slots__ = ("body", "etag", "expires", "encoded")
+
+    def __init__(self, body: bytes, expires=None):
+        self.body = body
+        self.etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        self.expires = expires
+        self.encoded = {"identity": body}
+
+    @property
+    def immutable(self) -> bool:
+        return self.expires is None
+
+    def respond(self, request) -> Response:
+        """
+        Return the body for request, compressed as negotiated, or an empty 304
+        if the client's If-None-Match already names this representation.
+        """
+        coding = wire.content_coding(request, len(self.body))
+        # Each content coding is its own representation and needs its own tag
+        etag = self.etag if coding == "identity" else f'{self.etag[:-1]}-{coding}"'
+        headers = {
+            "ETag": etag,
+            "Cache-Control": (
+                IMMUTABLE_CACHE_CONTROL if self.immutable else "no-cache"
+            ),
+            "Vary": "Accept-Encoding",
+        }
+        if etag_matches(request.headers.get("if-none-match", ""), etag):
+            return Response(status_code=304, headers=headers)
+        body = self.encoded.get(coding)
+        if body is None:
+            body = self.encoded[coding] = wire.compress(self.body, coding)
+        if coding != "identity":
+            headers["Content-Encoding"] = coding
+        return Response(body, media_type="application/json", headers=headers)
+
+
+class ResponseCache:
+    """
+    LRU of CachedResponse entries bounded by total uncompressed body size.
+    Expired entries are dropped on lookup. Thread safe; clock is injectable.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = RESPONSE_CACHE_BYTES,
+        ttl: float = RESPONSE_TTL,
+        clock=time.monotonic,
+    ):
+        """Create a cache of up to max_bytes whose mutable entries live ttl seconds."""
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        """Return the live entry for key, or None."""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and not entry.immutable:
+                if self.clock() >= entry.expires:
+                    self._remove(key)
+                    entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, body: bytes, immutable: bool = False) -> CachedResponse:
+        """Cache body under key, expiring after ttl unless immutable. Returns the entry."""
+        entry = CachedResponse(body, None if immutable else self.clock() + self.ttl)
+        if len(body) > self.max_bytes:
+            return entry
+        with self._lock:
+            self._remove(key)
+            self.entries[key] = entry
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted.body)
+        return entry
+
+    def _remove(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry.body)
+
+    def stats(self) -> dict:
+        """Return entry counts, size and hit/miss counters."""
+        with self._lock:
+            return {
+                "entries": len(self.entries),
+                "immutable": sum(e.immutable for e in self.entries.values()),
+                "bytes": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self.entries.clear()
+            self.size = 0
@@ -0,0 +1,181 @@
+# pylint: skip-file
+"""
+Content-addressed cache for backtest results. Keys hash the normalized request
+parameters together with a fingerprint of the bar data, so a result is reused
+only when both the config and the prices are identical.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def bar_fingerprint(columns: dict) -> str:
+    """Hash a dict of bar columns (see BacktestEngine.bars_to_arrays) by content."""
+    digest = hashlib.blake2b(digest_size=16)
+    for name in sorted(columns):
+        values = np.ascontiguousarray(columns[name])
+        digest.update(f"{name}:{values.dtype.str}:{values.shape}".encode())
+        digest.update(values.tobytes())
+    return digest.hexdigest()
+
+
+def params_key(namespace: str, params: dict, fingerprint: str) -> str:
+    """
+    Build the cache key for one request. Numbers are normalized to floats and
+    strings are stripped so equivalent requests share a key.
+    """
+    normalized = {}
+    for name, value in params.items():
+        if isinstance(value, bool) or value is None:
+            normalized[name] = value
+        elif isinstance(value, (int, float)):
+            normalized[name] = float(value)
+        else:
+            normalized[name] = str(value).strip()
+    if isinstance(normalized.get("ticker"), str):
+        normalized["ticker"] = normalized["ticker"].upper()
+    payload = json.dumps([namespace, normalized, fingerprint], sort_keys=True)
+    return hashlib.blake2b(payload.encode(), digest_size=20).hexdigest()
+
+
+class ResultCache:
+    """
+    LRU cache of serialized results bounded by total size in bytes, with an
+    optional on-disk tier. Memory misses fall back to disk and promote the entry.
+    The disk tier is bounded by disk_max_bytes: once a write takes it over, the
+    least recently used files (by mtime, refreshed on every disk hit) are
+    deleted. Thread safe.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        disk_dir=None,
+        disk_max_bytes: int = 256 * 1024 * 1024,
+    ):
+        """Create a cache holding up to max_bytes in memory; disk_dir enables the disk tier."""
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.disk_size = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self.disk_size = sum(size for _, size, _ in self._disk_files())
+
+    def get(self, key: str):
+        """Return the cached bytes for key, or None on a miss."""
+        with self._lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return value
+        value = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store(key, value)
+        return value
+
+    def put(self, key: str, value: bytes):
+        """Cache value under key in memory and, if enabled, on disk."""
+        with self._lock:
+            self._store(key, value)
+        self._write_disk(key, value)
+
+    def clear(self):
+        """Drop every in-memory entry. The disk tier is left in place."""
+        with self._lock:
+            self.entries.clear()
+            self.size = 0
+
+    def _store(self, key: str, value: bytes):
+        """Insert into the memory tier and evict least recently used entries."""
+        if len(value) > self.max_bytes:
+            return
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous)
+        self.entries[key] = value
+        self.size += len(value)
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], key)
+
+    def _read_disk(self, key: str):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                value = f.read()
+            os.utime(path)  # Mark as recently used for pruning
+            return value
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, value: bytes):
+        """Write atomically so concurrent readers never see a partial entry."""
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = 0
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(value)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Could not write result cache entry {key}: {e}")
+            return
+        with self._disk_lock:
+            self.disk_size += len(value) - replaced
+            if self.disk_size > self.disk_max_bytes:
+                self._prune_disk()
+
+    def _disk_files(self) -> list:
+        """Return (mtime, size, path) for every disk tier entry."""
+        files = []
+        for directory, _, names in os.walk(self.disk_dir):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue  # Removed concurrently
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _prune_disk(self):
+        """Delete the oldest files until the disk tier fits disk_max_bytes. Needs _disk_lock."""
+        files = sorted(self._disk_files())
+        self.disk_size = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if self.disk_size <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.disk_size -= size
@@ -0,0 +1,209 @@
+# pylint: skip-file
+"""
+Incrementally maintained OHLCV rollups for charts. Each ticker keeps its source
+bars and 1min/5min/15min/1h/1d aggregates; new bars only recompute the buckets
+they touch, so chart requests at a supported frequency are a slice.
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .bar_store import BAR_DTYPE
+
+ROLLUP_FREQUENCIES = ("1min", "5min", "15min", "1h", "1d")
+ROLLUP_MAX_DAYS = int(os.getenv("ROLLUP_MAX_DAYS", "60"))
+ROLLUP_MAX_ENTRIES = int(os.getenv("ROLLUP_MAX_ENTRIES", "64"))
+_FREQUENCY_UNITS = {"s": 1, "min": 60, "t": 60, "h": 3600, "d": 86400}
+
+
+def frequency_seconds(frequency: str):
+    """Return the length in seconds of a pandas-style frequency ("5min", "1h", "1d"), or None."""
+    match = re.fullmatch(r"\s*(\d*)\s*([a-zA-Z]+)\s*", str(frequency))
+    unit = _FREQUENCY_UNITS.get(match.group(2).lower()) if match else None
+    if unit is None:
+        return None
+    return int(match.group(1) or 1) * unit
+
+
+def _floor(times, seconds: int):
+    """Floor datetime64[s] values to bucket starts of seconds since midnight 1970-01-01."""
+    ticks = np.asarray(times, dtype="datetime64[s]").astype(np.int64)
+    return (ticks // seconds * seconds).astype("datetime64[s]")
+
+
+def aggregate(bars: np.ndarray, seconds: int) -> np.ndarray:
+    """Aggregate time-sorted BAR_DTYPE bars into buckets of seconds labelled by bucket start."""
+    if len(bars) == 0:
+        return np.zeros(0, dtype=BAR_DTYPE)
+    buckets = _floor(bars["time"], seconds)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(bars)] - 1
+    out = np.zeros(len(starts), dtype=BAR_DTYPE)
+    out["time"] = buckets[starts]
+    out["open"] = bars["open"][starts]
+    out["high"] = np.maximum.reduceat(bars["high"], starts)
+    out["low"] = np.minimum.reduceat(bars["low"], starts)
+    out["close"] = bars["close"][ends]
+    out["volume"] = np.add.reduceat(bars["volume"], starts)
+    return out
+
+
+class _Series:
+    """Append-mostly BAR_DTYPE array with amortized O(1) growth."""
+
+    __slots__ = ("buf", "n")
+
+    def __init__(self):
+        self.buf = np.zeros(0, dtype=BAR_DTYPE)
+        self.n = 0
+
+    def view(self) -> np.ndarray:
+        return self.buf[: self.n]
+
+    def truncate(self, n: int):
+        self.n = min(self.n, n)
+
+    def extend(self, rows: np.ndarray):
+        needed = self.n + len(rows)
+        if needed > len(self.buf):
+            grown = np.zeros(max(needed, 2 * len(self.buf), 1024), dtype=BAR_DTYPE)
+            grown[: self.n] = self.buf[: self.n]
+            self.buf = grown
+        self.buf[self.n : needed] = rows
+        self.n = needed
+
+
+class Rollups:
+    """
+    Source bars for one ticker and bar size plus their rollups.
+    update recomputes each level from the first bucket the new bars touch,
+    which keeps the partial last bucket correct as bars stream in.
+    """
+
+    def __init__(self, frequencies=ROLLUP_FREQUENCIES):
+        """Create empty rollups at the given frequencies."""
+        self.frequencies = tuple(frequencies)
+        self.source = _Series()
+        self.levels = {frequency_seconds(f): _Series() for f in self.frequencies}
+
+    @property
+    def last_time(self):
+        """Time of the latest source bar, or None before the first update."""
+        return self.source.buf["time"][self.source.n - 1] if self.source.n else None
+
+    def update(self, bars):
+        """
+        Add time-sorted BAR_DTYPE bars. A bar at the latest time replaces it; bars
+        older than that are merged in and every level is rebuilt.
+        """
+        if len(bars) == 0:
+            return
+        first = bars["time"][0]
+        last_time = self.last_time
+        if last_time is not None and first < last_time:
+            merged = np.concatenate((bars, self.source.view()))
+            _, keep = np.unique(merged["time"], return_index=True)
+            bars = merged[keep]
+            first = bars["time"][0]
+            self.source.truncate(0)
+        elif last_time is not None and first == last_time:
+            self.source.truncate(self.source.n - 1)
+        self.source.extend(bars)
+        source = self.source.view()
+        for seconds, level in self.levels.items():
+            bucket = _floor(first, seconds)
+            rows = aggregate(source[np.searchsorted(source["time"], bucket) :], seconds)
+            level.truncate(int(np.searchsorted(level.view()["time"], bucket)))
+            level.extend(rows)
+
+    def slice(self, frequency: str, start=None, end=None) -> np.ndarray:
+        """
+        Return the rollup buckets for frequency from the bucket containing start
+        through end, as a view. Raises KeyError for unsupported frequencies.
+        """
+        level = self.levels[frequency_seconds(frequency)].view()
+        seconds = frequency_seconds(frequency)
+        lo = (
+            0
+            if start is None
+            else np.searchsorted(level["time"], _floor(start, seconds))
+        )
+        if end is None:
+            hi = len(level)
+        else:
+            hi = np.searchsorted(level["time"], np.datetime64(end, "s"), "right")
+        return level[lo:hi]
+
+
+class RollupCache:
+    """
+    Rollups per (ticker, bar size) kept current with a bar store. get pulls only
+    bars from the latest ingested time onwards, which the store reads from the
+    last day partitions; newly stored days before that trigger a rebuild.
+    Each entry holds at most the last max_days stored days (rebuilt once it
+    has grown to twice that) and at most max_entries are kept, least recently
+    used first out.
+    """
+
+    def __init__(
+        self,
+        store,
+        frequencies=ROLLUP_FREQUENCIES,
+        max_days: int = ROLLUP_MAX_DAYS,
+        max_entries: int = ROLLUP_MAX_ENTRIES,
+    ):
+        """Create an empty cache reading from store."""
+        self.store = store
+        self.frequencies = frequencies
+        self.max_days = max_days
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def supports(self, frequency: str) -> bool:
+        """Return True if frequency is one of the maintained rollups."""
+        seconds = frequency_seconds(frequency)
+        return seconds in {frequency_seconds(f) for f in self.frequencies}
+
+    def get(self, ticker: str, bar_size: str) -> Rollups:
+        """Return up-to-date rollups for ticker and bar_size."""
+        return self._entry(ticker, bar_size)[0]
+
+    def _entry(self, ticker: str, bar_size: str):
+        """Update and return the (rollups, known days, first held day) entry."""
+        key = (ticker.upper(), bar_size)
+        with self._lock:
+            rollups, known, first = self.entries.pop(key, (None, set(), None))
+            days = self.store.days(ticker, bar_size)
+            held = [day for day in days if first is None or day >= first]
+            start = None if rollups is None else rollups.last_time
+            # Days backfilled before the latest bar need a rebuild
+            if (
+                start is None
+                or len(held) > 2 * self.max_days
+                or any(day < start.astype("datetime64[D]") for day in set(days) - known)
+            ):
+                rollups = Rollups(self.frequencies)
+                # None when every stored day is held
+                first = days[-self.max_days] if len(days) > self.max_days else None
+                start = first
+            rollups.update(self.store.read(ticker, bar_size, start=start))
+            self.entries[key] = entry = (rollups, set(days), first)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            return entry
+
+    def slice(self, ticker: str, bar_size: str, frequency: str, start=None, end=None):
+        """
+        Return a copy of the up-to-date rollup buckets (see Rollups.slice), or
+        None if start is before the days held for ticker.
+        """
+        with self._lock:
+            rollups, _, first = self._entry(ticker, bar_size)
+            if first is not None and (start is None or np.datetime64(start) < first):
+                return None
+            return rollups.slice(frequency, start, end).copy()
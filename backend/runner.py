@@ -0,0 +1,171 @@
+# pylint: skip-file
+"""
+Multi-ticker backtest runner. Fans BacktestEngine jobs across a process pool
+and yields results as they finish.
+"""
+
+import itertools
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from .backtest import BacktestEngine
+from .shared_bars import SharedBars, attach, detach
+
+
+def default_bar_loader(cfg: dict):
+    """Load bars for a job config from the local bar store (see BacktestEngine.stored_bars)."""
+    return BacktestEngine.stored_bars(cfg["ticker"], cfg["interval"], cfg["timeframe"])
+
+
+def _run_chunk(chunk, bar_loader, include_trades):
+    """
+    Run a chunk of job configs in a worker process. Returns a list of results.
+    Shared bar blocks attached for the chunk are unmapped once it is done.
+    """
+    results = []
+    attached = []
+    for cfg in chunk:
+        try:
+            if "bars" in cfg:
+                bars = cfg["bars"]
+            elif "shared_bars" in cfg:
+                bars = attach(cfg["shared_bars"])
+                attached.append(cfg["shared_bars"])
+            else:
+                bars = bar_loader(cfg)
+            result = BacktestEngine(cfg).run(bars)
+        except Exception as e:  # Report per-job failures without losing the chunk
+            results.append(_error_result(cfg, f"{type(e).__name__}: {e}"))
+            continue
+        if not include_trades:
+            result.pop("trades")
+        results.append(result)
+    bars = None  # Drop the last views before unmapping
+    for handle in attached:
+        detach(handle)
+    return results
+
+
+def _chunked(jobs, size: int):
+    """Yield successive lists of up to size jobs."""
+    it = iter(jobs)
+    while chunk := list(itertools.islice(it, size)):
+        yield chunk
+
+
+def _share_bars(jobs, shared: SharedBars, bar_loader):
+    """
+    Load bars once per (ticker, interval, timeframe) in this process, publish
+    them to shared memory and yield jobs carrying the handle instead of bars.
+    Jobs whose bars fail to load are passed through so the worker reports it.
+    """
+    for cfg in jobs:
+        if "bars" not in cfg:
+            key = (cfg.get("ticker"), cfg.get("interval"), cfg.get("timeframe"))
+            try:
+                if key not in shared.blocks:
+                    bars = BacktestEngine.bars_to_arrays(bar_loader(cfg))
+                    shared.publish(key, bars)
+                cfg = {**cfg, "shared_bars": shared.blocks[key][1]}
+            except Exception as e:  # Let the worker retry and report the failure
+                print(f"Could not share bars for {key}: {e}")
+        yield cfg
+
+
+def _error_result(cfg: dict, message: str) -> dict:
+    """Build the result dict reported for a failed or timed-out job."""
+    return {"ticker": cfg.get("ticker"), "result": "error", "error": message}
+
+
+def run_backtests(
+    jobs,
+    max_workers=None,
+    chunksize: int = 1,
+    timeout=None,
+    bar_loader=default_bar_loader,
+    include_trades: bool = False,
+    share_bars: bool = False,
+):
+    """
+    Run BacktestEngine configs (one dict per ticker, optionally with "bars") on a
+    ProcessPoolExecutor and yield result dicts in completion order.
+    Jobs are sent to workers in chunks of chunksize, with at most max_workers
+    chunks in flight so job iterables are consumed lazily. timeout is a per-job
+    limit in seconds; a chunk gets timeout * len(chunk) from submission, after
+    which its jobs are reported as errors. A worker stuck on a timed-out chunk
+    keeps its slot until it finishes, since pool workers cannot be interrupted.
+    bar_loader must be a picklable module-level callable taking the job config.
+    With share_bars, bars are loaded once per ticker in this process and
+    published to shared memory, and workers attach read-only views to them.
+    """
+    workers = max_workers or os.cpu_count() or 1
+    shared = SharedBars()
+    if share_bars:
+        jobs = _share_bars(jobs, shared, bar_loader)
+    chunks = _chunked(jobs, max(chunksize, 1))
+    executor = ProcessPoolExecutor(max_workers=workers)
+    pending = {}
+    abandoned = set()
+    next_chunk = next(chunks, None)
+    try:
+        while pending or next_chunk is not None:
+            while next_chunk is not None and len(pending) + len(abandoned) < workers:
+                future = executor.submit(
+                    _run_chunk, next_chunk, bar_loader, include_trades
+                )
+                deadline = (
+                    time.monotonic() + timeout * len(next_chunk) if timeout else None
+                )
+                pending[future] = (next_chunk, deadline)
+                next_chunk = next(chunks, None)
+            deadlines = [d for _, d in pending.values() if d is not None]
+            wait_for = max(min(deadlines) - time.monotonic(), 0) if deadlines else None
+            done, _ = wait(
+                set(pending) | abandoned, timeout=wait_for, return_when=FIRST_COMPLETED
+            )
+            abandoned -= done
+            for future in done:
+                if future not in pending:
+                    continue
+                chunk, _ = pending.pop(future)
+                try:
+                    results = future.result()
+                except Exception as e:  # Broken pool or unpicklable chunk
+                    results = [
+                        _error_result(cfg, f"{type(e).__name__}: {e}") for cfg in chunk
+                    ]
+                yield from results
+            now = time.monotonic()
+            for future, (chunk, deadline) in list(pending.items()):
+                if deadline is not None and now >= deadline:
+                    del pending[future]
+                    if not future.cancel():
+                        abandoned.add(future)
+                    for cfg in chunk:
+                        yield _error_result(cfg, f"timed out after {timeout}s")
+    finally:
+        executor.shutdown(wait=not abandoned, cancel_futures=True)
+        shared.close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    tickers = sys.argv[1:] or ["AAPL", "MSFT", "GOOG", "AMZN", "TSLA", "NVDA", "META"]
+    watchlist = [
+        {
+            "ticker": ticker,
+            "shares": 10,
+            "grid_up": 20,
+            "grid_down": 20,
+            "grid_increment": 0.05,
+            "timeframe": "1 D",
+            "interval": "1 min",
+        }
+        for ticker in tickers
+    ]
+    started = time.time()
+    for outcome in run_backtests(watchlist, timeout=60, share_bars=True):
+        print(outcome["ticker"], outcome["result"], outcome.get("performance"))
+    print(f"Ran {len(watchlist)} backtests in {time.time() - started:.2f}s")
@@ -0,0 +1,94 @@
+# pylint: skip-file
+"""
+Shared-memory bar columns for worker processes. The parent publishes a ticker's
+NumPy bar columns once; workers attach read-only views onto the same pages
+instead of unpickling or reloading their own copy.
+"""
+
+from multiprocessing import shared_memory
+
+import numpy as np
+
+_ALIGN = 64
+_attached = {}  # Block name -> SharedMemory mapped in this process until detach
+
+
+class SharedBars:
+    """
+    Owner of published bar blocks, one per key. Each block stores the columns
+    back to back; publish returns a small picklable handle for attach.
+    Blocks are unlinked on close (or when used as a context manager, on exit).
+    """
+
+    def __init__(self):
+        """Start with no published blocks."""
+        self.blocks = {}
+
+    def publish(self, key, columns: dict) -> dict:
+        """Copy a dict of NumPy columns into shared memory once per key. Returns its handle."""
+        if key in self.blocks:
+            return self.blocks[key][1]
+        arrays = {
+            name: np.ascontiguousarray(values) for name, values in columns.items()
+        }
+        layout = []
+        size = 0
+        for name, values in arrays.items():
+            layout.append((name, values.dtype.str, values.shape, size))
+            size += -(-values.nbytes // _ALIGN) * _ALIGN
+        block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for (name, dtype, shape, offset), values in zip(layout, arrays.values()):
+            np.ndarray(shape, dtype, buffer=block.buf, offset=offset)[...] = values
+        handle = {"name": block.name, "columns": layout}
+        self.blocks[key] = (block, handle)
+        return handle
+
+    def close(self):
+        """Release and unlink every published block."""
+        for block, _ in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach(handle: dict) -> dict:
+    """
+    Return read-only NumPy views of the columns published under handle.
+    The block stays mapped until detach, so repeated attaches are free and
+    views outlive the publisher unlinking the name.
+    """
+    block = _attached.get(handle["name"])
+    if block is None:
+        block = shared_memory.SharedMemory(name=handle["name"])
+        _attached[handle["name"]] = block
+    columns = {}
+    for name, dtype, shape, offset in handle["columns"]:
+        # frombuffer holds an export on block.buf, which is what lets detach
+        # refuse to unmap while a view is alive
+        count = int(np.prod(shape))
+        view = np.frombuffer(block.buf, dtype, count, offset).reshape(shape)
+        view.flags.writeable = False
+        columns[name] = view
+    return columns
+
+
+def detach(handle: dict) -> bool:
+    """
+    Unmap the block attached for handle in this process. Returns False (and
+    keeps it mapped) while views from attach are still referenced.
+    """
+    block = _attached.pop(handle["name"], None)
+    if block is None:
+        return True
+    try:
+        block.close()
+    except BufferError:  # Views still export the buffer
+        _attached[handle["name"]] = block
+        return False
+    return True
@@ -0,0 +1,197 @@
+# pylint: skip-file
+"""
+Test gap planning, pacing and retries of the historical backfill against a fake client.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from backend.backfill import Backfiller, TokenBucket, missing_ranges
+from backend.bar_store import MARKET_TZ, BarStore
+
+
+class FakeClock:
+    """Monotonic clock advanced only by sleep."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeClient:
+    """
+    Stand-in for IBKRClient.get_historical_data serving 3 minute bars for every
+    business day in the requested span, except holidays. The first fail_times
+    calls raise a pacing error.
+    """
+
+    def __init__(self, holidays=(), fail_times=0):
+        self.holidays = {np.datetime64(day) for day in holidays}
+        self.fail_times = fail_times
+        self.calls = []
+
+    def get_historical_data(self, ticker, duration, bar_size, end_date_time=""):
+        self.calls.append((ticker, duration, end_date_time))
+        if len(self.calls) <= self.fail_times:
+            raise RuntimeError(
+                "Historical Market Data Service error message:pacing violation"
+            )
+        last = np.datetime64(
+            f"{end_date_time[:4]}-{end_date_time[4:6]}-{end_date_time[6:8]}"
+        )
+        first = np.busday_offset(last, 1 - int(duration.split()[0]), roll="backward")
+        days = np.arange(first, last + 1)
+        days = [d for d in days[np.is_busday(days)] if d not in self.holidays]
+        return [
+            {
+                "date": np.datetime64(day, "s") + np.timedelta64(34200 + 60 * i, "s"),
+                "open": 10.0,
+                "high": 10.5,
+                "low": 9.5,
+                "close": 10.0 + i,
+                "volume": 100,
+            }
+            for day in days
+            for i in range(3)
+        ]
+
+
+def test_missing_ranges_skip_stored_days_and_weekends(tmp_path):
+    """Test only unstored business days are planned, split into request-sized chunks."""
+    store = BarStore(str(tmp_path))
+    store.write(
+        "AAPL",
+        "1 min",
+        FakeClient().get_historical_data("AAPL", "1 D", "1 min", "20250910 23:59:59"),
+    )
+    ranges = missing_ranges(store, "AAPL", "1 min", "2025-09-01", "2025-09-19")
+    assert [(str(a), str(b)) for a, b in ranges] == [
+        ("2025-09-01", "2025-09-05"),
+        ("2025-09-08", "2025-09-09"),
+        ("2025-09-11", "2025-09-17"),
+        ("2025-09-18", "2025-09-19"),
+    ]
+
+
+def test_days_stored_mid_session_are_requested_again(tmp_path):
+    """Test a partition last written during its own session counts as missing."""
+    store = BarStore(str(tmp_path))
+    client = FakeClient()
+    for end in ("20250910 23:59:59", "20250911 23:59:59"):
+        store.write("AAPL", "1 min", client.get_historical_data("AAPL", "1 D", "", end))
+    midday = datetime(2025, 9, 11, 12, 0, tzinfo=MARKET_TZ).timestamp()
+    path = os.path.join(store._dir("AAPL", "1 min"), "2025-09-11.npy")
+    os.utime(path, (midday, midday))
+    assert [str(day) for day in store.complete_days("AAPL", "1 min")] == ["2025-09-10"]
+    ranges = missing_ranges(store, "AAPL", "1 min", "2025-09-10", "2025-09-12")
+    assert [(str(a), str(b)) for a, b in ranges] == [("2025-09-11", "2025-09-12")]
+
+
+def test_open_day_is_refetched_only_once_stale(tmp_path):
+    """Test a just-written open session is served until refresh seconds pass."""
+    store = BarStore(str(tmp_path))
+    client = FakeClient()
+    store.write(
+        "AAPL",
+        "1 min",
+        client.get_historical_data("AAPL", "1 D", "", "20250911 23:59:59"),
+    )
+    midday = datetime(2025, 9, 11, 12, 0, tzinfo=MARKET_TZ).timestamp()
+    path = os.path.join(store._dir("AAPL", "1 min"), "2025-09-11.npy")
+    os.utime(path, (midday, midday))
+    fresh = missing_ranges(
+        store, "AAPL", "1 min", "2025-09-11", "2025-09-11", clock=lambda: midday + 30
+    )
+    stale = missing_ranges(
+        store, "AAPL", "1 min", "2025-09-11", "2025-09-11", clock=lambda: midday + 60
+    )
+    assert fresh == [] and [(str(a), str(b)) for a, b in stale] == [
+        ("2025-09-11", "2025-09-11")
+    ]
+
+
+def test_default_burst_stays_under_per_contract_pacing():
+    """Test the default bucket never sends six requests within two seconds."""
+    clock = FakeClock()
+    bucket = TokenBucket(clock=clock, sleep=clock.sleep)
+    for _ in range(6):
+        bucket.acquire()
+    assert clock.now > 2.0
+
+
+def test_bucket_is_shared_safely_between_threads():
+    """Test concurrent callers never take more than the burst plus the refill."""
+    bucket = TokenBucket(rate=20.0, capacity=5)
+    start = time.monotonic()
+    taken = []
+
+    def worker():
+        for _ in range(5):
+            bucket.acquire()
+            taken.append(time.monotonic() - start)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+    assert len(taken) == 20 and elapsed >= (20 - 5) / 20.0 - 0.01
+    assert sum(t < 0.25 for t in taken) <= 5 + 0.25 * 20
+
+
+def test_backfill_fetches_only_gaps_and_marks_holidays(tmp_path):
+    """Test a second backfill of the same range sends no requests."""
+    store = BarStore(str(tmp_path))
+    client = FakeClient(holidays=["2025-09-01"])
+    clock = FakeClock()
+    backfiller = Backfiller(
+        client, store, TokenBucket(clock=clock, sleep=clock.sleep), sleep=clock.sleep
+    )
+    summary = backfiller.backfill("AAPL", "1 min", "2025-09-01", "2025-09-12")
+    assert summary["requests"] == 2 and not summary["failed"]
+    assert client.calls[0][1:] == ("5 D", "20250905 23:59:59")
+    assert summary["bars"] == 9 * 3
+    assert len(store.days("AAPL", "1 min")) == 10
+    assert backfiller.plan("AAPL", "1 min", "2025-09-01", "2025-09-12") == []
+
+
+def test_pacing_and_backoff(tmp_path):
+    """Test requests wait on the token bucket and errors back off before retrying."""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=0.1, capacity=2, clock=clock, sleep=clock.sleep)
+    for _ in range(4):
+        bucket.acquire()
+    assert clock.now == 20.0  # Two burst tokens, then one every 10 seconds
+    clock = FakeClock()
+    client = FakeClient(fail_times=2)
+    backfiller = Backfiller(
+        client,
+        BarStore(str(tmp_path)),
+        TokenBucket(capacity=10, clock=clock, sleep=clock.sleep),
+        sleep=clock.sleep,
+    )
+    summary = backfiller.backfill("MSFT", "1 min", "2025-09-15", "2025-09-15")
+    assert summary["requests"] == 3 and summary["bars"] == 3
+    assert 1.0 <= clock.sleeps[0] <= 2.0 and 2.0 <= clock.sleeps[1] <= 4.0
+    failing = Backfiller(
+        FakeClient(fail_times=99),
+        BarStore(str(tmp_path)),
+        max_retries=1,
+        sleep=clock.sleep,
+    )
+    assert (
+        len(failing.backfill("TSLA", "1 min", "2025-09-15", "2025-09-15")["failed"])
+        == 1
+    )
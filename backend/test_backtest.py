@@ -7,7 +7,10 @@ import os
 
 from fastapi.testclient import TestClient
 
+from backend import bar_store
+from backend.bar_store import BarStore
 from backend.main import app
+from backend.test_bar_store import ibkr_bars
 
 os.environ["TEST_MODE"] = "1"
 client = TestClient(app)
@@ -76,3 +79,13 @@ def test_backtest_detailed_invalid_method():
     """Test GET request to /backtest/detailed returns 405 Method Not Allowed."""
     resp = client.get("/backtest/detailed")
     assert resp.status_code == 405
+
+
+def test_backtest_unsupported_timeframe(tmp_path, monkeypatch):
+    """Test an unsupported timeframe over stored bars returns 422, also for jobs."""
+    store = BarStore(str(tmp_path))
+    store.write("AAPL", "1 min", ibkr_bars("20250912", 30))
+    monkeypatch.setattr(bar_store, "_default_store", store)
+    payload = {**valid_payload, "timeframe": "1mo"}
+    assert client.post("/backtest", json=payload).status_code == 422
+    assert client.post("/backtest/jobs", json=payload).status_code == 422
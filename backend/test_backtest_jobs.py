@@ -0,0 +1,114 @@
+# pylint: skip-file
+"""
+Test background backtest jobs: the worker pool and queue limit, and the
+/backtest/jobs endpoints including progress streamed as server-sent events.
+"""
+
+import json
+import os
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.backtest import BacktestEngine
+from backend.backtest_jobs import JobManager, iter_chunks
+from backend.main import app
+
+os.environ["TEST_MODE"] = "1"
+client = TestClient(app)
+
+PARAMS = {
+    "ticker": "AAPL",
+    "shares": 10,
+    "grid_up": 1.0,
+    "grid_down": 1.0,
+    "grid_increment": 0.05,
+    "timeframe": "1 D",
+    "interval": "1 min",
+}
+
+
+def wait_for(job, timeout=5):
+    deadline = time.monotonic() + timeout
+    while job.status not in ("done", "failed"):
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_jobs_run_off_the_caller_and_respect_queue_limit():
+    """Test jobs run on worker threads, report progress and fail cleanly."""
+    manager = JobManager(workers=1, queue_limit=2)
+    release = threading.Event()
+
+    def blocked(progress):
+        progress(1, 4)
+        release.wait(5)
+        progress(4, 4)
+        return threading.current_thread().name
+
+    def broken(progress):
+        raise ValueError("no bars")
+
+    first = manager.submit(blocked)
+    second = manager.submit(broken)
+    with pytest.raises(OverflowError):
+        manager.submit(blocked)
+    assert second.status == "queued"  # One worker, still busy with first
+    release.set()
+    wait_for(first)
+    wait_for(second)
+    assert first.result.startswith("backtest-job") and first.progress == 1.0
+    assert second.snapshot()["error"] == "no bars"
+    assert manager.stats() == {"queued": 0, "running": 0, "done": 1, "failed": 1}
+    manager.close()
+
+
+def test_finished_jobs_are_capped():
+    """Test only the newest retained finished jobs are kept."""
+    manager = JobManager(workers=1, retained=2)
+    jobs = []
+    for n in range(4):
+        jobs.append(manager.submit(lambda progress, n=n: n))
+        wait_for(jobs[-1])
+    assert manager.get(jobs[0].id) is None  # Pruned when the fourth was queued
+    assert [manager.get(job.id).result for job in jobs[1:]] == [1, 2, 3]
+    manager.submit(lambda progress: 4)
+    assert manager.get(jobs[1].id) is None and manager.get(jobs[2].id) is not None
+    manager.close()
+
+
+def test_chunks_replay_to_the_same_result():
+    """Test chunked replay matches one run over all bars."""
+    bars = BacktestEngine.synthetic_bars("AAPL")
+    engine = BacktestEngine(PARAMS)
+    chunks = list(iter_chunks(bars, 100))
+    assert [len(chunk["close"]) for chunk in chunks] == [100, 100, 100, 90]
+    snapshots = list(engine.run_stream(chunks))
+    expected = engine.run(bars)
+    assert snapshots[-1]["performance"] == expected["performance"]
+    assert [t for s in snapshots for t in s["trades"]] == expected["trades"]
+
+
+def test_job_endpoints_stream_progress_and_return_result(monkeypatch):
+    """Test submit, SSE progress events and the finished job's result."""
+    monkeypatch.setattr(main, "iter_chunks", lambda bars: iter_chunks(bars, 100))
+    resp = client.post("/backtest/jobs", json=PARAMS)
+    assert resp.status_code == 202
+    job_id = resp.json()["job_id"]
+    with client.stream("GET", f"/backtest/jobs/{job_id}/events") as stream:
+        body = "".join(stream.iter_text())
+    events = [
+        (block.split("\n")[0][len("event: ") :], json.loads(block.split("data: ")[1]))
+        for block in body.strip().split("\n\n")
+    ]
+    assert events[-1][0] == "done" and events[-1][1]["bars_processed"] == 390
+    assert all(name == "progress" for name, _ in events[:-1])
+    status = client.get(f"/backtest/jobs/{job_id}").json()
+    assert status["status"] == "done" and status["progress"] == 1.0
+    assert status["result"]["result"] == "success"
+    assert "total_return" in status["result"]["performance"]
+    assert client.get("/backtest/jobs/missing").status_code == 404
+    assert client.get("/backtest/jobs/missing/events").status_code == 404
@@ -0,0 +1,150 @@
+# pylint: skip-file
+"""
+Test the partitioned local bar store and the endpoints that read from it.
+"""
+
+import os
+from types import SimpleNamespace
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from backend import bar_store
+from backend.backtest import BacktestEngine
+from backend.bar_store import BarStore
+from backend.ibkr_client import IBKRClient
+from backend.main import app
+
+os.environ["TEST_MODE"] = "1"
+client = TestClient(app)
+
+
+def ibkr_bars(day: str, n: int, price: float = 100.0):
+    """Bars as IBApp.historicalData records them, one minute apart from 09:30."""
+    return [
+        {
+            "date": f"{day}  {9 + (30 + i) // 60:02d}:{(30 + i) % 60:02d}:00 US/Eastern",
+            "open": price + i,
+            "high": price + i + 0.5,
+            "low": price + i - 0.5,
+            "close": price + i + 0.25,
+            "volume": 100 + i,
+        }
+        for i in range(n)
+    ]
+
+
+def test_write_merge_and_range_pushdown(tmp_path, monkeypatch):
+    """Test day partitions merge on rewrite and reads only open overlapping days."""
+    store = BarStore(str(tmp_path))
+    assert store.write("aapl", "1 min", ibkr_bars("20250911", 10)) == 10
+    store.write("AAPL", "1 min", ibkr_bars("20250912", 5))
+    store.write("AAPL", "1 min", ibkr_bars("20250912", 8, price=200.0))
+    assert [str(d) for d in store.days("AAPL", "1 min")] == ["2025-09-11", "2025-09-12"]
+    opened = []
+    load = np.load
+    monkeypatch.setattr(
+        bar_store.np, "load", lambda path, **kw: opened.append(path) or load(path, **kw)
+    )
+    day = store.read("AAPL", "1 min", "2025-09-12", "2025-09-12")
+    assert len(opened) == 1
+    assert len(day) == 8 and day["open"][0] == 200.0
+    window = store.read("AAPL", "1 min", "2025-09-11T09:35:00", "2025-09-12T09:31:00")
+    assert str(window["time"][0]) == "2025-09-11T09:35:00"
+    assert len(window) == 5 + 2
+    last = store.read_last("AAPL", "1 min", "1 D")
+    assert len(last) == 8
+    assert len(store.read("MSFT", "1 min")) == 0
+
+
+def test_fetched_bars_land_in_store(tmp_path, monkeypatch):
+    """Test IBKRClient and request_historical_data_ibkr save bars to the store."""
+    store = BarStore(str(tmp_path))
+    ib_client = IBKRClient(bar_store=store)
+    ib_client.connected = True
+    fetched = [SimpleNamespace(**bar) for bar in ibkr_bars("20250912", 3)]
+    monkeypatch.setattr(ib_client.ib, "reqHistoricalData", lambda *a, **kw: fetched)
+    assert ib_client.get_historical_data("TSLA", "1 D", "1 min") is fetched
+    assert len(store.read("TSLA", "1 min")) == 3
+
+    class FakeApp:
+        historical_data = []
+
+        def reqHistoricalData(self, *args):
+            self.historical_data = ibkr_bars("20250915", 4)
+            self.historical_done = True
+
+        def run(self):
+            pass
+
+    BacktestEngine.request_historical_data_ibkr(
+        {
+            "app_instance": FakeApp(),
+            "contract_instance": SimpleNamespace(symbol="NVDA"),
+            "bar_store": store,
+        }
+    )
+    assert len(store.read("NVDA", "1 min", "2025-09-15")) == 4
+
+
+def test_endpoints_read_from_store(tmp_path, monkeypatch):
+    """Test /api/historical and /minute_chart serve stored bars."""
+    store = BarStore(str(tmp_path))
+    store.write("META", "1 min", ibkr_bars("20250912", 30))
+    monkeypatch.setattr(bar_store, "_default_store", store)
+    resp = client.get(
+        "/api/historical",
+        params={"symbol": "META", "start": "2025-09-12", "end": "2025-09-12"},
+    )
+    assert resp.status_code == 200
+    bars = resp.json()["bars"]
+    assert len(bars) == 30 and bars[0]["time"] == "2025-09-12T09:30:00"
+    resp = client.post(
+        "/minute_chart",
+        json={
+            "ticker": "META",
+            "duration": "1 D",
+            "bar_size": "1 min",
+            "frequency": "5min",
+        },
+    )
+    assert resp.status_code == 200
+    chart = resp.json()["chart"]
+    assert len(chart) == 6
+    assert chart[0]["volume"] == sum(range(100, 105))
+    resp = client.post(
+        "/minute_chart",
+        json={
+            "ticker": "META",
+            "duration": "1 D",
+            "bar_size": "1 min",
+            "frequency": "7min",
+            "columnar": True,
+        },
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["chart"] == [] and data["columns"]["time"][1] == "2025-09-12T09:34:00"
+    assert data["columns"]["volume"][0] == sum(range(100, 104))  # 09:27 bucket
+
+
+def test_columnar_ingestion_matches_row_parsing():
+    """Test BarData-like objects and IBKR strings parse column-wise like the row path."""
+    rows = ibkr_bars("20250912", 3) + [
+        {**bar, "date": bar["date"][:18]} for bar in ibkr_bars("20251231", 2)
+    ]
+    objects = [SimpleNamespace(**bar, average=0.0, barCount=1) for bar in rows]
+    records = bar_store.to_records(objects)
+    assert records["time"].astype(str).tolist() == [
+        "2025-09-12T09:30:00",
+        "2025-09-12T09:31:00",
+        "2025-09-12T09:32:00",
+        "2025-12-31T09:30:00",
+        "2025-12-31T09:31:00",
+    ]
+    assert records["volume"].tolist() == [100, 101, 102, 100, 101]
+    assert str(bar_store.parse_times(["20250912"])[0]) == "2025-09-12T00:00:00"
+    assert str(bar_store.parse_times(["2025-09-12 09:30:00-04:00"])[0]).endswith(
+        "09:30:00"
+    )
+    assert len(bar_store.to_records([])) == 0
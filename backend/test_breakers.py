@@ -0,0 +1,125 @@
+# pylint: skip-file
+"""
+Test the per-dependency circuit breakers: failure and latency tripping,
+half-open probing, in-flight load shedding and the 503 fast path.
+"""
+
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import breakers
+from backend.backfill import Backfiller, TokenBucket
+from backend.bar_store import BarStore
+from backend.breakers import CircuitBreaker, CircuitOpenError, breaker
+from backend.main import app
+
+os.environ["TEST_MODE"] = "1"
+client = TestClient(app)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def call(cb, clock=None, seconds=0.0, error=None):
+    with cb.guard():
+        if clock is not None:
+            clock.now += seconds
+        if error is not None:
+            raise error
+
+
+def test_failures_open_then_half_open_probe_closes():
+    """Test consecutive failures open the breaker and one probe may close it."""
+    clock = Clock()
+    cb = CircuitBreaker("ibkr", failure_threshold=3, reset_timeout=10, clock=clock)
+    with pytest.raises(ValueError):
+        call(cb, error=ValueError("bad input"))  # Not an upstream failure
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            call(cb, error=ConnectionError("reset"))
+    assert cb.state == "open"
+    with pytest.raises(CircuitOpenError) as rejected:
+        call(cb)
+    assert rejected.value.reason == "open" and rejected.value.retry_after == 10
+    clock.now = 10
+    with cb.guard():  # Probe
+        with pytest.raises(CircuitOpenError, match="probing"):
+            call(cb)
+    assert cb.state == "closed"
+    for _ in range(3):
+        with pytest.raises(TimeoutError):
+            call(cb, error=TimeoutError())
+    clock.now = 20
+    with pytest.raises(OSError):
+        call(cb, error=OSError("disk"))  # Failed probe reopens
+    assert cb.state == "open" and cb.opened_at == 20
+    assert cb.stats()["rejected"] == 2
+
+
+def test_slow_calls_open_and_slow_probe_reopens():
+    """Test p95 latency above the threshold opens the breaker."""
+    clock = Clock()
+    cb = CircuitBreaker(
+        "ibkr", latency_threshold=1.0, min_samples=20, reset_timeout=5, clock=clock
+    )
+    for _ in range(18):
+        call(cb, clock, 0.1)
+    call(cb, clock, 3.0)
+    call(cb, clock, 3.0)
+    assert cb.state == "open" and cb.p95() > 1.0
+    clock.now += 5
+    call(cb, clock, 2.0)
+    assert cb.state == "open"
+    clock.now += 5
+    call(cb, clock, 0.1)
+    assert cb.state == "closed" and cb.p95() == 0.0
+
+
+def test_calls_beyond_max_in_flight_are_shed():
+    """Test saturated breakers shed new calls without opening."""
+    cb = CircuitBreaker("store", max_in_flight=2)
+    with cb.guard(), cb.guard():
+        with pytest.raises(CircuitOpenError, match="overloaded"):
+            call(cb)
+    call(cb)
+    assert cb.stats()["shed"] == 1 and cb.state == "closed"
+
+
+def test_open_breaker_stops_backfill_without_spending_tokens(tmp_path):
+    """Test a backfill fails fast on an open breaker."""
+
+    class Client:
+        calls = 0
+
+        def get_historical_data(self, *args, **kwargs):
+            Client.calls += 1
+            raise ConnectionError("gateway down")
+
+    cb = CircuitBreaker("ibkr_historical", failure_threshold=2)
+    bucket = TokenBucket(capacity=10)
+    backfiller = Backfiller(
+        Client(), BarStore(str(tmp_path)), bucket, sleep=lambda s: None, breaker=cb
+    )
+    with pytest.raises(CircuitOpenError):
+        backfiller.backfill("AAPL", "1 min", "2025-09-08", "2025-09-12")
+    assert Client.calls == 2 and bucket.tokens >= 7
+
+
+def test_open_breaker_returns_503_only_for_its_dependency(monkeypatch):
+    """Test an open bar_store breaker fails store endpoints fast and leaves others alone."""
+    cb = CircuitBreaker("bar_store", reset_timeout=30)
+    cb._open()
+    monkeypatch.setitem(breakers._breakers, "bar_store", cb)
+    resp = client.get("/api/historical", params={"symbol": "AAPL"})
+    assert resp.status_code == 503
+    assert int(resp.headers["Retry-After"]) in (29, 30)
+    assert breaker("bar_store") is cb and breaker("ibkr_historical").state == "closed"
+    assert client.get("/us_stock_tickers").status_code == 200
+    assert client.get("/health").json()["breakers"]["bar_store"]["state"] == "open"
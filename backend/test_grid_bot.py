@@ -0,0 +1,106 @@
+# pylint: skip-file
+"""
+Unit tests for GridBot and its PositionBook in backend/grid_bot.py.
+"""
+
+import pytest
+
+from backend.grid_bot import GridBot, PositionBook
+
+GRID = {"grid_up": 1.05, "grid_down": 0.95, "grid_increment": 0.01}
+
+
+def test_resting_orders_fill_against_bar_range():
+    """Test a resting buy fills on the bar that reaches it and re-arms the grid."""
+    bot = GridBot("BURU", 100, GRID)
+    order = bot.place_order(0.99, "buy")
+    assert order == {"ticker": "BURU", "shares": 100, "price": 0.99, "side": "buy"}
+    assert bot.place_order(0.99, "buy") is None
+    assert bot.on_bar(high=1.02, low=0.995) == []
+    fills = bot.on_bar(high=1.01, low=0.985)
+    assert [(t["side"], t["price"]) for t in fills] == [("buy", 0.99)]
+    assert bot.get_positions() == {0.99: {"side": "buy", "shares": 100}}
+    assert bot.get_open_orders() == [(1.0, "sell")]
+    fills = bot.on_bar(high=1.0, low=0.99)
+    assert [(t["side"], t["price"]) for t in fills] == [("sell", 1.0)]
+    assert bot.get_positions() == {}
+    assert bot.get_open_orders() == [(0.99, "buy")]
+
+
+def test_process_bars_matches_on_bar():
+    """Test the array path produces the same fills as bar-by-bar matching."""
+    highs = [1.0, 1.03, 0.99, 1.05, 0.97, 1.01]
+    lows = [0.98, 0.99, 0.95, 0.99, 0.95, 0.96]
+    batch, single = GridBot("BURU", 10, GRID), GridBot("BURU", 10, GRID)
+    for bot in (batch, single):
+        for price in (0.96, 0.97, 0.98):
+            bot.place_order(price, "buy")
+        bot.place_order(1.03, "sell")
+    fills = batch.process_bars(highs, lows)
+    for bar, (high, low) in enumerate(zip(highs, lows)):
+        single.on_bar(high, low, bar)
+    assert fills == single.get_trades()
+    assert len(fills) > 6
+    assert batch.get_positions() == single.get_positions()
+
+
+def test_prices_snap_to_levels_without_float_drift():
+    """Test float noise rounds down onto the intended level, not one tick below."""
+    bot = GridBot("BURU", 10, GRID)
+    assert bot.round_to(0.29) == 0.29
+    assert bot.level_index(0.29 + 0.7) == bot.level_index(0.99) == 4
+    assert bot.level_index(0.9949) == 4
+    assert bot.level_index(0.94) is None
+
+
+def test_grid_grows_for_orders_outside_it():
+    """Test orders past either bound add levels instead of being rejected."""
+    bot = GridBot(
+        "BURU", 10, {"upper_price": 1.0, "lower_price": 0.98, "grid_increment": 0.01}
+    )
+    assert (bot.grid_up, bot.grid_down) == (1.0, 0.98)  # Aliases of grid_up/grid_down
+    bot.place_order(0.99, "buy")
+    assert bot.place_order(1.02, "sell")["price"] == 1.02
+    assert bot.place_order(0.955, "buy")["price"] == 0.95
+    assert bot.level_prices == [0.95, 0.96, 0.97, 0.98, 0.99, 1.0, 1.01, 1.02]
+    assert bot.get_open_orders() == [(0.95, "buy"), (0.99, "buy"), (1.02, "sell")]
+    fills = bot.on_bar(high=1.0, low=0.94)
+    assert [(t["side"], t["price"]) for t in fills] == [("buy", 0.99), ("buy", 0.95)]
+    assert bot.get_positions() == {
+        0.95: {"side": "buy", "shares": 10},
+        0.99: {"side": "buy", "shares": 10},
+    }
+
+
+def test_process_bars_matches_on_bar_as_the_grid_grows():
+    """Test batch matching re-indexes its thresholds when levels are added below."""
+    grid = {**GRID, "grid_up": 0.97}
+    highs = [0.97, 0.96, 0.95, 0.93, 0.96, 0.94, 0.98]
+    lows = [0.96, 0.95, 0.93, 0.91, 0.93, 0.92, 0.95]
+    batch, single = GridBot("BURU", 10, grid), GridBot("BURU", 10, grid)
+    for bot in (batch, single):
+        bot.place_order(0.95, "sell")
+    fills = batch.process_bars(highs, lows)
+    for bar, (high, low) in enumerate(zip(highs, lows)):
+        single.on_bar(high, low, bar)
+    assert fills == single.get_trades() and len(fills) > 4
+    assert min(batch.level_prices) < 0.95
+    assert batch.get_positions() == single.get_positions()
+    assert batch.get_open_orders() == single.get_open_orders()
+
+
+def test_position_book_slots():
+    """Test PositionBook occupancy checks and that it has no per-instance dict."""
+    book = PositionBook(3)
+    assert not hasattr(book, "__dict__")
+    book.set(2, 1, 50)
+    assert book.is_occupied(2) and not book.is_occupied(0)
+    assert list(book.occupied()) == [(2, 1, 50)]
+    book.clear(2)
+    assert list(book.occupied()) == []
+
+
+def test_invalid_increment():
+    """Test an increment below one price tick is rejected."""
+    with pytest.raises(ValueError):
+        GridBot("BURU", 10, {**GRID, "grid_increment": 0.001})
@@ -34,3 +34,12 @@ def test_historical_invalid_method():
     """Test POST request to /ibkr/historical returns 405 Method Not Allowed."""
     resp = client.post("/api/historical")
     assert resp.status_code == 405
+
+
+def test_historical_non_positive_max_bars():
+    """Test GET /api/historical with max_bars below 1 returns 422."""
+    for max_bars in (0, -5):
+        resp = client.get(
+            "/api/historical", params={"symbol": "AAPL", "max_bars": max_bars}
+        )
+        assert resp.status_code == 422
@@ -0,0 +1,166 @@
+# pylint: skip-file
+"""
+Test the pooled IBKR sessions: client ID allocation, checkout across sessions,
+reconnection of dropped sessions and the get_minute_chart integration.
+"""
+
+import threading
+
+import numpy as np
+
+from backend import ibkr_pool
+from backend.backtest import IBApp
+from backend.bar_store import BarStore
+from backend.ibkr_pool import IBKRSessionPool
+from backend.ibkr_simulator import GatewaySimulator
+from backend.minute_chart import get_minute_chart
+
+
+class FakeClient:
+    """IBKRClient stand-in whose socket can be dropped and refused."""
+
+    refuse = False
+
+    def __init__(self):
+        self.connected = False
+        self.socket_up = False
+        self.connects = []
+        self.bar_store = None
+
+    def connect(self, host="127.0.0.1", port=4002, client_id=1):
+        self.connects.append(client_id)
+        self.connected = self.socket_up = not FakeClient.refuse
+
+    def is_connected(self):
+        return self.connected
+
+    def is_alive(self):
+        return self.connected and self.socket_up
+
+    def disconnect(self):
+        self.connected = self.socket_up = False
+
+    def get_historical_data(self, ticker, duration, bar_size, end_date_time=""):
+        day = np.datetime64(
+            f"{end_date_time[:4]}-{end_date_time[4:6]}-{end_date_time[6:8]}", "s"
+        )
+        return [
+            {
+                "date": day + np.timedelta64(34200 + 60 * i, "s"),
+                "open": 1.0,
+                "high": 1.0,
+                "low": 1.0,
+                "close": 1.0,
+                "volume": 1,
+            }
+            for i in range(5)
+        ]
+
+
+def make_pool(size=3):
+    FakeClient.refuse = False
+    return IBKRSessionPool(size, client_factory=FakeClient, health_interval=0).start()
+
+
+def test_sessions_get_distinct_client_ids_and_release_them():
+    """Test each session connects once under its own ID and close frees the IDs."""
+    pool = make_pool()
+    ids = [session.client_id for session in pool.sessions]
+    assert len(set(ids)) == 3 and set(ids) <= IBApp._used_client_ids
+    assert pool.stats() == {"size": 3, "idle": 3, "busy": 0, "down": 0}
+    for _ in range(6):
+        with pool.session():
+            pass
+    assert all(
+        session.client.connects == [session.client_id] for session in pool.sessions
+    )
+    pool.close()
+    assert not set(ids) & IBApp._used_client_ids
+
+
+def test_concurrent_requests_multiplex_across_sessions():
+    """Test concurrent callers hold different sessions and extra callers wait."""
+    pool = make_pool(size=2)
+    held = []
+    entered = threading.Barrier(3)
+    release = threading.Event()
+
+    def request():
+        with pool.session(timeout=5) as client:
+            held.append(client)
+            entered.wait()
+            release.wait()
+
+    threads = [threading.Thread(target=request) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    entered.wait()
+    assert len({id(client) for client in held}) == 2
+    try:
+        with pool.session(timeout=0.05):
+            raise AssertionError("Pool should be exhausted")
+    except TimeoutError:
+        pass
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert pool.stats()["idle"] == 2
+    pool.close()
+
+
+def test_dropped_sessions_reconnect():
+    """Test a connection error and a dropped idle socket both trigger reconnects."""
+    pool = make_pool(size=2)
+    try:
+        with pool.session() as client:
+            raise ConnectionError("socket closed")
+    except ConnectionError:
+        pass
+    assert pool.stats()["down"] == 1
+    pool.sessions[1].client.socket_up = False
+    FakeClient.refuse = True
+    assert pool.check_health() == 0
+    assert all(session.retry_at > 0 for session in pool.sessions)
+    FakeClient.refuse = False
+    for session in pool.sessions:
+        session.retry_at = 0.0
+    assert pool.check_health() == 2
+    assert client.connects == [client.connects[0]] * 3  # Same client ID each time
+    pool.close()
+
+
+def test_minute_chart_backfills_through_pool(tmp_path, monkeypatch):
+    """Test get_minute_chart borrows a pooled session instead of connecting."""
+    pool = make_pool(size=1)
+    monkeypatch.setattr(ibkr_pool, "_default_pool", pool)
+    columns = get_minute_chart(
+        "AAPL", "1 D", "1 min", "1min", store=BarStore(str(tmp_path))
+    )
+    assert len(columns["time"]) == 5
+    assert pool.sessions[0].client.connects == [pool.sessions[0].client_id]
+    pool.close()
+
+
+def test_real_sessions_connect_and_serve_any_thread(tmp_path):
+    """Test IBKRClient sessions started off the main thread serve worker threads."""
+    with GatewaySimulator() as simulator:
+        pool = IBKRSessionPool(2, port=simulator.port, health_interval=0)
+        starter = threading.Thread(target=pool.start)  # As the app lifespan does
+        starter.start()
+        starter.join()
+        assert pool.stats()["idle"] == 2
+        results = []
+
+        def fetch():
+            with pool.session() as client:
+                results.append(
+                    len(client.get_historical_data("AAPL", "1 D", "5 mins", "20250912"))
+                )
+
+        threads = [threading.Thread(target=fetch) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == [78] * 4 and pool.stats()["idle"] == 2
+        pool.close()
@@ -0,0 +1,90 @@
+# pylint: skip-file
+"""
+Test IBKRClient and IBApp against the local gateway simulator: connecting,
+historical bars, concurrent requests, pacing errors and dropped connections.
+"""
+
+import asyncio
+import time
+
+import pytest
+from ibapi.contract import Contract
+
+from backend.backtest import BacktestEngine, IBApp
+from backend.bar_store import BarStore
+from backend.ibkr_client import IBKRClient
+from backend.ibkr_simulator import GatewaySimulator
+
+
+def stock(symbol: str) -> Contract:
+    contract = Contract()
+    contract.symbol = symbol
+    contract.secType = "STK"
+    contract.exchange = "SMART"
+    contract.currency = "USD"
+    return contract
+
+
+def connect_app(simulator) -> IBApp:
+    app = IBApp()
+    app.connect("127.0.0.1", simulator.port, IBApp.get_next_client_id())
+    app.start_reader()
+    return app
+
+
+def test_ib_insync_client_fetches_bars_and_scans(tmp_path):
+    """Test IBKRClient connects, stores fetched bars and reads scanner results."""
+    store = BarStore(str(tmp_path))
+    # ib_insync runs this thread's loop; an earlier asyncio.run may have unset it
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    with GatewaySimulator() as simulator:
+        client = IBKRClient(bar_store=store)
+        client_id = IBApp.get_next_client_id()
+        client.connect(port=simulator.port, client_id=client_id)
+        assert client.is_alive()
+        bars = client.get_historical_data("AAPL", "2 D", "5 mins", "20250912 23:59:59")
+        assert len(bars) == 2 * 78
+        assert [str(day) for day in store.days("AAPL", "5 mins")] == [
+            "2025-09-11",
+            "2025-09-12",
+        ]
+        assert client.get_us_stock_tickers(limit=3) == ["AAPL", "MSFT", "NVDA"]
+        client.disconnect()
+        IBApp.release_client_id(client_id)
+    loop.close()
+    asyncio.set_event_loop(None)
+
+
+def test_ibapp_requests_run_concurrently():
+    """Test many in-flight requests on one connection overlap their latency."""
+    with GatewaySimulator(latency=0.3) as simulator:
+        app = connect_app(simulator)
+        started = time.monotonic()
+        futures = [
+            app.submit_historical(stock(symbol), "20250912 23:59:59")[1]
+            for symbol in ("AAPL", "MSFT", "TSLA", "SNDL", "AMD", "NVDA")
+        ]
+        assert [len(future.result(5)) for future in futures] == [390] * 6
+        assert time.monotonic() - started < 6 * 0.3
+        ticks = BacktestEngine.request_realtime_data_ibkr(app, stock("SNDL"))
+        assert len(ticks) == 5 and ticks["tick_type"][0] == 4
+        app.disconnect()
+        assert simulator.stats["historical_requests"] == 6
+
+
+def test_pacing_errors_and_disconnects_fail_requests():
+    """Test pacing violations surface as IBKR error 162 and drops as ConnectionError."""
+    with GatewaySimulator(pacing=(2, 60)) as simulator:
+        app = connect_app(simulator)
+        futures = [app.submit_historical(stock("AAPL"))[1] for _ in range(3)]
+        assert len(futures[0].result(5)) == 390 and len(futures[1].result(5)) == 390
+        with pytest.raises(RuntimeError, match="162"):
+            futures[2].result(5)
+        app.disconnect()
+    with GatewaySimulator(disconnect_after=2) as simulator:
+        app = connect_app(simulator)
+        assert len(app.submit_historical(stock("AAPL"))[1].result(5)) == 390
+        with pytest.raises(ConnectionError):
+            app.submit_historical(stock("AAPL"))[1].result(5)
+        assert simulator.stats["disconnects"] == 1
@@ -0,0 +1,72 @@
+# pylint: skip-file
+"""
+Test the vectorized performance metrics and their use by BacktestEngine.
+"""
+
+import numpy as np
+
+from backend import metrics
+from backend.backtest import BacktestEngine
+
+
+def test_drawdown_and_returns():
+    """Test drawdown, total return and turnover on a known equity curve."""
+    equity = metrics.equity_curve([0.0, 10.0, -20.0, 5.0], 100.0)
+    assert np.allclose(metrics.drawdowns(equity), [0.0, 0.0, 30 / 110, 5 / 110])
+    assert np.isclose(metrics.max_drawdown(equity), 30 / 110)
+    assert np.isclose(metrics.max_drawdown(equity[2:], peak=110.0), 30 / 110)
+    assert np.isclose(metrics.total_return(equity), 0.05)
+    assert np.allclose(metrics.period_returns(equity), [0.1, -30 / 110, 25 / 80])
+    assert metrics.win_rate([1.0, -1.0, 2.0, np.nan]) == 2 / 3
+    assert metrics.turnover([50.0, 150.0], 100.0) == 2.0
+    assert metrics.periods_per_year("1 min") == 252 * 390
+    assert metrics.periods_per_year("1 hour") == 252 * 6.5
+    assert metrics.periods_per_year("1d") == 252
+
+
+def test_batched_metrics_match_single_runs():
+    """Test metrics over a batch of curves match per-curve results and moments add up."""
+    rng = np.random.default_rng(7)
+    returns = rng.normal(0.0005, 0.01, (5, 200))
+    equity = 1000.0 * np.cumprod(1 + returns, axis=1)
+    sharpe = metrics.sharpe_ratio(returns, periods=252)
+    sortino = metrics.sortino_ratio(returns, periods=252)
+    for row in range(5):
+        r = returns[row]
+        assert np.isclose(sharpe[row], r.mean() / r.std() * np.sqrt(252))
+        downside = np.sqrt(np.mean(np.minimum(r, 0) ** 2))
+        assert np.isclose(sortino[row], r.mean() / downside * np.sqrt(252))
+        assert np.isclose(
+            metrics.max_drawdown(equity)[row], metrics.max_drawdown(equity[row])
+        )
+    halves = metrics.return_moments(returns[:, :90]) + metrics.return_moments(
+        returns[:, 90:]
+    )
+    assert np.allclose(metrics.sharpe_from_moments(halves, 252), sharpe)
+
+
+def test_engine_performance_uses_equity_curve():
+    """Test run() reports curve metrics and run_stream() reproduces them across chunks."""
+    cfg = {
+        "ticker": "AAPL",
+        "shares": 10,
+        "grid_up": 10,
+        "grid_down": 10,
+        "grid_increment": 0.05,
+        "timeframe": "1 D",
+        "interval": "1 min",
+    }
+    engine = BacktestEngine(cfg)
+    bars = BacktestEngine.synthetic_bars("AAPL")
+    performance = engine.run(bars)["performance"]
+    levels = engine.grid_levels(float(bars["close"][0]))
+    capital = levels[:-1].sum() * cfg["shares"]
+    assert np.isclose(
+        performance["total_return"], performance["pnl"] / capital, atol=1e-4
+    )
+    assert 0.0 <= performance["max_drawdown"] < 1.0
+    assert performance["turnover"] > 0.0
+    chunks = [{k: v[i : i + 100] for k, v in bars.items()} for i in range(0, 390, 100)]
+    streamed = list(engine.run_stream(chunks))[-1]["performance"]
+    for name in ("total_return", "max_drawdown", "sharpe_ratio", "sortino_ratio"):
+        assert np.isclose(streamed[name], performance[name])
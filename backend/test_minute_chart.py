@@ -7,7 +7,10 @@ import os
 
 from fastapi.testclient import TestClient
 
+from backend import bar_store, main
+from backend.bar_store import BarStore
 from backend.main import app
+from backend.test_bar_store import ibkr_bars
 
 os.environ["TEST_MODE"] = "1"
 client = TestClient(app)
@@ -45,3 +48,27 @@ def test_minute_chart_invalid_method():
     """Test GET request to /minute_chart returns 405 Method Not Allowed."""
     resp = client.get("/minute_chart")
     assert resp.status_code == 405
+
+
+def test_minute_chart_backfills_through_pool(tmp_path, monkeypatch):
+    """Test days backfilled through the running pool are in the first response."""
+    store = BarStore(str(tmp_path))
+    monkeypatch.setattr(bar_store, "_default_store", store)
+    pool = object()
+    calls = []
+
+    def backfill(ticker, duration, bar_size, to_store, to_pool):
+        calls.append((ticker, duration, bar_size, to_pool))
+        to_store.write(ticker, bar_size, ibkr_bars("20250912", 30))
+
+    monkeypatch.setattr(main, "default_pool", lambda: pool)
+    monkeypatch.setattr(main, "backfill_chart", backfill)
+    body = {
+        "ticker": "FILL",
+        "duration": "1 D",
+        "bar_size": "1 min",
+        "frequency": "5min",
+    }
+    resp = client.post("/minute_chart", json=body)
+    assert resp.status_code == 200 and len(resp.json()["chart"]) == 6
+    assert calls == [("FILL", "1 D", "1 min", pool)]
@@ -0,0 +1,141 @@
+# pylint: skip-file
+"""
+Test the realtime feed: one upstream subscription per symbol fanned out to
+every client, conflation for slow clients, and the /ws/realtime endpoint.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from backend import main
+from backend.ibkr_simulator import GatewaySimulator
+from backend.main import app
+from backend.realtime_feed import IBKRUpstream, RealtimeFeed
+from backend.tick_buffer import TickRing
+
+os.environ["TEST_MODE"] = "1"
+
+
+class FakeUpstream:
+    """Upstream whose ticks are pushed by the test, as the IBKR reader thread would."""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.subscribed = []
+        self.cancelled = []
+        self.listeners = {}
+
+    def subscribe(self, symbol, listener):
+        if self.error is not None:
+            raise self.error
+        self.subscribed.append(symbol)
+        key = len(self.subscribed)
+        self.listeners[key] = (listener, TickRing(capacity=8))
+        return key, self.listeners[key][1]
+
+    def push(self, key, tick_type, price):
+        listener, ring = self.listeners[key]
+        ring.append(tick_type, price=price)
+        listener(key, ring)
+
+    def unsubscribe(self, key):
+        self.cancelled.append(key)
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_one_subscription_fans_out_and_slow_clients_are_conflated():
+    """Test clients of a symbol share one subscription and lagging ones get conflated."""
+    upstream = FakeUpstream()
+
+    async def scenario():
+        feed = RealtimeFeed(upstream, max_batch=3)
+        fast, slow = [await feed.subscribe("AAPL") for _ in range(2)]
+        other = await feed.subscribe("MSFT")
+        assert upstream.subscribed == ["AAPL", "MSFT"]
+        assert feed.stats() == {"symbols": 2, "clients": 3}
+        threading.Thread(target=upstream.push, args=(1, 4, 10.0)).start()
+        message = json.loads(await fast.next_message())
+        assert message["tick_type"] == [4] and message["price"] == [10.0]
+        assert message["size"] == [None] and message["conflated"] == 0
+        for i in range(3):
+            upstream.push(1, 4 if i % 2 else 9, 11.0 + i)
+        assert json.loads(await fast.next_message())["price"] == [11.0, 12.0, 13.0]
+        for i in range(6):  # Wraps the 8-tick ring past the slow client's cursor
+            upstream.push(1, 4 if i % 2 else 9, 20.0 + i)
+        message = json.loads(await slow.next_message())
+        assert message["tick_type"] == [9, 4] and message["price"] == [24.0, 25.0]
+        assert message["conflated"] == 10 - 2 and slow.conflated == 8
+        await feed.unsubscribe(fast)
+        assert upstream.cancelled == []
+        await feed.unsubscribe(slow)
+        await feed.unsubscribe(other)
+        assert upstream.cancelled == [1, 2] and feed.stats()["symbols"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_websocket_streams_ticks_and_closes_when_unavailable(monkeypatch):
+    """Test /ws/realtime delivers ticks and closes with 1011 without market data."""
+    upstream = FakeUpstream()
+    feed = RealtimeFeed(upstream)
+    monkeypatch.setattr(main, "realtime_feed", feed)
+    monkeypatch.setattr(main, "TEST_MODE", True)
+    # One portal for both sessions, so handlers finish after their socket closes
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws/realtime?symbol=sndl") as ws:
+            wait_until(lambda: upstream.subscribed)
+            # Keep ticking: the client only sees ticks after its cursor is set
+            stop = threading.Event()
+
+            def tick_until_stopped():
+                while not stop.wait(0.01):
+                    upstream.push(1, 4, 0.85)
+
+            pusher = threading.Thread(target=tick_until_stopped)
+            pusher.start()
+            message = ws.receive_json()
+            stop.set()
+            pusher.join()
+            assert message["symbol"] == "SNDL" and set(message["price"]) == {0.85}
+        monkeypatch.setattr(
+            main, "realtime_feed", RealtimeFeed(FakeUpstream(ConnectionError("down")))
+        )
+        with client.websocket_connect("/ws/realtime?symbol=AAPL") as ws:
+            with pytest.raises(WebSocketDisconnect) as closed:
+                ws.receive_json()
+            assert closed.value.code == 1011
+        wait_until(lambda: upstream.cancelled == [1])
+
+
+def test_ibkr_upstream_streams_from_gateway():
+    """Test IBKRUpstream subscribes through IBApp against the gateway simulator."""
+    with GatewaySimulator(tick_interval=0.01) as simulator:
+        upstream = IBKRUpstream(port=simulator.port)
+
+        async def scenario():
+            feed = RealtimeFeed(upstream)
+            client = await feed.subscribe("AAPL")
+            tick_types = set()
+            while 4 not in tick_types:  # Last price; sizes and volume arrive too
+                message = json.loads(await asyncio.wait_for(client.next_message(), 5))
+                tick_types.update(message["tick_type"])
+            await feed.unsubscribe(client)
+            return message
+
+        message = asyncio.run(scenario())
+        assert message["symbol"] == "AAPL"
+        assert any(price and price > 0 for price in message["price"])
+        upstream.close()
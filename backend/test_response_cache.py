@@ -0,0 +1,132 @@
+# pylint: skip-file
+"""
+Test the market-data response cache: TTL and LRU bounds, ETag matching and
+the 304 and immutable-history behaviour of /api/historical and /minute_chart.
+"""
+
+import os
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from backend import bar_store, main, wire
+from backend.bar_store import MARKET_TZ, BarStore
+from backend.main import app
+from backend.response_cache import ResponseCache, etag_matches
+from backend.test_bar_store import ibkr_bars
+
+os.environ["TEST_MODE"] = "1"
+client = TestClient(app)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_expiry_immutable_entries_and_lru_bound():
+    """Test mutable entries expire, immutable ones stay and size is bounded."""
+    clock = Clock()
+    cache = ResponseCache(max_bytes=10, ttl=30, clock=clock)
+    live = cache.put("live", b"1234")
+    cache.put("settled", b"5678", immutable=True)
+    assert cache.get("live") is live and live.etag.startswith('"')
+    clock.now = 30
+    assert cache.get("live") is None and cache.get("settled").immutable
+    for key in ("a", "b", "c"):  # c evicts the least recently used entry
+        cache.put(key, b"123")
+    assert cache.get("settled") is None and cache.get("a") is not None
+    cache.put("huge", b"x" * 11)
+    assert cache.get("huge") is None
+    assert cache.stats() == {
+        "entries": 3,
+        "immutable": 0,
+        "bytes": 9,
+        "hits": 3,
+        "misses": 3,
+    }
+
+
+def test_etag_matches():
+    """Test If-None-Match lists, weak tags and the wildcard."""
+    assert etag_matches('"a", "b"', '"b"')
+    assert etag_matches('W/"b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches("", '"b"') and not etag_matches('"bc"', '"b"')
+
+
+def test_historical_etags_304_and_settled_history(tmp_path, monkeypatch):
+    """Test settled past ranges are immutable, revalidate with 304 and rekey on rewrites."""
+    store = BarStore(str(tmp_path))
+    store.write("ETAG", "1 min", ibkr_bars("20250911", 30))
+    monkeypatch.setattr(bar_store, "_default_store", store)
+    monkeypatch.setattr(wire, "brotli", None)
+    params = {"symbol": "ETAG", "start": "2025-09-11", "end": "2025-09-11"}
+    identity = {"Accept-Encoding": "identity"}
+    first = client.get("/api/historical", params=params, headers=identity)
+    assert first.status_code == 200 and len(first.json()["bars"]) == 30
+    assert "immutable" in first.headers["Cache-Control"]
+    etag = first.headers["ETag"]
+    resp = client.get(
+        "/api/historical", params=params, headers={**identity, "If-None-Match": etag}
+    )
+    assert resp.status_code == 304 and resp.content == b""
+    gzipped = client.get(
+        "/api/historical",
+        params=params,
+        headers={"Accept-Encoding": "gzip", "If-None-Match": etag},
+    )
+    assert gzipped.status_code == 200  # Another representation, another tag
+    assert gzipped.headers["ETag"] == f'{etag[:-1]}-gzip"'
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    # Rewriting a settled day (a gap fill) changes the key and the tag
+    store.write("ETAG", "1 min", ibkr_bars("20250911", 31))
+    resp = client.get(
+        "/api/historical", params=params, headers={**identity, "If-None-Match": etag}
+    )
+    assert resp.status_code == 200 and resp.headers["ETag"] != etag
+    assert len(resp.json()["bars"]) == 31
+    # A range over a business day not stored yet can still grow
+    params["end"] = "2025-09-12"
+    resp = client.get("/api/historical", params=params)
+    assert resp.headers["Cache-Control"] == "no-cache"
+    # So can a range ending today or later, and a day saved mid-session
+    today = {**params, "end": str(bar_store.market_today())}
+    assert client.get("/api/historical", params=today).headers["Cache-Control"] == (
+        "no-cache"
+    )
+    store.write("ETAG", "1 min", ibkr_bars("20250912", 5, price=200.0))
+    midday = datetime(2025, 9, 12, 12, 0, tzinfo=MARKET_TZ).timestamp()
+    os.utime(os.path.join(store._dir("ETAG", "1 min"), "2025-09-12.npy"), (midday,) * 2)
+    resp = client.get("/api/historical", params=params)
+    assert len(resp.json()["bars"]) == 36
+    assert resp.headers["Cache-Control"] == "no-cache"
+
+
+def test_minute_chart_is_served_from_cache(tmp_path, monkeypatch):
+    """Test repeated /minute_chart requests are not rebuilt and return 304 on match."""
+    store = BarStore(str(tmp_path))
+    store.write("CHRT", "1 min", ibkr_bars("20250912", 30))
+    monkeypatch.setattr(bar_store, "_default_store", store)
+    body = {
+        "ticker": "CHRT",
+        "duration": "1 D",
+        "bar_size": "1 min",
+        "frequency": "5min",
+    }
+    first = client.post("/minute_chart", json=body)
+    assert first.status_code == 200 and len(first.json()["chart"]) == 6
+    assert first.headers["Cache-Control"] == "no-cache"  # Relative window
+
+    def fail(*args, **kwargs):
+        raise AssertionError("chart rebuilt on a cache hit")
+
+    monkeypatch.setattr(main, "chart_bars", fail)
+    resp = client.post(
+        "/minute_chart", json=body, headers={"If-None-Match": first.headers["ETag"]}
+    )
+    assert resp.status_code == 304
+    assert client.post("/minute_chart", json=body).json() == first.json()
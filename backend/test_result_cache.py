@@ -0,0 +1,80 @@
+# pylint: skip-file
+"""
+Test the content-addressed backtest result cache and its use by /backtest.
+"""
+
+import os
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from backend.main import app, result_cache
+from backend.result_cache import ResultCache, bar_fingerprint, params_key
+
+os.environ["TEST_MODE"] = "1"
+client = TestClient(app)
+
+
+def test_keys_normalize_params_and_track_bars():
+    """Test equivalent params share a key and changed bars do not."""
+    bars = {"close": np.array([1.0, 2.0, 3.0])}
+    fingerprint = bar_fingerprint(bars)
+    a = params_key("/backtest", {"ticker": "aapl", "grid_up": 5}, fingerprint)
+    b = params_key("/backtest", {"ticker": "AAPL ", "grid_up": 5.0}, fingerprint)
+    assert a == b
+    changed = bar_fingerprint({"close": np.array([1.0, 2.0, 3.5])})
+    assert params_key("/backtest", {"ticker": "AAPL", "grid_up": 5}, changed) != a
+    assert (
+        params_key("/backtest/detailed", {"ticker": "AAPL", "grid_up": 5}, fingerprint)
+        != a
+    )
+
+
+def test_lru_evicts_by_size_and_disk_tier_promotes(tmp_path):
+    """Test least recently used entries are evicted by size and reloaded from disk."""
+    cache = ResultCache(max_bytes=10, disk_dir=str(tmp_path))
+    cache.put("aa1", b"12345")
+    cache.put("bb2", b"12345")
+    assert cache.get("aa1") == b"12345"  # aa1 is now most recently used
+    cache.put("cc3", b"12345")
+    assert list(cache.entries) == ["aa1", "cc3"]
+    assert cache.size == 10
+    assert cache.get("bb2") == b"12345"  # Served from disk and promoted
+    assert "bb2" in cache.entries
+    memory_only = ResultCache(max_bytes=10)
+    memory_only.put("aa1", b"12345678901")  # Larger than the whole cache
+    assert memory_only.get("aa1") is None
+    assert memory_only.misses == 1
+
+
+def test_disk_tier_prunes_least_recently_used_files(tmp_path):
+    """Test writes past disk_max_bytes delete the oldest files first."""
+    cache = ResultCache(max_bytes=100, disk_dir=str(tmp_path), disk_max_bytes=15)
+    for n, key in enumerate(("aa1", "bb2", "cc3")):
+        cache.put(key, b"12345")
+        os.utime(cache._disk_path(key), (n, n))
+    cache.clear()
+    assert cache._read_disk("aa1") == b"12345"  # Read refreshes its mtime
+    cache.put("dd4", b"12345")  # 20 bytes: bb2 is the least recently used
+    assert cache.disk_size == 15 and cache.get("bb2") is None
+    assert all(cache.get(key) == b"12345" for key in ("aa1", "cc3", "dd4"))
+    assert ResultCache(disk_dir=str(tmp_path)).disk_size == 15
+
+
+def test_backtest_served_from_cache():
+    """Test a repeated /backtest request is answered from the cache unchanged."""
+    payload = {
+        "ticker": "CACHE",
+        "shares": 10,
+        "grid_up": 5,
+        "grid_down": 5,
+        "grid_increment": 0.1,
+        "timeframe": "1 D",
+        "interval": "1 min",
+    }
+    first = client.post("/backtest", json=payload)
+    hits = result_cache.hits
+    second = client.post("/backtest", json=payload)
+    assert first.status_code == second.status_code == 200
+    assert result_cache.hits == hits + 1
+    assert second.json() == first.json()
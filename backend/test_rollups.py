@@ -0,0 +1,104 @@
+# pylint: skip-file
+"""
+Test incrementally maintained chart rollups against a full pandas resample.
+"""
+
+import warnings
+
+import numpy as np
+
+from backend.bar_store import BAR_DTYPE, BarStore
+from backend.minute_chart import resample_bars
+from backend.rollups import ROLLUP_FREQUENCIES, RollupCache, Rollups
+
+
+def minute_bars(day: str, n: int = 390, seed: int = 0) -> np.ndarray:
+    """One session of random minute bars starting 09:30 on day."""
+    rng = np.random.default_rng(seed)
+    bars = np.zeros(n, dtype=BAR_DTYPE)
+    bars["time"] = np.datetime64(f"{day}T09:30:00") + np.arange(n) * np.timedelta64(
+        60, "s"
+    )
+    bars["close"] = 100 + np.cumsum(rng.normal(0, 0.1, n))
+    bars["open"] = bars["close"] - rng.normal(0, 0.05, n)
+    bars["high"] = np.maximum(bars["open"], bars["close"]) + 0.05
+    bars["low"] = np.minimum(bars["open"], bars["close"]) - 0.05
+    bars["volume"] = rng.integers(100, 1000, n)
+    return bars
+
+
+def assert_matches_resample(rollups: Rollups, bars: np.ndarray):
+    for frequency in ROLLUP_FREQUENCIES:
+        expected = resample_bars(bars, frequency)
+        got = rollups.slice(frequency)
+        assert len(got) == len(expected["time"]), frequency
+        assert np.array_equal(got["time"], expected["time"])
+        for name in ("open", "high", "low", "close", "volume"):
+            assert np.allclose(got[name], expected[name])
+
+
+def test_incremental_updates_match_full_resample():
+    """Test streamed chunks, a revised last bar and late bars keep every level exact."""
+    bars = np.concatenate(
+        (minute_bars("2025-09-11", seed=1), minute_bars("2025-09-12", seed=2))
+    )
+    rollups = Rollups()
+    for start in range(0, 600, 37):  # Chunks split mid-bucket
+        rollups.update(bars[start : min(start + 37, 600)])
+    revised = bars[599:600].copy()
+    revised["high"] += 5.0
+    revised["volume"] += 10
+    rollups.update(revised)  # Revision of the partial last bar
+    bars[599] = revised[0]
+    assert_matches_resample(rollups, bars[:600])
+    rollups.update(bars[600:])
+    assert_matches_resample(rollups, bars)
+    late = Rollups()
+    late.update(bars[390:])
+    late.update(bars[:390])  # Earlier day arriving after a later one
+    assert_matches_resample(late, bars)
+
+
+def test_cache_follows_store(tmp_path):
+    """Test the cache picks up appended bars and backfilled earlier days from the store."""
+    store = BarStore(str(tmp_path))
+    day1, day2 = minute_bars("2025-09-11", seed=3), minute_bars("2025-09-12", seed=4)
+    store.write("AAPL", "1 min", day2[:100])
+    cache = RollupCache(store)
+    assert len(cache.slice("AAPL", "1 min", "1h")) == 3  # 09:30-11:09
+    store.write("AAPL", "1 min", day2[100:])
+    store.write("AAPL", "1 min", day1)
+    assert cache.supports("60min") and not cache.supports("2min")
+    assert_matches_resample(cache.get("AAPL", "1 min"), np.concatenate((day1, day2)))
+    window = cache.slice("AAPL", "1 min", "1d", "2025-09-12", "2025-09-12T23:59:59")
+    assert len(window) == 1 and window["volume"][0] == day2["volume"].sum()
+
+
+def test_cache_holds_recent_days_and_evicts_least_recent(tmp_path):
+    """Test entries keep the last max_days days, rebuild at twice that and are LRU bounded."""
+    store = BarStore(str(tmp_path))
+    days = ["2025-09-08", "2025-09-09", "2025-09-10", "2025-09-11", "2025-09-12"]
+    bars = [minute_bars(day, n=60, seed=i) for i, day in enumerate(days)]
+    cache = RollupCache(store, max_days=2, max_entries=1)
+    for held, part in enumerate(bars[:3], 1):  # Appended days extend the history
+        store.write("AAPL", "1 min", part)
+        assert len(cache.slice("AAPL", "1 min", "1d")) == held
+    for part in bars[3:]:
+        store.write("AAPL", "1 min", part)
+    rollups = cache.get("AAPL", "1 min")  # Five days held: rebuilt from the last two
+    assert_matches_resample(rollups, np.concatenate(bars[-2:]))
+    assert cache.slice("AAPL", "1 min", "1d", "2025-09-10") is None
+    window = cache.slice("AAPL", "1 min", "1d", "2025-09-11")
+    assert len(window) == 2 and window["volume"][0] == bars[3]["volume"].sum()
+    store.write("MSFT", "1 min", bars[0])
+    cache.get("MSFT", "1 min")
+    assert list(cache.entries) == [("MSFT", "1 min")]
+
+
+def test_resample_daily_without_deprecated_alias():
+    """Test "1d" resamples by day without a pandas deprecation warning."""
+    bars = minute_bars("2025-09-12")
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        daily = resample_bars(bars, "1d")
+    assert len(daily["time"]) == 1 and daily["volume"][0] == bars["volume"].sum()
@@ -0,0 +1,78 @@
+# pylint: skip-file
+"""
+Tests for the process-pool multi-ticker backtest runner.
+"""
+
+import time
+
+from backend.backtest import BacktestEngine
+from backend.runner import run_backtests
+
+
+def _job(ticker, **extra):
+    return {
+        "ticker": ticker,
+        "shares": 10,
+        "grid_up": 10,
+        "grid_down": 10,
+        "grid_increment": 0.1,
+        "timeframe": "1 D",
+        "interval": "1 min",
+        **extra,
+    }
+
+
+def slow_loader(cfg):
+    """Bar loader that stalls long enough to trip the runner timeout."""
+    time.sleep(3)
+    return BacktestEngine.synthetic_bars(cfg["ticker"])
+
+
+def test_run_backtests_matches_engine():
+    """Test pooled results match in-process runs for every ticker."""
+    tickers = ["AAPL", "MSFT", "GOOG", "AMZN", "TSLA"]
+    results = list(
+        run_backtests([_job(t) for t in tickers], max_workers=2, chunksize=2)
+    )
+    assert sorted(r["ticker"] for r in results) == sorted(tickers)
+    for result in results:
+        expected = BacktestEngine(_job(result["ticker"])).run(
+            BacktestEngine.synthetic_bars(result["ticker"])
+        )
+        assert result["performance"] == expected["performance"]
+        assert "trades" not in result
+
+
+def test_run_backtests_reports_job_errors():
+    """Test a failing job is reported without losing the rest of its chunk."""
+    jobs = [_job("AAPL", bars={"close": [1.0, "x"]}), _job("MSFT")]
+    results = {r["ticker"]: r for r in run_backtests(jobs, max_workers=1, chunksize=2)}
+    assert results["AAPL"]["result"] == "error"
+    assert results["MSFT"]["result"] == "success"
+
+
+def test_run_backtests_timeout():
+    """Test jobs exceeding the per-job timeout are reported as timed out."""
+    started = time.monotonic()
+    results = list(
+        run_backtests(
+            [_job("AAPL")], max_workers=1, timeout=0.5, bar_loader=slow_loader
+        )
+    )
+    assert results[0]["result"] == "error"
+    assert "timed out" in results[0]["error"]
+    assert time.monotonic() - started < 3
+
+
+def test_run_backtests_shared_bars():
+    """Test workers attached to shared-memory bars match in-process runs."""
+    jobs = [_job("AAPL"), _job("AAPL", grid_increment=0.2), _job("MSFT")]
+    results = list(run_backtests(jobs, max_workers=2, share_bars=True))
+    assert len(results) == 3
+    for result in results:
+        assert result["result"] == "success"
+        job = _job(result["ticker"], grid_increment=result["grid_increment"])
+        expected = BacktestEngine(job).run(
+            BacktestEngine.synthetic_bars(result["ticker"])
+        )
+        assert result["performance"] == expected["performance"]
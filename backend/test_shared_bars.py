@@ -0,0 +1,38 @@
+# pylint: skip-file
+"""
+Test publishing bar columns to shared memory and attaching read-only views.
+"""
+
+import numpy as np
+import pytest
+
+from backend import shared_bars
+from backend.backtest import BacktestEngine
+from backend.shared_bars import SharedBars, attach, detach
+
+
+def test_attach_returns_read_only_views():
+    """Test attached columns equal the published bars and cannot be written."""
+    bars = BacktestEngine.synthetic_bars("AAPL")
+    with SharedBars() as shared:
+        handle = shared.publish("AAPL", bars)
+        assert shared.publish("AAPL", bars) is handle
+        columns = attach(handle)
+        assert set(columns) == set(bars)
+        for name, values in bars.items():
+            assert np.array_equal(columns[name], values)
+        with pytest.raises(ValueError):
+            columns["close"][0] = 0.0
+        assert np.shares_memory(attach(handle)["close"], columns["close"])
+    assert not shared.blocks
+
+
+def test_detach_unmaps_once_views_are_dropped():
+    """Test detach keeps a block mapped while views exist and unmaps it after."""
+    with SharedBars() as shared:
+        handle = shared.publish("AAPL", BacktestEngine.synthetic_bars("AAPL"))
+        columns = attach(handle)
+        assert not detach(handle) and handle["name"] in shared_bars._attached
+        del columns
+        assert detach(handle) and handle["name"] not in shared_bars._attached
+        assert detach(handle)  # Nothing attached any more
@@ -0,0 +1,79 @@
+# pylint: skip-file
+"""
+Test /backtest/sweep POST endpoint for ranked results and validation errors.
+"""
+
+import os
+
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.main import app
+
+os.environ["TEST_MODE"] = "1"
+client = TestClient(app)
+
+valid_payload = {
+    "ticker": "AAPL",
+    "timeframe": "1 D",
+    "interval": "1 min",
+    "grid_up": {"start": 1, "stop": 5, "step": 1},
+    "grid_down": {"start": 1, "stop": 5, "step": 1},
+    "grid_increment": {"start": 0.05, "stop": 0.2, "step": 0.05},
+    "shares": {"start": 10, "stop": 20, "step": 10},
+}
+
+
+def test_sweep_success():
+    """Test POST /backtest/sweep evaluates every config and ranks by total_return."""
+    resp = client.post("/backtest/sweep", json={**valid_payload, "limit": 10})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["result"] == "success"
+    assert data["num_configs"] == 5 * 5 * 4 * 2
+    assert len(data["rows"]) == 10
+    col = data["columns"].index("total_return")
+    returns = [row[col] for row in data["rows"]]
+    assert returns == sorted(returns, reverse=True)
+
+
+def test_sweep_rank_by_drawdown_with_closes():
+    """Test sweeping a supplied price series ranked by ascending max_drawdown."""
+    payload = {
+        **valid_payload,
+        "closes": [1.0, 0.9, 1.1, 0.8, 1.2],
+        "sort_by": "max_drawdown",
+        "limit": None,
+    }
+    resp = client.post("/backtest/sweep", json=payload)
+    assert resp.status_code == 200
+    data = resp.json()
+    col = data["columns"].index("max_drawdown")
+    drawdowns = [row[col] for row in data["rows"]]
+    assert drawdowns == sorted(drawdowns)
+
+
+def test_sweep_invalid_sort_by():
+    """Test POST /backtest/sweep with unknown sort_by returns 422."""
+    resp = client.post("/backtest/sweep", json={**valid_payload, "sort_by": "alpha"})
+    assert resp.status_code == 422
+
+
+def test_sweep_invalid_increment():
+    """Test POST /backtest/sweep with a non-positive increment returns 422."""
+    payload = {
+        **valid_payload,
+        "grid_increment": {"start": 0, "stop": 0.1, "step": 0.1},
+    }
+    resp = client.post("/backtest/sweep", json=payload)
+    assert resp.status_code == 422
+
+
+def test_sweep_over_work_budget(monkeypatch):
+    """Test a sweep whose configs x bars exceed MAX_SWEEP_WORK returns 422."""
+    monkeypatch.setattr(main, "MAX_SWEEP_WORK", 5 * 5 * 4 * 2 * 4)
+    payload = {**valid_payload, "closes": [1.0, 0.9, 1.1, 0.8, 1.2]}
+    resp = client.post("/backtest/sweep", json=payload)
+    assert resp.status_code == 422 and "too large" in resp.json()["detail"]
+    payload["closes"] = payload["closes"][:4]
+    assert client.post("/backtest/sweep", json=payload).status_code == 200
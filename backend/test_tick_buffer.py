@@ -0,0 +1,64 @@
+# pylint: skip-file
+"""
+Test the realtime tick ring buffer: wrap-around, zero-copy windows, resuming
+readers, torn copies and tickString parsing.
+"""
+
+import math
+
+import numpy as np
+
+from backend.tick_buffer import RT_VOLUME, TickRing, parse_tick_string
+
+
+def test_window_wraps_around_without_copying():
+    """Test the latest ticks stay contiguous and in order after the ring wraps."""
+    ring = TickRing(capacity=4)
+    for i in range(10):
+        ring.append(4, price=float(i), size=1.0, timestamp=i)
+    assert len(ring) == 4 and ring.total == 10
+    window = ring.window()
+    assert window["price"].tolist() == [6.0, 7.0, 8.0, 9.0]
+    assert window["time"].astype(np.int64).tolist() == [6, 7, 8, 9]
+    assert ring.window(2)["price"].tolist() == [8.0, 9.0]
+    assert np.shares_memory(window, ring.buf)
+    assert not window.flags.writeable
+
+
+def test_since_resumes_and_skips_overwritten_ticks():
+    """Test since() returns ticks by sequence number and skips lost ones."""
+    ring = TickRing(capacity=4)
+    for i in range(3):
+        ring.append(4, price=float(i))
+    assert ring.since(1)["price"].tolist() == [1.0, 2.0]
+    assert ring.since(0, 2)["price"].tolist() == [0.0, 1.0]
+    assert len(ring.since(3)) == 0
+    for i in range(3, 9):
+        ring.append(5 if i % 2 else 4, price=float(i))
+    assert ring.since(0)["price"].tolist() == [5.0, 6.0, 7.0, 8.0]
+    assert ring.last(4) == 8.0 and ring.last(5) == 7.0 and ring.last(8) is None
+
+
+def test_parse_tick_string():
+    """Test RT_VOLUME strings give price and size and junk values are dropped."""
+    assert parse_tick_string(RT_VOLUME, "10.25;300;1757683800000;12000;10.1;true") == (
+        10.25,
+        300.0,
+    )
+    assert parse_tick_string(RT_VOLUME, ";0;1757683800000;12000;10.1;false") is None
+    price, size = parse_tick_string(49, "1.5")
+    assert price == 1.5 and math.isnan(size)
+    assert parse_tick_string(45, "not a number") is None
+
+
+def test_copy_since_drops_ticks_torn_by_a_concurrent_append():
+    """Test copy_since() leaves out the slot an in-progress append is overwriting."""
+    ring = TickRing(capacity=4)
+    for i in range(6):
+        ring.append(4, price=float(i), timestamp=i)
+    total, ticks = ring.copy_since(0)
+    assert total == 6 and ticks["price"].tolist() == [2.0, 3.0, 4.0, 5.0]
+    ring.head = 7  # Tick 6 is being written over tick 2
+    assert ring.copy_since(0)[1]["price"].tolist() == [3.0, 4.0, 5.0]
+    assert ring.copy_since(4)[1]["price"].tolist() == [4.0, 5.0]
+    assert not np.shares_memory(ticks, ring.buf)
@@ -0,0 +1,144 @@
+# pylint: skip-file
+"""
+Test the cached ticker universe: scan spec parsing, memory-only reads,
+stale-while-revalidate with a single refresh per scan, and /us_stock_tickers.
+"""
+
+import os
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from backend import ibkr_pool
+from backend import universe as universe_module
+from backend.ibkr_pool import IBKRSessionPool
+from backend.ibkr_simulator import GatewaySimulator
+from backend.main import app
+from backend.universe import DEFAULT_TICKERS, TickerUniverse, parse_scans
+
+client = TestClient(app)
+os.environ["TEST_MODE"] = "1"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class BlockingScanner:
+    """Scanner whose calls wait for release so concurrent refreshes would overlap."""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.results = {"TOP_PERC_GAIN": ["SNDL", "AAPL"], "HOT_BY_VOLUME": ["AAPL"]}
+
+    def __call__(self, scan):
+        self.calls.append(scan)
+        self.release.wait(5)
+        return self.results[scan["scan_code"]]
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_parse_scans():
+    """Test scan specs map to scanner kwargs with optional price caps."""
+    assert parse_scans("TOP_PERC_GAIN, HOT_BY_VOLUME<1,") == {
+        "TOP_PERC_GAIN": {"scan_code": "TOP_PERC_GAIN"},
+        "HOT_BY_VOLUME<1": {"scan_code": "HOT_BY_VOLUME", "below_price": 1.0},
+    }
+
+
+def test_stale_reads_trigger_one_background_refresh():
+    """Test many concurrent readers never block and share one scan per refresh."""
+    scanner = BlockingScanner()
+    clock = Clock()
+    universe = TickerUniverse(
+        parse_scans("TOP_PERC_GAIN,HOT_BY_VOLUME<1"),
+        scanner,
+        ttl=60,
+        refresh_interval=0,
+        clock=clock,
+    )
+    results = []
+    readers = [
+        threading.Thread(target=lambda: results.append(universe.tickers()))
+        for _ in range(20)
+    ]
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join()
+    assert results == [DEFAULT_TICKERS] * 20  # Empty cache falls back without waiting
+    wait_until(lambda: len(scanner.calls) == 2)  # One per scan
+    assert universe.refresh() == 0  # Both scans already in flight
+    scanner.release.set()
+    wait_until(lambda: universe.stats()["scans_run"] == 2)
+    assert universe.tickers() == ["SNDL", "AAPL"]
+    assert universe.tickers("HOT_BY_VOLUME<1") == ["AAPL"]
+    assert len(scanner.calls) == 2  # Fresh reads come from memory
+
+    scanner.results["TOP_PERC_GAIN"] = ["TSLA"]
+    clock.now = 61
+    assert universe.tickers("TOP_PERC_GAIN") == ["SNDL", "AAPL"]  # Stale, revalidating
+    wait_until(lambda: universe.stats()["scans_run"] == 3)
+    assert universe.tickers("TOP_PERC_GAIN") == ["TSLA"]
+    assert len(scanner.calls) == 3
+
+
+def test_failed_scans_keep_previous_results():
+    """Test a scanner error keeps serving the last good tickers."""
+
+    def scanner(scan):
+        if scanner.fail:
+            raise ConnectionError("gateway down")
+        return ["SNDL"]
+
+    scanner.fail = False
+    universe = TickerUniverse({"TOP_PERC_GAIN": {}}, scanner, refresh_interval=0)
+    assert universe.refresh() == 1
+    scanner.fail = True
+    assert universe.refresh() == 0
+    assert universe.tickers() == ["SNDL"]
+    assert universe.stats()["errors"] == 1
+
+
+def test_us_stock_tickers_served_from_universe(monkeypatch):
+    """Test /us_stock_tickers reads the app universe and rejects unknown scans."""
+    universe = TickerUniverse(
+        {"TOP_PERC_GAIN<1": {}}, lambda scan: ["SNDL"], refresh_interval=0
+    )
+    universe.refresh()
+    monkeypatch.setattr(universe_module, "_default_universe", universe)
+    resp = client.get("/us_stock_tickers", params={"scan": "TOP_PERC_GAIN<1"})
+    assert resp.status_code == 200
+    assert resp.json()["tickers"] == ["SNDL"]
+    assert client.get("/us_stock_tickers", params={"scan": "NOPE"}).status_code == 422
+    assert client.get("/health").json()["ticker_universe"]["scans_run"] == 1
+
+
+def test_scans_run_through_pool_against_gateway(monkeypatch):
+    """Test scheduled and revalidating scans use pooled sessions from their own threads."""
+    with GatewaySimulator() as simulator:
+        pool = IBKRSessionPool(1, port=simulator.port, health_interval=0).start()
+        monkeypatch.setattr(ibkr_pool, "_default_pool", pool)
+        universe = TickerUniverse(
+            parse_scans("TOP_PERC_GAIN,HOT_BY_VOLUME<1"), refresh_interval=60
+        ).start()
+        wait_until(lambda: universe.scans_run == 2)
+        assert universe.errors == 0
+        assert universe.tickers("HOT_BY_VOLUME<1")[:3] == ["AAPL", "MSFT", "NVDA"]
+        universe.ttl = 0  # Next read revalidates on a per-refresh thread
+        universe.tickers("TOP_PERC_GAIN")
+        wait_until(lambda: universe.scans_run == 3)
+        universe.close()
+        pool.close()
@@ -0,0 +1,102 @@
+# pylint: skip-file
+"""
+Test the columnar wire format: encoding negotiation, the json fallback and
+the columnar paths of /api/historical and /backtest.
+"""
+
+import json
+import os
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from backend import bar_store, wire
+from backend.bar_store import BarStore
+from backend.main import app
+from backend.test_bar_store import ibkr_bars
+
+os.environ["TEST_MODE"] = "1"
+client = TestClient(app)
+
+
+def test_negotiate_honours_q_values(monkeypatch):
+    """Test Accept-Encoding parsing, q=0 refusals and brotli only when installed."""
+    monkeypatch.setattr(wire, "brotli", None)
+    assert wire.negotiate("") == "identity"
+    assert wire.negotiate("gzip, deflate") == "gzip"
+    assert wire.negotiate("br;q=1.0, gzip;q=0") == "identity"
+    assert wire.negotiate("*") == "gzip"
+    assert wire.negotiate("*, gzip;q=0") == "identity"
+    monkeypatch.setattr(wire, "brotli", object())
+    assert wire.negotiate("gzip, br") == "br"
+    assert wire.negotiate("GZIP, br;q=0") == "gzip"
+
+
+def test_dumps_without_orjson_matches(monkeypatch):
+    """Test the json fallback encodes NumPy columns like orjson."""
+    columns = wire.bar_columns(
+        {
+            "time": np.array(["2025-09-12T09:30"], dtype="datetime64[m]"),
+            "open": np.array([1.5]),
+            "high": np.array([2.0]),
+            "low": np.array([1.0]),
+            "close": np.array([1.75]),
+            "volume": np.array([10], dtype=np.int64),
+        }
+    )
+    fast = json.loads(wire.dumps({"columns": columns}))
+    monkeypatch.setattr(wire, "orjson", None)
+    assert json.loads(wire.dumps({"columns": columns})) == fast
+    assert fast["columns"]["time"] == ["2025-09-12T09:30:00"]
+
+
+def test_columnar_historical_is_compressed_and_matches_rows(tmp_path, monkeypatch):
+    """Test columnar /api/historical gzips large bodies and carries the row data."""
+    store = BarStore(str(tmp_path))
+    store.write("META", "1 min", ibkr_bars("20250912", 60))
+    monkeypatch.setattr(bar_store, "_default_store", store)
+    monkeypatch.setattr(wire, "brotli", None)
+    params = {"symbol": "META", "start": "2025-09-12", "end": "2025-09-12"}
+    rows = client.get("/api/historical", params=params).json()["bars"]
+    resp = client.get(
+        "/api/historical",
+        params={**params, "columnar": True},
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert resp.status_code == 200
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers["Vary"]
+    assert int(resp.headers["Content-Length"]) < len(resp.content)  # Decoded by httpx
+    columns = resp.json()["columns"]
+    assert resp.json()["bars"] == []
+    for name in ("time", "open", "high", "low", "close", "volume"):
+        assert columns[name] == [row[name] for row in rows]
+    resp = client.get(
+        "/api/historical",
+        params={**params, "columnar": True, "max_bars": 2},
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert "Content-Encoding" not in resp.headers  # Below MIN_COMPRESS_BYTES
+    assert resp.json()["columns"]["time"][0] == "2025-09-12T10:28:00"
+
+
+def test_columnar_backtest_returns_trade_columns():
+    """Test /backtest with columnar=true sends trades as parallel arrays, also from cache."""
+    params = {
+        "ticker": "AAPL",
+        "shares": 10,
+        "grid_up": 1.0,
+        "grid_down": 1.0,
+        "grid_increment": 0.05,
+        "timeframe": "1 D",
+        "interval": "1 min",
+    }
+    rows = client.post("/backtest", json=params).json()
+    for _ in range(2):
+        resp = client.post("/backtest", json={**params, "columnar": True})
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["trades"] == [] and data["performance"] == rows["performance"]
+        columns = data["trade_columns"]
+        assert columns["side"] == [trade["side"] for trade in rows["trades"]]
+        assert columns["price"] == [trade["price"] for trade in rows["trades"]]
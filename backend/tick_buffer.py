@@ -0,0 +1,121 @@
+# pylint: skip-file
+"""
+Fixed-capacity ring buffer of realtime ticks. Ticks are written into a
+preallocated NumPy structured array, so appends are O(1) with no per-tick
+objects, and any window of recent ticks is a contiguous view.
+"""
+
+import math
+import os
+import time
+
+import numpy as np
+
+TICK_DTYPE = np.dtype(
+    [
+        ("time", "datetime64[ns]"),
+        ("tick_type", np.int16),
+        ("price", np.float64),
+        ("size", np.float64),
+    ]
+)
+TICK_CAPACITY = int(os.getenv("TICK_BUFFER_SIZE", "16384"))
+RT_VOLUME = 48  # tickString "price;size;time;totalVolume;vwap;singleTrade"
+
+
+class TickRing:
+    """
+    Last capacity ticks of one subscription. Every tick is written twice,
+    at slot i and i + capacity of a buffer twice that size, so the latest n
+    ticks are always buf[i + capacity - n : i + capacity] with no wrap-around.
+    total counts every tick ever appended and doubles as a sequence number
+    for since(). Views stay valid until capacity newer ticks overwrite them;
+    copy what you keep. head runs one ahead of total while a tick is being
+    written, so a reader on another thread can tell which copied ticks may
+    have been overwritten (see copy_since()).
+    """
+
+    __slots__ = ("capacity", "buf", "total", "head")
+
+    def __init__(self, capacity: int = TICK_CAPACITY):
+        """Preallocate room for capacity ticks."""
+        self.capacity = capacity
+        self.buf = np.zeros(2 * capacity, dtype=TICK_DTYPE)
+        self.total = 0
+        self.head = 0
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def append(self, tick_type: int, price=math.nan, size=math.nan, timestamp=None):
+        """Record one tick, stamped now unless timestamp (ns since epoch) is given."""
+        row = (
+            time.time_ns() if timestamp is None else timestamp,
+            tick_type,
+            price,
+            size,
+        )
+        i = self.total % self.capacity
+        self.head = self.total + 1
+        self.buf[i] = row
+        self.buf[i + self.capacity] = row
+        self.total += 1
+
+    def window(self, n=None) -> np.ndarray:
+        """Return the latest n ticks (all held ticks if None), oldest first, as a read-only view."""
+        n = len(self) if n is None else min(n, len(self))
+        end = self.total % self.capacity + self.capacity
+        view = self.buf[end - n : end]
+        view.flags.writeable = False
+        return view
+
+    def since(self, seq: int, n=None) -> np.ndarray:
+        """
+        Return ticks with sequence numbers seq, seq + 1, ... (at most n), as a
+        read-only view. Ticks already overwritten are skipped, so a consumer
+        that fell behind resumes from the oldest tick still held.
+        """
+        start = max(seq, self.total - len(self))
+        stop = self.total if n is None else min(self.total, start + n)
+        if stop <= start:
+            return self.buf[:0]
+        lo = start % self.capacity
+        view = self.buf[lo : lo + stop - start]
+        view.flags.writeable = False
+        return view
+
+    def copy_since(self, seq: int):
+        """
+        Copy the ticks from seq on while another thread may be appending.
+        Returns (total, ticks): total as of the copy, and the copied ticks
+        minus any overwritten before or during the copy.
+        """
+        total = self.total
+        start = max(seq, total - self.capacity)
+        lo = start % self.capacity
+        ticks = self.buf[lo : lo + max(0, total - start)].copy()
+        return total, ticks[max(0, self.head - self.capacity - start) :]
+
+    def last(self, tick_type: int):
+        """Return the latest price recorded for tick_type, or None."""
+        held = self.window()
+        matches = np.flatnonzero(held["tick_type"] == tick_type)
+        return float(held["price"][matches[-1]]) if len(matches) else None
+
+
+def parse_tick_string(tick_type: int, value: str):
+    """
+    Convert a tickString/tickGeneric value to (price, size). RT_VOLUME strings
+    give the trade price and size; other numeric values land in price.
+    Returns None for non-numeric values.
+    """
+    if tick_type == RT_VOLUME:
+        price, size = (value.split(";") + ["", ""])[:2]
+        try:
+            return float(price), float(size)
+        except ValueError:
+            return None
+    try:
+        return float(value), math.nan
+    except (TypeError, ValueError):
+        return None
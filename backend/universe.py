@@ -0,0 +1,200 @@
+# pylint: skip-file
+"""
+Ticker universe for the UI dropdowns. Configured IBKR market scans run on a
+background schedule and their results are kept in memory with a TTL, so
+requests never wait on (or multiply) scanner subscriptions. Stale results are
+served while a single background refresh revalidates them.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from .backfill import RETRY_ERRORS
+from .ibkr_pool import default_pool
+
+# Served until the first scan completes, or when no IBKR session is available
+DEFAULT_TICKERS = ["AAPL", "MSFT", "GOOG", "AMZN", "TSLA", "NVDA", "META"]
+# Comma-separated scan specs: SCAN_CODE, optionally "<price" for a price cap
+UNIVERSE_SCANS = os.getenv("UNIVERSE_SCANS", "TOP_PERC_GAIN,TOP_PERC_GAIN<1")
+UNIVERSE_TTL = float(os.getenv("UNIVERSE_TTL", "300"))
+UNIVERSE_LIMIT = int(os.getenv("UNIVERSE_LIMIT", "50"))
+_default_universe = None
+logger = logging.getLogger(__name__)
+
+
+def parse_scans(spec: str) -> dict:
+    """
+    Parse "TOP_PERC_GAIN,HOT_BY_VOLUME<1" into {name: get_us_stock_tickers
+    kwargs}; the name is the spec itself.
+    """
+    scans = {}
+    for name in filter(None, (part.strip() for part in spec.split(","))):
+        scan_code, _, below = name.partition("<")
+        scans[name] = {"scan_code": scan_code.strip()}
+        if below:
+            scans[name]["below_price"] = float(below)
+    return scans
+
+
+def pool_scanner(scan: dict, limit: int = UNIVERSE_LIMIT):
+    """Run one scan on a pooled IBKR session. Returns None when no pool is running."""
+    pool = default_pool()
+    if pool is None:
+        return None
+    with pool.session() as client:
+        return client.get_us_stock_tickers(limit=limit, **scan)
+
+
+class TickerUniverse:
+    """
+    In-memory results of named scans. tickers() only reads memory: an expired
+    entry is still returned, and triggers one background refresh of that scan
+    at most, however many callers see it. start() also refreshes every scan on
+    a fixed schedule, ahead of expiry.
+    """
+
+    def __init__(
+        self,
+        scans: dict = None,
+        scanner=pool_scanner,
+        ttl: float = UNIVERSE_TTL,
+        refresh_interval: float = None,
+        clock=time.monotonic,
+    ):
+        """
+        Create an unstarted universe. scanner(scan) returns a ticker list (None
+        when scanning is unavailable). refresh_interval defaults to 0.8 * ttl;
+        0 disables the schedule.
+        """
+        self.scans = parse_scans(UNIVERSE_SCANS) if scans is None else scans
+        self.scanner = scanner
+        self.ttl = ttl
+        self.refresh_interval = (
+            0.8 * ttl if refresh_interval is None else refresh_interval
+        )
+        self.clock = clock
+        self._entries = {}  # name -> (tickers, fetched_at)
+        self._inflight = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = None
+        self.scans_run = 0
+        self.errors = 0
+
+    def start(self):
+        """Start the refresh schedule, which scans everything right away."""
+        if self._thread is None and self.refresh_interval:
+            self._thread = threading.Thread(
+                target=self._run, name="ticker-universe", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def tickers(self, scan: str = None) -> list:
+        """
+        Return the cached tickers of one scan, or of all scans merged in
+        configured order when scan is None. Raises KeyError for unknown scans.
+        """
+        names = list(self.scans) if scan is None else [scan]
+        if scan is not None and scan not in self.scans:
+            raise KeyError(scan)
+        now = self.clock()
+        merged = []
+        with self._lock:
+            for name in names:
+                entry = self._entries.get(name)
+                if entry is None or now - entry[1] >= self.ttl:
+                    self._revalidate(name)
+                if entry is not None:
+                    merged.extend(entry[0])
+        return list(dict.fromkeys(merged)) or list(DEFAULT_TICKERS)
+
+    def _revalidate(self, name: str):
+        """Refresh name on a background thread unless a refresh is in flight. Needs _lock."""
+        if name in self._inflight or self._closed:
+            return
+        self._inflight.add(name)
+        threading.Thread(
+            target=self._refresh_claimed, args=(name,), daemon=True
+        ).start()
+
+    def refresh(self, name: str = None) -> int:
+        """
+        Run scan name (every scan if None) now, skipping scans already being
+        refreshed. Returns the number of scans that stored fresh results.
+        """
+        refreshed = 0
+        for scan in list(self.scans) if name is None else [name]:
+            with self._lock:
+                if scan in self._inflight:
+                    continue
+                self._inflight.add(scan)
+            refreshed += self._refresh_claimed(scan)
+        return refreshed
+
+    def _refresh_claimed(self, name: str) -> bool:
+        try:
+            tickers = self.scanner(self.scans[name])
+        except RETRY_ERRORS as e:
+            logger.warning("Universe scan %s failed: %s", name, e)
+            tickers = None
+            with self._lock:
+                self.errors += 1
+        with self._lock:
+            self._inflight.discard(name)
+            if tickers is None:
+                return False
+            self._entries[name] = (list(tickers), self.clock())
+            self.scans_run += 1
+            return True
+
+    def _run(self):
+        while not self._closed:
+            self.refresh()
+            self._wake.wait(self.refresh_interval)
+            self._wake.clear()
+
+    def stats(self) -> dict:
+        """Return per-scan ticker counts and ages in seconds, plus scan/error totals."""
+        now = self.clock()
+        with self._lock:
+            return {
+                "scans": {
+                    name: {"tickers": len(tickers), "age": round(now - fetched, 1)}
+                    for name, (tickers, fetched) in self._entries.items()
+                },
+                "scans_run": self.scans_run,
+                "errors": self.errors,
+            }
+
+    def close(self):
+        """Stop the refresh schedule."""
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def default_universe():
+    """Return the universe started with the app, or None outside the app lifespan."""
+    return _default_universe
+
+
+def start_default_universe():
+    """Start the process-wide universe. Returns it."""
+    global _default_universe
+    if _default_universe is None:
+        _default_universe = TickerUniverse().start()
+    return _default_universe
+
+
+def close_default_universe():
+    """Stop the process-wide universe, if one was started."""
+    global _default_universe
+    if _default_universe is not None:
+        _default_universe.close()
+        _default_universe = None
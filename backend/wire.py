@@ -0,0 +1,120 @@
+# pylint: skip-file
+"""
+Compact wire format for bulk bar and trade payloads. Columns go to JSON
+straight from NumPy arrays (with orjson when installed), skipping per-row
+Pydantic models, and bodies are compressed with brotli or gzip when the client
+accepts it. brotli is optional; without it only gzip is offered.
+"""
+
+import gzip
+import json
+import os
+
+import numpy as np
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = int(os.getenv("WIRE_MIN_COMPRESS_BYTES", "1024"))
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+BAR_FIELDS = ("open", "high", "low", "close", "volume")
+TRADE_FIELDS = ("id", "ticker", "shares", "price", "side", "timestamp")
+
+
+def _default(value):
+    """json.dumps fallback for NumPy values when orjson is missing."""
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind == "M":
+            return np.datetime_as_string(value).tolist()
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def dumps(payload) -> bytes:
+    """Serialize payload, which may hold contiguous NumPy arrays, to JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, default=_default, separators=(",", ":")).encode()
+
+
+def bar_columns(records) -> dict:
+    """
+    Wire columns for BAR_DTYPE fields (array or dict of columns): time as
+    second-resolution datetime64 (ISO strings on the wire), the rest as-is.
+    """
+    # Plain C-contiguous ndarrays: orjson rejects field views and memmaps
+    columns = {"time": np.ascontiguousarray(records["time"], dtype="datetime64[s]")}
+    for name in BAR_FIELDS:
+        columns[name] = np.ascontiguousarray(records[name])
+    return columns
+
+
+def trade_columns(trades: list) -> dict:
+    """Parallel lists of the Trade fields for a list of trade dicts."""
+    return {name: [trade.get(name) for trade in trades] for name in TRADE_FIELDS}
+
+
+def negotiate(accept_encoding: str) -> str:
+    """Pick "br", "gzip" or "identity" from an Accept-Encoding header."""
+    offered = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        offered[coding.strip()] = q
+    for coding in ("br", "gzip"):
+        if coding == "br" and brotli is None:
+            continue
+        if offered.get(coding, offered.get("*", 0.0)) > 0:
+            return coding
+    return "identity"
+
+
+def content_coding(request, size: int) -> str:
+    """Coding for a size-byte body: identity below MIN_COMPRESS_BYTES, else negotiated."""
+    if size < MIN_COMPRESS_BYTES:
+        return "identity"
+    return negotiate(request.headers.get("accept-encoding", ""))
+
+
+def compress(body: bytes, coding: str) -> bytes:
+    """Encode body with a coding returned by negotiate."""
+    if coding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if coding == "gzip":
+        return gzip.compress(body, GZIP_LEVEL)
+    return body
+
+
+def encoded_response(payload, request, status_code: int = 200) -> Response:
+    """
+    Return payload (a dict to serialize, or JSON bytes) as a JSON Response,
+    compressed per the request's Accept-Encoding once it exceeds
+    MIN_COMPRESS_BYTES.
+    """
+    body = payload if isinstance(payload, bytes) else dumps(payload)
+    coding = content_coding(request, len(body))
+    headers = {"Vary": "Accept-Encoding"}
+    if coding != "identity":
+        headers["Content-Encoding"] = coding
+    return Response(
+        compress(body, coding),
+        status_code=status_code,
+        media_type="application/json",
+        headers=headers,
+    )
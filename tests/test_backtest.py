@@ -3,6 +3,9 @@
 Unit tests for BacktestEngine in backend/backtest.py.
 """
 
+import numpy as np
+import pytest
+
 from backend.backtest import BacktestEngine
 
 
@@ -21,3 +24,222 @@ def test_grid_bot_edge_case():
     result = engine.run()
     assert result["result"] == "success"
     assert result["performance"]["total_trades"] >= 0
+
+
+def test_grid_replay_round_trip():
+    """Test a dip through one level and a recovery produce one buy/sell round trip."""
+    engine = BacktestEngine("AAPL", 10, 2, 2, 1.0, "1 D", "1 min")
+    bars = {"close": [100.0, 99.5, 100.2, 101.5], "time": ["t0", "t1", "t2", "t3"]}
+    result = engine.run(bars)
+    sides = [(t["side"], t["price"], t["timestamp"]) for t in result["trades"]]
+    assert sides == [("buy", 100.0, "t1"), ("sell", 101.0, "t3")]
+    assert result["performance"]["wins"] == 1
+    assert result["performance"]["pnl"] == 10.0
+    assert result["performance"]["held_shares"] == 0
+
+
+def test_grid_replay_holds_open_levels_and_list_input():
+    """Test list-of-dict bars and open positions marked to the last close."""
+    engine = BacktestEngine("AAPL", 1, 3, 3, 1.0, "1 D", "1 min")
+    bars = [{"date": str(i), "close": c} for i, c in enumerate([10.0, 7.5, 8.2])]
+    result = engine.run(bars)
+    assert [t["side"] for t in result["trades"]] == ["buy", "buy", "buy"]
+    assert result["performance"]["held_shares"] == 3
+    assert result["performance"]["pnl"] == round(8.2 * 3 - (10 + 9 + 8), 2)
+
+
+def test_grid_replay_respects_max_trades():
+    """Test max_trades stops the replay after that many fills."""
+    cfg = {
+        "ticker": "AAPL",
+        "shares": 5,
+        "grid_up": 10,
+        "grid_down": 10,
+        "grid_increment": 0.1,
+        "timeframe": "1 D",
+        "interval": "1 min",
+        "max_trades": 4,
+    }
+    result = BacktestEngine(cfg).run(BacktestEngine.synthetic_bars("AAPL"))
+    assert result["performance"]["total_trades"] == 4
+
+
+def test_sweep_matches_single_runs():
+    """Test each sweep row agrees with a standalone run of the same config."""
+    bars = BacktestEngine.synthetic_bars("SUB1", base_price=0.8, n_bars=2000)
+    engine = BacktestEngine("SUB1", 100, 5, 5, 0.005, "1 D", "1 min")
+    table = engine.sweep(
+        bars, grid_up=[2, 10], grid_down=[0, 4], grid_increment=[0.002, 0.005]
+    )
+    assert len(table) == 8
+    for row in table:
+        single = BacktestEngine(
+            "SUB1",
+            100,
+            row["grid_up"],
+            row["grid_down"],
+            row["grid_increment"],
+            "1 D",
+            "1 min",
+        ).run(bars)["performance"]
+        assert single["total_trades"] == row["total_trades"]
+        assert single["held_shares"] == row["held_shares"]
+        assert abs(single["pnl"] - row["pnl"]) < 0.01
+    ranked = BacktestEngine.rank_sweep(table, "max_drawdown", limit=3)
+    assert list(ranked["max_drawdown"]) == sorted(ranked["max_drawdown"])
+
+
+def test_run_stream_matches_run():
+    """Test chunked streaming carries grid state and ends where run() does."""
+    bars = BacktestEngine.synthetic_bars("AAPL", n_bars=1000)
+    engine = BacktestEngine("AAPL", 10, 10, 10, 0.1, "1 D", "1 min")
+    expected = engine.run(bars)
+    bounds = [0, 1, 250, 251, 600, 1000]
+    chunks = (
+        {name: column[a:b] for name, column in bars.items()}
+        for a, b in zip(bounds[:-1], bounds[1:])
+    )
+    snapshots = list(engine.run_stream(chunks))
+    assert [s["bars_processed"] for s in snapshots] == bounds[1:]
+    assert snapshots[-1]["performance"] == expected["performance"]
+    streamed = [trade for s in snapshots for trade in s["trades"]]
+    assert streamed == expected["trades"]
+
+
+def test_run_stream_from_ibkr_windows():
+    """Test iter_historical_data_ibkr yields one window per request into run_stream."""
+
+    class FakeApp:
+        def __init__(self):
+            self.historical_data = []
+            self.historical_done = False
+            self.closes = iter([[100.0, 99.5], [98.5, 101.5]])
+
+        def reqHistoricalData(self, req_id, contract, end, *args):
+            self.historical_data = [
+                {"date": f"{end}-{i}", "close": c}
+                for i, c in enumerate(next(self.closes))
+            ]
+            self.historical_done = True
+
+        def run(self):
+            pass
+
+    windows = BacktestEngine.iter_historical_data_ibkr(
+        {"app_instance": FakeApp(), "contract_instance": None}, ["d1", "d2"]
+    )
+    engine = BacktestEngine("AAPL", 1, 2, 2, 1.0, "2 D", "1 min")
+    snapshots = list(engine.run_stream(windows))
+    assert [len(s["trades"]) for s in snapshots] == [1, 3]
+    assert snapshots[1]["trades"][-1]["timestamp"] == "d2-1"
+    assert snapshots[-1]["performance"]["realized_pnl"] == 2.0
+
+
+def test_walk_forward_stitches_out_of_sample_windows():
+    """Test walk-forward windows tile the series and stitch their OOS pnl."""
+    bars = BacktestEngine.synthetic_bars("SUB1", base_price=0.8, n_bars=3000)
+    engine = BacktestEngine("SUB1", 100, 5, 5, 0.002, "1 D", "1 min")
+    result = engine.walk_forward(
+        bars,
+        train_bars=600,
+        test_bars=200,
+        grid_up=[2, 8],
+        grid_down=[2, 8],
+        grid_increment=[0.001, 0.002],
+    )
+    windows = result["windows"]
+    assert len(windows) == 11
+    assert [w["test_start"] for w in windows] == list(range(600, 2800, 200))
+    assert all(w["train_end"] - w["train_start"] == 600 for w in windows)
+    assert len(result["equity"]) == 11 * 200
+    oos_total = sum(w["oos_pnl"] for w in windows)
+    assert abs(result["equity"][-1] - oos_total) < 1e-9
+    assert result["performance"]["pnl"] == round(oos_total, 2)
+
+
+def test_bootstrap_paths_resample_returns():
+    """Test bootstrap paths start at the first close and reuse historical returns."""
+    closes = BacktestEngine.synthetic_bars("SUB1", base_price=0.8, n_bars=200)["close"]
+    paths = BacktestEngine.bootstrap_paths(closes, 20, 10, 150, rng=7)
+    assert paths.shape == (20, 151)
+    assert (paths[:, 0] == closes[0]).all()
+    returns = set(np.round(np.diff(np.log(closes)), 12))
+    assert set(np.round(np.diff(np.log(paths[3])), 12)) <= returns
+
+
+def test_robustness_matches_single_path_runs():
+    """Test batched robustness stats agree with running each path on its own."""
+    bars = BacktestEngine.synthetic_bars("SUB1", base_price=0.8, n_bars=300)
+    engine = BacktestEngine("SUB1", 100, 20, 20, 0.002, "1 D", "1 min")
+    result = engine.robustness(bars, n_paths=40, block_size=15, seed=3, batch_size=3000)
+    paths = BacktestEngine.bootstrap_paths(
+        bars["close"], 40, 15, 299, np.random.default_rng(3)
+    )
+    pnls = [engine.run({"close": path})["performance"]["pnl"] for path in paths]
+    assert abs(result["pnl"]["p50"] - np.percentile(pnls, 50)) < 0.01
+    assert result["max_drawdown"]["p95"] >= result["max_drawdown"]["p5"] >= 0
+
+
+def test_robustness_rejects_short_series():
+    """Test fewer than two closes raise ValueError instead of a NumPy error."""
+    engine = BacktestEngine("SUB1", 100, 20, 20, 0.002, "1 D", "1 min")
+    for closes in ([], [0.8]):
+        with pytest.raises(ValueError):
+            engine.robustness({"close": closes}, n_paths=5)
+        with pytest.raises(ValueError):
+            BacktestEngine.bootstrap_paths(closes, 5, 10, 10)
+    with pytest.raises(ValueError):
+        engine.robustness({"close": [0.8, 0.81]}, n_paths=0)
+
+
+def test_ibapp_routes_callbacks_to_concurrent_requests():
+    """Test interleaved callbacks resolve each request's future with its own data."""
+    from types import SimpleNamespace
+
+    from backend.backtest import IBApp
+
+    app = IBApp()
+    sent = []
+    app.reqHistoricalData = lambda req_id, contract, *args: sent.append(req_id)
+    app.reqMktData = lambda req_id, *args: sent.append(req_id)
+    app.cancelMktData = lambda req_id: None
+    (a, fa), (b, fb) = [app.submit_historical(None, end) for end in ("d1", "d2")]
+    ticks_id, ticks = app.submit_market_data(None, n_ticks=2)
+    failed_id, failed = app.submit_historical(None, "d3")
+    assert sent == [a, b, ticks_id, failed_id] and len(set(sent)) == 4
+
+    def bar(close):
+        return SimpleNamespace(
+            date="20250912  09:30:00", open=1, high=1, low=1, close=close, volume=1
+        )
+
+    for req_id, close in ((a, 1.0), (b, 2.0), (a, 3.0)):
+        app.historicalData(req_id, bar(close))
+    app.tickPrice(ticks_id, 4, 10.5, None)
+    app.error(-1, 2104, "Market data farm connection is OK")
+    app.error(failed_id, 162, "Historical Market Data Service error message")
+    app.historicalDataEnd(b, "", "")
+    assert [row["close"] for row in fb.result(0)] == [2.0]
+    assert not fa.done() and not ticks.done()
+    app.tickSize(ticks_id, 5, 300)
+    app.historicalDataEnd(a, "", "")
+    assert [row["close"] for row in fa.result(0)] == [1.0, 3.0]
+    received = ticks.result(0)
+    assert received["tick_type"].tolist() == [4, 5]
+    assert received["price"][0] == 10.5 and received["size"][1] == 300
+    assert len(app.cancel_market_data(ticks_id)) == 2
+    app.tickPrice(ticks_id, 4, 10.75, None)  # In flight after the cancel
+    assert ticks_id not in app.tick_buffers
+    assert "162" in str(failed.exception(0))
+    app.historicalData(999, bar(5.0))  # Unknown reqId falls back to the shared list
+    assert app.historical_data[0]["close"] == 5.0
+
+    def reply(req_id, contract, *args):
+        app.historicalData(req_id, bar(7.0))
+        app.historicalDataEnd(req_id, "", "")
+
+    app.reqHistoricalData = reply
+    bars = BacktestEngine.request_historical_data_ibkr(
+        {"app_instance": app, "contract_instance": None, "timeout": 1}
+    )
+    assert [row["close"] for row in bars] == [7.0]